@@ -0,0 +1,157 @@
+"""
+Session admission control for a worker.
+Caps concurrent voice sessions, optionally queues callers briefly, and
+drains live sessions on shutdown.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class SessionAdmission:
+    """
+    Per-worker limit on concurrent voice sessions.
+
+    A new session is admitted while the worker is below max_sessions. Beyond
+    that, up to queue_size callers wait for a slot for at most queue_timeout
+    seconds; everyone else is rejected. Once draining starts nothing new is
+    admitted, and drain() waits for live sessions to finish before closing
+    whatever is left.
+    """
+
+    def __init__(self, max_sessions: int, queue_size: int = 0, queue_timeout: float = 5.0):
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.draining = False
+        self._changed = asyncio.Condition()
+        self._sessions: Set = set()
+
+        # Counters
+        self.admitted = 0
+        self.rejected = 0
+        self.queued = 0
+
+    @classmethod
+    def for_settings(cls, settings) -> "SessionAdmission":
+        """Build admission control from settings."""
+        return cls(
+            max_sessions=settings.max_sessions,
+            queue_size=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout_seconds
+        )
+
+    @property
+    def at_capacity(self) -> bool:
+        """Whether a new session would have to queue or be rejected."""
+        return self.active >= self.max_sessions
+
+    @property
+    def can_queue(self) -> bool:
+        """Whether a caller arriving now could wait for a slot."""
+        return not self.draining and self.waiting < self.queue_size
+
+    async def acquire(self) -> bool:
+        """
+        Try to admit a session, waiting in the queue if allowed.
+
+        Returns:
+            True if admitted (call release() when the session ends)
+        """
+        if self.draining:
+            self.rejected += 1
+            return False
+
+        if not self.at_capacity:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        if not self.can_queue:
+            self.rejected += 1
+            return False
+
+        self.waiting += 1
+        self.queued += 1
+        try:
+            async with self._changed:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self.draining or not self.at_capacity),
+                    timeout=self.queue_timeout
+                )
+                if self.draining:
+                    self.rejected += 1
+                    return False
+                self.active += 1
+                self.admitted += 1
+                return True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+    async def release(self) -> None:
+        """Free the slot of a session that has ended."""
+        self.active = max(0, self.active - 1)
+        async with self._changed:
+            self._changed.notify_all()
+
+    def register(self, session) -> None:
+        """Track a live session so it can be closed when draining."""
+        self._sessions.add(session)
+
+    def unregister(self, session) -> None:
+        """Stop tracking a session that has ended."""
+        self._sessions.discard(session)
+
+    async def start_draining(self) -> None:
+        """Stop admitting sessions and turn away anyone still queued."""
+        if not self.draining:
+            self.draining = True
+            logger.info("Draining: no new sessions, %s still active", self.active)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def drain(self, timeout: float, close_timeout: float = 5.0) -> None:
+        """
+        Wait up to timeout seconds for active sessions to finish, then close
+        any that remain and wait up to close_timeout seconds for their
+        handlers to finish cleaning up (tool calls, call records), so the
+        shared resources they use can be closed after this returns.
+        """
+        await self.start_draining()
+        deadline = time.monotonic() + timeout
+        while self.active and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+
+        if self._sessions:
+            logger.info("Drain deadline reached, closing %s sessions", len(self._sessions))
+            await asyncio.gather(
+                *(session.close("server_shutdown") for session in list(self._sessions)),
+                return_exceptions=True
+            )
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(self._changed.wait_for(lambda: self.active == 0), timeout=close_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("%s sessions still cleaning up after %.0fs", self.active, close_timeout)
+        logger.info("Drain complete")
+
+    def load(self) -> Dict[str, Optional[float]]:
+        """Current load, for readiness checks and load balancers."""
+        return {
+            "active_sessions": self.active,
+            "max_sessions": self.max_sessions,
+            "queued_sessions": self.waiting,
+            "utilization": round(self.active / self.max_sessions, 3) if self.max_sessions else None,
+            "draining": self.draining,
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,227 @@
+"""
+Outbound audio pacing for voice sessions.
+Sends agent audio to the client in fixed frames at real-time speed, and
+tracks how much of it the caller has actually heard.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Entries in the send queue: a frame of audio, or a callback to run once
+# everything queued before it has been sent
+_FRAME = 0
+_CALLBACK = 1
+
+
+class OutboundAudioPacer:
+    """
+    Per-session stage between OpenAI's audio deltas and the client.
+
+    Deltas are re-chunked into frames of frame_ms. A sender task releases a
+    frame only while the client has less than lead_ms of unplayed audio, so
+    at most the lead sits in the client's buffer instead of the whole reply.
+    The pacer models the client's playout clock (frames play back to back,
+    and an underrun pauses playback), which gives the playback position of
+    the current item. On barge-in, interrupt() drops the unsent frames and
+    returns the point the caller had heard up to, ready for
+    conversation.item.truncate.
+    """
+
+    def __init__(
+        self,
+        send_frame: Callable[[dict, bytes], Awaitable[None]],
+        sample_rate: int,
+        frame_ms: int = 40,
+        lead_ms: int = 300
+    ):
+        self._send_frame = send_frame
+        self._bytes_per_ms = sample_rate * 2 / 1000
+        self.frame_bytes = max(2, int(self._bytes_per_ms * frame_ms) // 2 * 2)
+        self.lead = lead_ms / 1000
+        self._entries: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._pending = bytearray()
+        self._pending_meta: Optional[dict] = None
+        self._sender_task: Optional[asyncio.Task] = None
+
+        # Playout model for the item being played
+        self._playout_end = 0.0
+        self._item: Optional[Tuple[str, int]] = None
+        self._item_sent_ms = 0.0
+        self._interrupted_item: Optional[str] = None
+
+        # Counters
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.truncations = 0
+
+    @classmethod
+    def for_settings(cls, send_frame: Callable[[dict, bytes], Awaitable[None]], settings) -> "OutboundAudioPacer":
+        """Build a pacer for the upstream audio format using settings."""
+        return cls(
+            send_frame,
+            sample_rate=settings.sample_rate,
+            frame_ms=settings.outbound_frame_ms,
+            lead_ms=settings.outbound_lead_ms
+        )
+
+    @property
+    def buffered_ms(self) -> float:
+        """Audio sent to the client that it has not played yet."""
+        return max(0.0, self._playout_end - time.monotonic()) * 1000
+
+    @property
+    def playback_position_ms(self) -> float:
+        """How far into the current item the caller has heard."""
+        return max(0.0, self._item_sent_ms - self.buffered_ms)
+
+    def start(self) -> None:
+        """Start the background sender."""
+        if self._sender_task is None:
+            self._sender_task = asyncio.create_task(self._run_sender())
+
+    async def close(self) -> None:
+        """Stop the sender and discard anything unsent."""
+        if self._sender_task:
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except asyncio.CancelledError:
+                pass
+            self._sender_task = None
+        self._entries.clear()
+        self._pending.clear()
+
+    def push(self, pcm: bytes, meta: dict) -> None:
+        """
+        Queue audio for an output item.
+        meta carries the item_id and content_index (and any other fields
+        the send_frame callback needs) for the frames cut from this audio.
+        """
+        item_id = meta.get("item_id")
+        if item_id is not None and item_id == self._interrupted_item:
+            # Late deltas of a response the caller already interrupted
+            return
+        if self._pending_meta is not None and self._pending_meta.get("item_id") != item_id:
+            self.end_item()
+
+        self._pending_meta = meta
+        self._pending += pcm
+        ready = len(self._pending) - len(self._pending) % self.frame_bytes
+        for offset in range(0, ready, self.frame_bytes):
+            self._entries.append((_FRAME, meta, bytes(self._pending[offset:offset + self.frame_bytes])))
+        del self._pending[:ready]
+        if ready:
+            self._wakeup.set()
+
+    def end_item(self) -> None:
+        """Queue the partial frame left at the end of an item's audio."""
+        usable = len(self._pending) - len(self._pending) % 2
+        if usable and self._pending_meta is not None:
+            self._entries.append((_FRAME, self._pending_meta, bytes(self._pending[:usable])))
+            self._wakeup.set()
+        self._pending.clear()
+        self._pending_meta = None
+
+    def after_audio(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Run callback once all audio queued so far has been sent."""
+        self._entries.append((_CALLBACK, None, callback))
+        self._wakeup.set()
+
+    def played(self, item_id: str) -> None:
+        """
+        The client confirmed it has played all of item_id's audio (e.g. a
+        carrier echoing a mark), so a barge-in has nothing of it to cut.
+        """
+        if self._item is None or self._item[0] != item_id:
+            return
+        self._playout_end = min(self._playout_end, time.monotonic())
+        self._item = None
+        self._item_sent_ms = 0.0
+
+    def interrupt(self) -> Optional[Tuple[str, int, int]]:
+        """
+        Drop unsent audio because the caller started speaking.
+
+        Returns (item_id, content_index, audio_end_ms) for the item that was
+        cut short, or None if the caller had already heard everything.
+        """
+        frames = [meta for kind, meta, _ in self._entries if kind == _FRAME]
+        dropped = len(frames) + bool(self._pending)
+        self._entries = deque(entry for entry in self._entries if entry[0] == _CALLBACK)
+        self._pending.clear()
+        pending_meta, self._pending_meta = self._pending_meta, None
+        self.frames_dropped += dropped
+
+        if self._item is None:
+            # Nothing of this item went out yet
+            next_meta = frames[0] if frames else pending_meta
+            if next_meta is None:
+                return None
+            self._item = (next_meta.get("item_id"), next_meta.get("content_index", 0))
+        if not dropped and self.buffered_ms == 0:
+            return None
+
+        item_id, content_index = self._item
+        audio_end_ms = int(self.playback_position_ms)
+        self._interrupted_item = item_id
+        self._playout_end = time.monotonic()
+        self._item = None
+        self._item_sent_ms = 0.0
+        self.truncations += 1
+        logger.info("Barge-in: dropped %s frames, %s heard up to %sms", dropped, item_id, audio_end_ms)
+        return item_id, content_index, audio_end_ms
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for logging and metrics."""
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "truncations": self.truncations,
+            "queued_frames": sum(1 for kind, _, _ in self._entries if kind == _FRAME)
+        }
+
+    async def _run_sender(self) -> None:
+        """Send queued frames no faster than real time plus the lead."""
+        while True:
+            if not self._entries:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            kind, meta, payload = self._entries[0]
+            if kind == _CALLBACK:
+                self._entries.popleft()
+                try:
+                    await payload()
+                except Exception as e:
+                    logger.error("Error after outbound audio: %s", e)
+                continue
+
+            now = time.monotonic()
+            wait = self._playout_end - self.lead - now
+            if wait > 0:
+                # Re-check afterwards: a barge-in may have emptied the queue
+                await asyncio.sleep(wait)
+                continue
+
+            self._entries.popleft()
+            item = (meta.get("item_id"), meta.get("content_index", 0))
+            if item != self._item:
+                self._item = item
+                self._item_sent_ms = 0.0
+            duration = len(payload) / self._bytes_per_ms
+            try:
+                await self._send_frame(meta, payload)
+            except Exception as e:
+                self.frames_dropped += 1
+                logger.error("Error sending outbound audio: %s", e)
+                continue
+            self.frames_sent += 1
+            self._item_sent_ms += duration
+            self._playout_end = max(self._playout_end, now) + duration / 1000
@@ -0,0 +1,167 @@
+"""
+Upstream audio pipeline for voice sessions.
+Coalesces small client audio chunks into larger frames and sends them to
+OpenAI through a bounded queue.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from metrics import AUDIO_QUEUE_DEPTH
+from silence_gate import SilenceGate
+
+logger = logging.getLogger(__name__)
+
+
+class AudioPipeline:
+    """
+    Per-session stage between the client socket and OpenAI.
+
+    Incoming PCM16 is buffered until at least one full frame is available and
+    then sent as whole frames, so many tiny client chunks become one upstream
+    append. Frames are handed to a sender task through a bounded queue: when
+    the upstream socket is slow the producer waits, and frames that cannot be
+    queued within the put timeout are dropped. With a silence gate, frames are
+    gated before queueing and silence past the hangover never leaves.
+    """
+
+    def __init__(
+        self,
+        send_frame: Callable[[bytes], Awaitable[None]],
+        frame_bytes: int,
+        max_queued_frames: int = 25,
+        put_timeout: float = 0.2,
+        silence_gate: Optional[SilenceGate] = None
+    ):
+        self._send_frame = send_frame
+        self.frame_bytes = max(2, frame_bytes - frame_bytes % 2)
+        self._put_timeout = put_timeout
+        self.silence_gate = silence_gate
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued_frames)
+        self._pending = bytearray()
+        self._sender_task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.chunks_received = 0
+        self.frames_queued = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+    @classmethod
+    def for_settings(cls, send_frame: Callable[[bytes], Awaitable[None]], settings) -> "AudioPipeline":
+        """Build a pipeline using the frame and queue sizes from settings."""
+        frame_bytes = settings.sample_rate * settings.audio_frame_ms // 1000 * 2
+        return cls(
+            send_frame,
+            frame_bytes=frame_bytes,
+            max_queued_frames=settings.audio_queue_max_frames,
+            put_timeout=settings.audio_queue_put_timeout_ms / 1000,
+            silence_gate=SilenceGate.for_settings(settings) if settings.silence_gate else None
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of frames waiting to be sent upstream."""
+        return self._queue.qsize()
+
+    @property
+    def chunks_merged(self) -> int:
+        """Client chunks that did not need an upstream message of their own."""
+        return max(0, self.chunks_received - self.frames_queued)
+
+    def start(self) -> None:
+        """Start the background sender."""
+        if self._sender_task is None:
+            self._sender_task = asyncio.create_task(self._run_sender())
+
+    async def push(self, pcm: bytes) -> None:
+        """Add a chunk of client audio, queueing any complete frames."""
+        self.chunks_received += 1
+        self._pending += pcm
+
+        ready = len(self._pending) - len(self._pending) % self.frame_bytes
+        if ready:
+            frame = bytes(self._pending[:ready])
+            del self._pending[:ready]
+            if self.silence_gate:
+                frame = self.silence_gate.process(frame)
+                if not frame:
+                    return
+            await self._enqueue(frame)
+
+    async def flush(self) -> None:
+        """Send any buffered partial frame and wait until the queue is drained."""
+        # Keep whole samples only; a stray odd byte cannot be valid PCM16
+        usable = len(self._pending) - len(self._pending) % 2
+        frame = bytes(self._pending[:usable])
+        self._pending.clear()
+        if self.silence_gate:
+            frame = self.silence_gate.process(frame, final=True)
+        if frame:
+            await self._enqueue(frame)
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """Stop the sender and discard anything still queued."""
+        if self._sender_task:
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except asyncio.CancelledError:
+                pass
+            self._sender_task = None
+
+        self._pending.clear()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            AUDIO_QUEUE_DEPTH.dec()
+            self.frames_dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for logging and metrics."""
+        stats = {
+            "chunks_received": self.chunks_received,
+            "chunks_merged": self.chunks_merged,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "bytes_sent": self.bytes_sent,
+            "queue_depth": self.queue_depth
+        }
+        if self.silence_gate:
+            stats["silence_gate"] = self.silence_gate.stats()
+        return stats
+
+    async def _enqueue(self, frame: bytes) -> None:
+        """Queue a frame, waiting up to the put timeout when the queue is full."""
+        self.frames_queued += 1
+        try:
+            self._queue.put_nowait(frame)
+            AUDIO_QUEUE_DEPTH.inc()
+            return
+        except asyncio.QueueFull:
+            pass
+
+        try:
+            await asyncio.wait_for(self._queue.put(frame), timeout=self._put_timeout)
+            AUDIO_QUEUE_DEPTH.inc()
+        except asyncio.TimeoutError:
+            self.frames_dropped += 1
+            logger.warning("Upstream audio queue full, dropped %s byte frame", len(frame))
+
+    async def _run_sender(self) -> None:
+        """Drain the queue into the upstream connection."""
+        while True:
+            frame = await self._queue.get()
+            AUDIO_QUEUE_DEPTH.dec()
+            try:
+                await self._send_frame(frame)
+                self.frames_sent += 1
+                self.bytes_sent += len(frame)
+            except Exception as e:
+                self.frames_dropped += 1
+                logger.error("Error sending audio upstream: %s", e)
+            finally:
+                self._queue.task_done()
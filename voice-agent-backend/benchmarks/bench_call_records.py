@@ -0,0 +1,183 @@
+"""
+Benchmark for call record persistence.
+
+Simulates sessions on the event loop that record transcript- and tool-call-
+sized events at --rate events per second in total, while a ticker task
+measures event loop lag (how late a 1 ms sleep wakes up). Runs once without
+recording as a baseline and once with a CallRecorder writing JSON-lines
+segments to a temporary directory, and reports written/dropped counts, the
+per-call cost of record() and the loop lag percentiles of both runs.
+
+A second, saturation run records as fast as possible into a small queue to
+show the writer's ceiling and that overflow is dropped and counted rather
+than blocking the loop.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.bench_call_records
+    python -m benchmarks.bench_call_records --rate 20000 --seconds 10 --fsync-seconds 0
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.load_test import percentile
+from call_records import CallRecorder
+
+TRANSCRIPT = (
+    "There are three houses in Richmond under nine hundred thousand. The first is a "
+    "three bedroom terrace on Church Street listed at eight hundred and fifty thousand."
+)
+ARGUMENTS = '{"location":"Richmond, VIC 3121","max_price":900000,"bedrooms":3}'
+
+
+def session_event(recorder: Optional[CallRecorder], session: str, n: int) -> None:
+    if recorder is None:
+        return
+    if n % 4 == 3:
+        recorder.record(session, "tool_call", turn=n // 4, name="search_properties", call_id=f"call_{n}",
+                        arguments=ARGUMENTS, outcome="ok", duration_ms=212.4)
+    else:
+        recorder.record(session, "transcript", turn=n // 4, role="assistant", item_id=f"item_{n}",
+                        text=TRANSCRIPT)
+
+
+async def measure_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - started - 0.001)
+
+
+async def run_sessions(recorder: Optional[CallRecorder], args: argparse.Namespace) -> Dict:
+    """Record at the target rate from --sessions tasks; return loop lag and record() cost."""
+    per_session_interval = args.sessions / args.rate
+    deadline = time.perf_counter() + args.seconds
+    record_times: List[float] = []
+
+    async def session(index: int) -> None:
+        session_id = f"session{index:04d}"
+        n = 0
+        next_at = time.perf_counter() + per_session_interval * index / args.sessions
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            # Catch up on events missed while sleeping, like a burst of server events
+            while next_at <= time.perf_counter() and next_at < deadline:
+                started = time.perf_counter_ns()
+                session_event(recorder, session_id, n)
+                record_times.append(time.perf_counter_ns() - started)
+                n += 1
+                next_at += per_session_interval
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    lag_ms = [lag * 1000 for lag in lags]
+    return {
+        "events": len(record_times),
+        "events_per_s": int(len(record_times) / elapsed),
+        "record_p50_ns": round(percentile(record_times, 50)),
+        "record_p99_ns": round(percentile(record_times, 99)),
+        "loop_lag_p50_ms": round(percentile(lag_ms, 50), 3),
+        "loop_lag_p99_ms": round(percentile(lag_ms, 99), 3),
+        "loop_lag_max_ms": round(max(lag_ms), 3)
+    }
+
+
+def segment_stats(directory: str) -> Dict:
+    files = [os.path.join(directory, name) for name in os.listdir(directory)]
+    lines = 0
+    for path in files:
+        with open(path, "rb") as f:
+            lines += sum(1 for _ in f)
+    return {"files": len(files), "lines": lines, "bytes": sum(os.path.getsize(path) for path in files)}
+
+
+async def bench_sustained(args: argparse.Namespace) -> Dict:
+    baseline = await run_sessions(None, args)
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = CallRecorder(
+            tmp,
+            segment_max_bytes=args.segment_max_mb * 1024 * 1024,
+            queue_size=args.queue_size,
+            fsync_seconds=args.fsync_seconds
+        )
+        recorder.start()
+        recording = await run_sessions(recorder, args)
+        close_started = time.perf_counter()
+        await asyncio.to_thread(recorder.close)
+        recording["close_ms"] = round((time.perf_counter() - close_started) * 1000, 1)
+        stats = recorder.stats()
+        on_disk = segment_stats(tmp)
+    return {
+        "baseline": baseline,
+        "recording": recording,
+        "recorder": {key: stats[key] for key in ("written", "dropped", "write_errors", "batches", "segments")},
+        "on_disk": on_disk
+    }
+
+
+async def bench_saturation(args: argparse.Namespace) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = CallRecorder(tmp, queue_size=args.saturation_queue_size, fsync_seconds=args.fsync_seconds)
+        recorder.start()
+        started = time.perf_counter()
+        n = 0
+        while time.perf_counter() - started < args.saturation_seconds:
+            for _ in range(1000):
+                session_event(recorder, "flood", n)
+                n += 1
+            # Yield like a busy loop would between events
+            await asyncio.sleep(0)
+        await asyncio.to_thread(recorder.close)
+        elapsed = time.perf_counter() - started
+        stats = recorder.stats()
+    return {
+        "offered": n,
+        "written": stats["written"],
+        "dropped": stats["dropped"],
+        "written_per_s": int(stats["written"] / elapsed),
+        "mean_batch": round(stats["written"] / max(1, stats["batches"]), 1)
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    report = {
+        "rate": args.rate,
+        "sessions": args.sessions,
+        "fsync_seconds": args.fsync_seconds,
+        "sustained": await bench_sustained(args)
+    }
+    if args.saturation_seconds > 0:
+        report["saturation"] = await bench_saturation(args)
+    print(json.dumps(report, indent=2))
+    sustained = report["sustained"]
+    return 0 if sustained["recorder"]["dropped"] == 0 and sustained["on_disk"]["lines"] == sustained["recording"]["events"] else 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=5000, help="Records per second across all sessions")
+    parser.add_argument("--sessions", type=int, default=100, help="Concurrent simulated sessions")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each sustained run")
+    parser.add_argument("--queue-size", type=int, default=10_000, help="Recorder queue size")
+    parser.add_argument("--segment-max-mb", type=int, default=1, help="Segment size (small, to exercise rotation)")
+    parser.add_argument("--fsync-seconds", type=float, default=1.0, help="Sync interval (0 = every batch)")
+    parser.add_argument("--saturation-seconds", type=float, default=2.0, help="Flood run duration (0 to skip)")
+    parser.add_argument("--saturation-queue-size", type=int, default=1000, help="Recorder queue size for the flood run")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,151 @@
+"""
+Benchmark for the local listing store.
+
+Ingests synthetic listings for a number of regions into a fresh SQLite
+store (reporting listings per second, first load and an unchanged re-ingest),
+then runs random filtered searches against it, both directly and through
+RealtyAPIClient.search_properties, and reports their latency. For
+comparison it also times the same searches against the mock RapidAPI
+server at its default latency.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.bench_listing_store
+    python -m benchmarks.bench_listing_store --regions 500 --per-region 150 --queries 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.load_test import free_port, percentile
+from benchmarks.mock_realty import PROPERTY_TYPES, make_listing, start_mock_realty
+from listing_store import ListingStore
+from realty_api import RealtyAPIClient
+
+
+def synthetic_regions(regions: int, per_region: int) -> List[Tuple[str, List[Dict]]]:
+    """Regions named like suburbs, each with its own listings."""
+    return [
+        (f"Suburb {r}", [make_listing(r * 10_000 + i, f"Suburb {r}", str(2000 + r)) for i in range(per_region)])
+        for r in range(regions)
+    ]
+
+
+def random_query(rng: random.Random, regions: int) -> Dict:
+    query = {"location": f"Suburb {rng.randrange(regions)}"}
+    if rng.random() < 0.6:
+        query["max_price"] = rng.randrange(600_000, 2_500_000, 50_000)
+    if rng.random() < 0.3:
+        query["min_price"] = rng.randrange(400_000, 900_000, 50_000)
+    if rng.random() < 0.5:
+        query["bedrooms"] = rng.randint(1, 4)
+    if rng.random() < 0.4:
+        query["property_type"] = rng.choice(PROPERTY_TYPES)
+    return query
+
+
+def summarize_us(samples: List[float]) -> Dict:
+    us = [sample * 1e6 for sample in samples]
+    return {
+        "p50_us": round(percentile(us, 50), 1),
+        "p99_us": round(percentile(us, 99), 1),
+        "max_us": round(max(us), 1)
+    }
+
+
+def bench_ingest(store: ListingStore, data: List[Tuple[str, List[Dict]]]) -> Dict:
+    total = sum(len(listings) for _, listings in data)
+    started = time.perf_counter()
+    for location, listings in data:
+        store.replace_region(location, "BUY", listings)
+    first = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for location, listings in data:
+        store.replace_region(location, "BUY", listings)
+    again = time.perf_counter() - started
+    return {
+        "listings": total,
+        "ingest_listings_per_s": int(total / first),
+        "reingest_unchanged_listings_per_s": int(total / again),
+        "db_bytes": os.path.getsize(store.path)
+    }
+
+
+async def bench_queries(store: ListingStore, args: argparse.Namespace) -> Dict:
+    rng = random.Random(1)
+    queries = [random_query(rng, args.regions) for _ in range(args.queries)]
+
+    store_times = []
+    hits = 0
+    for query in queries:
+        started = time.perf_counter()
+        result = store.search(query["location"], "BUY", query.get("min_price"), query.get("max_price"),
+                              query.get("bedrooms"), query.get("property_type"))
+        store_times.append(time.perf_counter() - started)
+        hits += result is not None
+
+    client = RealtyAPIClient("bench", listing_store=store)
+    client_times = []
+    for query in queries:
+        started = time.perf_counter()
+        await client.search_properties(**query)
+        client_times.append(time.perf_counter() - started)
+    await client.close()
+
+    return {
+        "queries": len(queries),
+        "hit_rate": round(hits / len(queries), 3),
+        "store_search": summarize_us(store_times),
+        "client_search_properties": summarize_us(client_times)
+    }
+
+
+async def bench_live(args: argparse.Namespace) -> Dict:
+    """The same kind of searches against the mock RapidAPI server."""
+    port = free_port()
+    runner = await start_mock_realty("127.0.0.1", port, args.live_latency_ms, args.live_latency_ms / 3)
+    client = RealtyAPIClient("bench", base_url=f"http://127.0.0.1:{port}", search_ttl_seconds=0)
+    rng = random.Random(2)
+    times = []
+    try:
+        for _ in range(args.live_queries):
+            started = time.perf_counter()
+            await client.search_properties(**random_query(rng, args.regions))
+            times.append(time.perf_counter() - started)
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return {"queries": len(times), **summarize_us(times)}
+
+
+async def main(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ListingStore(os.path.join(tmp, "listings.sqlite3"))
+        ingest = bench_ingest(store, synthetic_regions(args.regions, args.per_region))
+        queries = await bench_queries(store, args)
+    report = {"ingest": ingest, "local": queries}
+    if args.live_queries:
+        report["live_mock"] = await bench_live(args)
+    print(json.dumps(report, indent=2))
+    return 0 if queries["hit_rate"] == 1.0 else 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=200, help="Locations in the store")
+    parser.add_argument("--per-region", type=int, default=100, help="Listings per location")
+    parser.add_argument("--queries", type=int, default=5000, help="Local searches to time")
+    parser.add_argument("--live-queries", type=int, default=20, help="Searches against the mock API (0 to skip)")
+    parser.add_argument("--live-latency-ms", type=float, default=150.0, help="Mock API response latency")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
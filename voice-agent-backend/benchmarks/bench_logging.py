@@ -0,0 +1,151 @@
+"""
+Benchmark for logging overhead on the event loop thread.
+
+Times one logger call per audio event, as seen by the caller, for:
+
+- sync: a StreamHandler writing straight to a sink that takes
+  --sink-latency-us per write (the basicConfig setup this replaced);
+- queued: the logging_setup queue handler with a background writer to the
+  same slow sink;
+- rate_limited: the queued handler once the per-event rate limit is
+  exhausted, so records are dropped before they are queued;
+- disabled_fstring / disabled_lazy: a DEBUG call with DEBUG disabled,
+  formatting the message eagerly versus passing arguments.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --events 50000 --sink-latency-us 200
+"""
+
+import argparse
+import json
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueListener
+from typing import Callable, Dict, List
+
+from benchmarks.load_test import percentile
+from logging_setup import LOG_FORMAT, ContextFilter, NonBlockingQueueHandler, SamplingFilter, bind_session
+
+
+class SlowSink:
+    """
+    A text stream whose writes block for a fixed time, like a full stderr
+    pipe. It sleeps rather than spins so that, like real I/O, it releases
+    the GIL while blocked.
+    """
+
+    def __init__(self, latency_us: float):
+        self.latency = latency_us / 1e6
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        self.writes += 1
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def fresh_logger(name: str, handler: logging.Handler, level: int = logging.INFO) -> logging.Logger:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def time_calls(events: int, call: Callable[[int], None]) -> Dict:
+    samples: List[float] = []
+    for i in range(events):
+        started = time.perf_counter_ns()
+        call(i)
+        samples.append(time.perf_counter_ns() - started)
+    return {
+        "mean_ns": round(sum(samples) / len(samples)),
+        "p50_ns": round(percentile(samples, 50)),
+        "p99_ns": round(percentile(samples, 99)),
+        "max_ns": round(max(samples))
+    }
+
+
+def event(i: int) -> Dict:
+    return {"type": "response.audio.delta", "item_id": f"item_{i // 50}", "delta_bytes": 4800}
+
+
+def bench_sync(args: argparse.Namespace) -> Dict:
+    handler = logging.StreamHandler(SlowSink(args.sink_latency_us))
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logger = fresh_logger("sync", handler)
+    return time_calls(args.events, lambda i: logger.info("OpenAI event: %s", event(i)))
+
+
+def queued_logger(name: str, args: argparse.Namespace, rate_per_second: float):
+    sink = SlowSink(args.sink_latency_us)
+    output = logging.StreamHandler(sink)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=args.queue_size))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(rate_per_second, burst=50))
+    listener = QueueListener(handler.queue, output)
+    return fresh_logger(name, handler), listener, sink
+
+
+def bench_queued(args: argparse.Namespace) -> Dict:
+    # No rate limit, so every record reaches the queue (or is dropped when it is full)
+    logger, listener, sink = queued_logger("queued", args, rate_per_second=0)
+    listener.start()
+    try:
+        result = time_calls(args.events, lambda i: logger.info("OpenAI event: %s", event(i)))
+    finally:
+        listener.stop()
+    result["written"] = sink.writes
+    return result
+
+
+def bench_rate_limited(args: argparse.Namespace) -> Dict:
+    logger, listener, sink = queued_logger("rate_limited", args, rate_per_second=20)
+    listener.start()
+    try:
+        result = time_calls(args.events, lambda i: logger.info("OpenAI event: %s", event(i)))
+    finally:
+        listener.stop()
+    result["written"] = sink.writes
+    return result
+
+
+def bench_disabled(args: argparse.Namespace) -> Dict:
+    logger = fresh_logger("disabled", logging.NullHandler())
+    return {
+        "disabled_fstring": time_calls(args.events, lambda i: logger.debug(f"OpenAI event: {event(i)}")),
+        "disabled_lazy": time_calls(args.events, lambda i: logger.debug("OpenAI event: %s", event(i)))
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    bind_session("bench")
+    report = {
+        "events": args.events,
+        "sink_latency_us": args.sink_latency_us,
+        "sync": bench_sync(args),
+        "queued": bench_queued(args),
+        "rate_limited": bench_rate_limited(args),
+        **bench_disabled(args)
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000, help="Logger calls per case")
+    parser.add_argument("--sink-latency-us", type=float, default=50.0, help="Time each write to the sink takes")
+    parser.add_argument("--queue-size", type=int, default=10_000, help="Queue size of the queued handler")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,89 @@
+"""
+Microbenchmark for the streaming resampler.
+
+Feeds a few seconds of synthetic speech-band audio through
+StreamingResampler in client-sized chunks for each rate pair and reports
+the time per chunk and the share of one CPU core a single real-time stream
+needs. Also checks that chunked output matches converting in one piece.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.bench_resampler
+    python -m benchmarks.bench_resampler --chunk-ms 20 --seconds 10
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from resampler import StreamingResampler
+
+UPSTREAM_RATE = 24000
+DEFAULT_PAIRS = [
+    (8000, UPSTREAM_RATE), (16000, UPSTREAM_RATE), (44100, UPSTREAM_RATE), (48000, UPSTREAM_RATE),
+    (UPSTREAM_RATE, 8000), (UPSTREAM_RATE, 16000), (UPSTREAM_RATE, 48000)
+]
+
+
+def synthetic_audio(rate: int, seconds: float) -> bytes:
+    """Mix of tones and noise in the speech band, as PCM16."""
+    rng = np.random.default_rng(rate)
+    t = np.arange(int(rate * seconds)) / rate
+    signal = sum(np.sin(2 * np.pi * f * t) for f in (180, 440, 1200, 3100)) * 3000
+    signal += rng.standard_normal(len(t)) * 500
+    return np.clip(signal, -32768, 32767).astype("<i2").tobytes()
+
+
+def bench_pair(in_rate: int, out_rate: int, seconds: float, chunk_ms: int, taps: int) -> Dict:
+    """Time one rate pair and verify chunked output against one-shot output."""
+    audio = synthetic_audio(in_rate, seconds)
+    chunk_bytes = in_rate * chunk_ms // 1000 * 2
+    chunks = [audio[i:i + chunk_bytes] for i in range(0, len(audio), chunk_bytes)]
+
+    resampler = StreamingResampler(in_rate, out_rate, taps)
+    per_chunk: List[float] = []
+    pieces = []
+    cpu_started = time.process_time()
+    for chunk in chunks:
+        started = time.perf_counter()
+        pieces.append(resampler.process(chunk))
+        per_chunk.append(time.perf_counter() - started)
+    cpu_seconds = time.process_time() - cpu_started
+
+    whole = StreamingResampler(in_rate, out_rate, taps).process(audio)
+    per_chunk.sort()
+    return {
+        "pair": f"{in_rate}->{out_rate}",
+        "chunks": len(chunks),
+        "chunk_us_p50": round(per_chunk[len(per_chunk) // 2] * 1e6, 1),
+        "chunk_us_p99": round(per_chunk[int(len(per_chunk) * 0.99)] * 1e6, 1),
+        "cpu_share_per_stream": round(cpu_seconds / seconds, 5),
+        "streams_per_core": int(seconds / cpu_seconds) if cpu_seconds else None,
+        "chunked_matches_whole": b"".join(pieces) == whole
+    }
+
+
+def parse_pairs(value: str) -> List[Tuple[int, int]]:
+    """Parse '48000:24000,16000:24000' into rate pairs."""
+    return [tuple(int(rate) for rate in pair.split(":")) for pair in value.split(",")]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=parse_pairs, default=DEFAULT_PAIRS,
+                        help="Comma-separated in:out rate pairs")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Audio per pair")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="Chunk size fed to the resampler")
+    parser.add_argument("--taps", type=int, default=32, help="Filter taps per phase")
+    args = parser.parse_args()
+
+    results = [bench_pair(a, b, args.seconds, args.chunk_ms, args.taps) for a, b in args.pairs]
+    print(json.dumps(results, indent=2))
+    return 0 if all(result["chunked_matches_whole"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark for tool output encoding.
+
+Compares the "full" and "compact-1" tool output schemas in two ways:
+
+- payload: encodes search and detail results built from the mock realty
+  listings and reports bytes, estimated tokens and encode time per call;
+- ttfa: runs the load test (mock Realtime and RapidAPI servers, every turn
+  answered through a search_properties call) once per schema and reports
+  time to first audio. The mock Realtime server delays the first audio by
+  --prefill-ms-per-kb for each KB of function output, standing in for the
+  model reading the result before it speaks.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.bench_tool_output
+    python -m benchmarks.bench_tool_output --skip-ttfa
+    python -m benchmarks.bench_tool_output --sessions 20 --prefill-ms-per-kb 120
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks import load_test
+from benchmarks.mock_realty import make_listing
+from config import Settings
+from realty_api import RealtyAPIClient
+from tool_output import TOOL_OUTPUT_SCHEMAS, ToolOutputEncoder, estimate_tokens
+
+
+def sample_results(count: int) -> Dict[str, List[Dict]]:
+    """Formatted search and detail results, as the tools return them."""
+    client = RealtyAPIClient("bench")
+    return {
+        "search_properties": [
+            client._format_search_results({"data": [make_listing(n * 100 + i, f"Suburb {n}") for i in range(10)]})
+            for n in range(count)
+        ],
+        "get_property_details": [
+            client._format_property_details({"data": make_listing(n)}) for n in range(count)
+        ]
+    }
+
+
+def bench_payloads(count: int) -> Dict:
+    # The default budgets from Settings
+    fields = Settings.model_fields
+    budgets = {
+        "search_properties": fields["tool_output_search_budget_tokens"].default,
+        "get_property_details": fields["tool_output_details_budget_tokens"].default
+    }
+    results = sample_results(count)
+    report = {}
+    for schema in TOOL_OUTPUT_SCHEMAS:
+        encoder = ToolOutputEncoder(schema, budgets)
+        per_tool = {}
+        for tool, samples in results.items():
+            started = time.perf_counter()
+            encoded = [encoder.encode(tool, result) for result in samples]
+            elapsed = time.perf_counter() - started
+            per_tool[tool] = {
+                "bytes_mean": round(statistics.fmean(len(text.encode()) for text in encoded)),
+                "tokens_est_mean": round(statistics.fmean(estimate_tokens(text) for text in encoded)),
+                "encode_us": round(elapsed / len(samples) * 1e6, 1)
+            }
+        report[schema] = per_tool
+    return report
+
+
+async def bench_ttfa(args: argparse.Namespace) -> Dict:
+    report = {}
+    for schema in TOOL_OUTPUT_SCHEMAS:
+        load_args = load_test.build_parser().parse_args([
+            "--sessions", str(args.sessions),
+            "--turns", str(args.turns),
+            "--function-call-every", "1",
+            "--prefill-ms-per-kb", str(args.prefill_ms_per_kb),
+            "--realty-latency-ms", "20",
+            "--realty-jitter-ms", "0",
+            "--env", f"TOOL_OUTPUT_SCHEMA={schema}",
+            # Every search must reach the mock API, not the result cache
+            "--env", "CACHE_SEARCH_TTL_SECONDS=0"
+        ])
+        level = (await load_test.run_load_test(load_args))["levels"][0]
+        report[schema] = {
+            key: level[key] for key in ("turns_measured", "errors", "ttfa_p50_ms", "ttfa_p95_ms", "ttfa_mean_ms")
+        }
+    return report
+
+
+async def main(args: argparse.Namespace) -> int:
+    report = {"payload": bench_payloads(args.samples)}
+    if not args.skip_ttfa:
+        report["ttfa"] = await bench_ttfa(args)
+    print(json.dumps(report, indent=2))
+    return 1 if any(level["errors"] for level in report.get("ttfa", {}).values()) else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=200, help="Results encoded per tool and schema")
+    parser.add_argument("--skip-ttfa", action="store_true", help="Only measure payloads")
+    parser.add_argument("--sessions", type=int, default=5, help="Concurrent load test sessions per schema")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--prefill-ms-per-kb", type=float, default=80.0,
+                        help="Mock model reading time per KB of function output")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(main(parse_args())))
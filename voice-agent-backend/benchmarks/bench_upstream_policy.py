@@ -0,0 +1,180 @@
+"""
+Benchmark for the RapidAPI request policy.
+
+Runs property searches from --callers concurrent callers through a
+RealtyAPIClient against the local mock RapidAPI, with failures injected
+into the mock, in three scenarios:
+
+- tail: a fraction of responses take --slow-ms; compares search latency
+  without and with hedging.
+- flaky: a fraction of responses are 503s and 429s; compares how many
+  searches get an answer without and with retries.
+- outage: every response fails after the cache was warmed and expired;
+  shows the circuit opening, how fast requests then fail and how many are
+  answered from stale results.
+
+Searches bypass the result cache (except in the outage scenario's
+fallback) so every one goes upstream.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.bench_upstream_policy
+    python -m benchmarks.bench_upstream_policy --requests 1000 --slow-rate 0.02 --hedge-after-ms 250
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List
+
+from prometheus_client import REGISTRY
+
+from benchmarks.load_test import free_port, percentile
+from benchmarks.mock_realty import SUBURBS, start_mock_realty
+from realty_api import STALE_NOTE, UNAVAILABLE_MESSAGE, RealtyAPIClient
+
+
+def counter(name: str, labels: Dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(f"{name}_total", labels) or 0.0
+
+
+def policy_counters() -> Dict[str, float]:
+    return {
+        "retries": sum(
+            counter("rapidapi_retries", {"endpoint": "/properties/list", "reason": reason})
+            for reason in ("rate_limited", "server_error", "network_error")
+        ),
+        "hedges_sent": counter("rapidapi_hedges", {"outcome": "sent"}),
+        "hedges_won": counter("rapidapi_hedges", {"outcome": "won"}),
+        "circuit_open": counter("rapidapi_requests", {"endpoint": "/properties/list", "outcome": "circuit_open"})
+    }
+
+
+async def run_searches(client: RealtyAPIClient, args: argparse.Namespace, use_cache: bool = False) -> Dict:
+    """Run --requests searches from --callers callers and summarize the answers."""
+    latencies: List[float] = []
+    answers = {"ok": 0, "stale": 0, "unavailable": 0}
+    remaining = iter(range(args.requests))
+    before = policy_counters()
+
+    async def caller() -> None:
+        for n in remaining:
+            started = time.perf_counter()
+            result = await client.search_properties(SUBURBS[n % len(SUBURBS)], use_cache=use_cache)
+            latencies.append(time.perf_counter() - started)
+            summary = result["summary"]
+            if summary.startswith(STALE_NOTE):
+                answers["stale"] += 1
+            elif UNAVAILABLE_MESSAGE in summary:
+                answers["unavailable"] += 1
+            else:
+                answers["ok"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(args.callers)))
+    elapsed = time.perf_counter() - started
+    after = policy_counters()
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        **answers,
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p95_ms": round(percentile(ms, 95), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "max_ms": round(max(ms), 1),
+        "requests_per_s": round(len(ms) / elapsed, 1),
+        **{key: int(after[key] - before[key]) for key in after},
+        "circuit": client.circuit.state
+    }
+
+
+async def with_client(port: int, args: argparse.Namespace, **policy) -> RealtyAPIClient:
+    options = {
+        "rate_limit_per_second": args.rate_limit,
+        "rate_limit_burst": args.callers,
+        "retry_attempts": 0,
+        "hedge_after_seconds": 0.0,
+        "circuit_failure_threshold": 0,
+        **policy
+    }
+    client = RealtyAPIClient("bench", base_url=f"http://127.0.0.1:{port}", **options)
+    await client.start()
+    return client
+
+
+async def scenario(args: argparse.Namespace, mock: Dict, runs: Dict[str, Dict]) -> Dict:
+    """Run the searches once per policy against a mock with the given failures."""
+    port = free_port()
+    runner = await start_mock_realty("127.0.0.1", port, args.latency_ms, args.latency_ms / 3, **mock)
+    report = {}
+    try:
+        for name, policy in runs.items():
+            client = await with_client(port, args, **policy)
+            try:
+                report[name] = await run_searches(client, args)
+            finally:
+                await client.close()
+    finally:
+        await runner.cleanup()
+    return report
+
+
+async def bench_outage(args: argparse.Namespace) -> Dict:
+    healthy_port, failing_port = free_port(), free_port()
+    healthy = await start_mock_realty("127.0.0.1", healthy_port, args.latency_ms, args.latency_ms / 3)
+    failing = await start_mock_realty("127.0.0.1", failing_port, args.latency_ms, args.latency_ms / 3, error_rate=1.0)
+    client = await with_client(
+        healthy_port, args,
+        retry_attempts=args.retries,
+        circuit_failure_threshold=args.circuit_threshold,
+        circuit_reset_seconds=60.0
+    )
+    try:
+        # Warm the cache with half the suburbs, then let it expire
+        client.search_ttl_seconds = 0.001
+        for suburb in SUBURBS[::2]:
+            await client.search_properties(suburb)
+        await asyncio.sleep(0.01)
+        client.base_url = f"http://127.0.0.1:{failing_port}"
+        return await run_searches(client, args, use_cache=True)
+    finally:
+        await client.close()
+        await healthy.cleanup()
+        await failing.cleanup()
+
+
+async def main(args: argparse.Namespace) -> int:
+    report = {
+        "callers": args.callers,
+        "requests": args.requests,
+        "tail": await scenario(
+            args, {"slow_rate": args.slow_rate, "slow_ms": args.slow_ms},
+            {"no_hedge": {}, "hedge": {"hedge_after_seconds": args.hedge_after_ms / 1000}}
+        ),
+        "flaky": await scenario(
+            args, {"error_rate": args.error_rate, "throttle_rate": args.error_rate / 4},
+            {"no_retry": {}, "retry": {"retry_attempts": args.retries}}
+        ),
+        "outage": await bench_outage(args)
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=20, help="Concurrent callers")
+    parser.add_argument("--requests", type=int, default=400, help="Searches per run")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Mock response latency")
+    parser.add_argument("--rate-limit", type=float, default=200.0, help="Token bucket rate (requests per second)")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Fraction of slow responses (tail scenario)")
+    parser.add_argument("--slow-ms", type=float, default=1500.0, help="Latency of slow responses")
+    parser.add_argument("--hedge-after-ms", type=float, default=300.0, help="Hedge delay (tail scenario)")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Fraction of 503s (flaky scenario; a quarter as many 429s)")
+    parser.add_argument("--retries", type=int, default=2, help="Retry attempts (flaky and outage scenarios)")
+    parser.add_argument("--circuit-threshold", type=int, default=5, help="Failures that open the circuit (outage scenario)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
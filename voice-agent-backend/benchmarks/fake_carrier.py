@@ -0,0 +1,242 @@
+"""
+Fake phone carrier for /ws/telephony.
+
+Plays the carrier side of a Twilio-style media stream: sends the connected
+and start events, streams 20 ms mu-law media frames in real time for the
+whole call (speech for each caller turn, silence in between), echoes marks
+back as if the audio had played, and records the agent's media, clear
+events and time to first audio per turn. With --barge-in the caller
+starts talking again as soon as the agent answers, which should produce a
+clear event for every interrupted turn.
+
+By default it starts the mock Realtime server (with its energy-based stand-in
+for server VAD) and a backend; pass --url to call a backend that is already
+running instead.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.fake_carrier --calls 5 --turns 3
+    python -m benchmarks.fake_carrier --barge-in
+    python -m benchmarks.fake_carrier --turns 4 --drop-every-turns 2
+    python -m benchmarks.fake_carrier --url ws://127.0.0.1:8000/ws/telephony
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import statistics
+import sys
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+import websockets
+
+from benchmarks.load_test import free_port, percentile, start_backend, stop_backend, wait_for_backend
+from benchmarks.mock_realtime import add_script_arguments, script_from_args, start_mock_realtime
+from telephony import TELEPHONY_SAMPLE_RATE, pcm16_to_ulaw
+
+logger = logging.getLogger("fake_carrier")
+
+FRAME_MS = 20
+FRAME_BYTES = TELEPHONY_SAMPLE_RATE * FRAME_MS // 1000  # one mu-law byte per sample
+
+
+def speech_frames(speech_ms: int) -> List[str]:
+    """A voiced tone as base64 mu-law media payloads of FRAME_MS each."""
+    t = np.arange(TELEPHONY_SAMPLE_RATE * speech_ms // 1000) / TELEPHONY_SAMPLE_RATE
+    pcm = (np.sin(2 * np.pi * 220 * t) * 8000).astype("<i2").tobytes()
+    ulaw = pcm16_to_ulaw(pcm)
+    return [
+        base64.b64encode(ulaw[i:i + FRAME_BYTES]).decode("ascii")
+        for i in range(0, len(ulaw), FRAME_BYTES)
+    ]
+
+
+SILENCE_FRAME = base64.b64encode(pcm16_to_ulaw(bytes(FRAME_BYTES * 2))).decode("ascii")
+
+
+class FakeCall:
+    """One phone call: a caller speaking turns into the media stream."""
+
+    def __init__(self, url: str, turns: int, speech_ms: int, barge_in: bool):
+        self.url = url
+        self.turns = turns
+        self.barge_in = barge_in
+        self.frames = speech_frames(speech_ms)
+        self.stream_sid = f"MZ{uuid.uuid4().hex}"
+        self.call_sid = f"CA{uuid.uuid4().hex}"
+
+        self.ttfa_ms: List[float] = []
+        self.media_bytes = 0
+        self.marks = 0
+        self.clears = 0
+        self.error: Optional[str] = None
+
+        self._sequence = 0
+        self._timestamp_ms = 0
+        self._turn_ended_at: Optional[float] = None
+        self._speech: deque = deque()
+        self._spoken = asyncio.Event()
+        self._first_media = asyncio.Event()
+        self._response_played = asyncio.Event()
+
+    async def run(self) -> None:
+        try:
+            async with websockets.connect(self.url, max_size=None, compression=None) as ws:
+                await self._send(ws, {"event": "connected", "protocol": "Call", "version": "1.0.0"})
+                await self._send(ws, {
+                    "event": "start",
+                    "start": {
+                        "streamSid": self.stream_sid,
+                        "callSid": self.call_sid,
+                        "tracks": ["inbound"],
+                        "customParameters": {},
+                        "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": TELEPHONY_SAMPLE_RATE, "channels": 1}
+                    }
+                })
+                tasks = [asyncio.create_task(self._receive(ws)), asyncio.create_task(self._stream_media(ws))]
+                try:
+                    for turn in range(self.turns):
+                        await self._speak()
+                        await asyncio.wait_for(self._first_media.wait(), timeout=30)
+                        if not (self.barge_in and turn < self.turns - 1):
+                            await asyncio.wait_for(self._response_played.wait(), timeout=30)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                await self._send(ws, {"event": "stop", "stop": {"callSid": self.call_sid}})
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    async def _send(self, ws, message: Dict) -> None:
+        self._sequence += 1
+        message = {**message, "sequenceNumber": str(self._sequence)}
+        message.setdefault("streamSid", self.stream_sid)
+        await ws.send(json.dumps(message))
+
+    async def _speak(self) -> None:
+        """Say one turn; returns once the last speech frame has been sent."""
+        self._first_media.clear()
+        self._response_played.clear()
+        self._turn_ended_at = None
+        self._spoken.clear()
+        self._speech.extend(self.frames)
+        await self._spoken.wait()
+
+    async def _stream_media(self, ws) -> None:
+        """Send a media frame every FRAME_MS, like a live phone line."""
+        chunk = 0
+        next_at = time.perf_counter()
+        while True:
+            payload = self._speech.popleft() if self._speech else SILENCE_FRAME
+            chunk += 1
+            await self._send(ws, {
+                "event": "media",
+                "media": {"track": "inbound", "chunk": str(chunk), "timestamp": str(self._timestamp_ms), "payload": payload}
+            })
+            self._timestamp_ms += FRAME_MS
+            if payload is not SILENCE_FRAME and not self._speech:
+                self._turn_ended_at = time.perf_counter()
+                self._spoken.set()
+            next_at += FRAME_MS / 1000
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+    async def _receive(self, ws) -> None:
+        async for raw in ws:
+            message = json.loads(raw)
+            event = message.get("event")
+            if event == "media":
+                self.media_bytes += len(base64.b64decode(message["media"]["payload"]))
+                if self._turn_ended_at is not None and not self._first_media.is_set():
+                    self.ttfa_ms.append((time.perf_counter() - self._turn_ended_at) * 1000)
+                    self._first_media.set()
+            elif event == "mark":
+                # Pretend the audio played out and echo the mark, as a carrier does
+                self.marks += 1
+                await self._send(ws, {"event": "mark", "mark": message.get("mark", {})})
+                self._response_played.set()
+            elif event == "clear":
+                self.clears += 1
+
+
+async def run_calls(url: str, args: argparse.Namespace) -> Dict:
+    calls = [FakeCall(url, args.turns, args.speech_ms, args.barge_in) for _ in range(args.calls)]
+    started = time.perf_counter()
+    await asyncio.gather(*(call.run() for call in calls))
+
+    ttfa = [value for call in calls for value in call.ttfa_ms]
+    errors = [call.error for call in calls if call.error]
+    expected_clears = (args.turns - 1) * len(calls) if args.barge_in else 0
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+
+    return {
+        "calls": len(calls),
+        "errors": len(errors),
+        "sample_error": errors[0] if errors else None,
+        "turns_measured": len(ttfa),
+        "ttfa_p50_ms": ms(percentile(ttfa, 50)),
+        "ttfa_p95_ms": ms(percentile(ttfa, 95)),
+        "ttfa_mean_ms": ms(statistics.fmean(ttfa)) if ttfa else None,
+        "agent_audio_seconds": round(sum(call.media_bytes for call in calls) / TELEPHONY_SAMPLE_RATE, 2),
+        "marks": sum(call.marks for call in calls),
+        "clears": sum(call.clears for call in calls),
+        "expected_clears": expected_clears,
+        "duration_s": round(time.perf_counter() - started, 2)
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.url:
+        report = await run_calls(args.url, args)
+    else:
+        realtime_port, backend_port = free_port(), free_port()
+        if not args.server_vad_silence_ms:
+            args.server_vad_silence_ms = 300
+        script = script_from_args(args)
+        realtime_server = await start_mock_realtime("127.0.0.1", realtime_port, script)
+        backend = start_backend(backend_port, {
+            "OPENAI_API_KEY": "fake-carrier",
+            "OPENAI_REALTIME_BASE_URL": f"ws://127.0.0.1:{realtime_port}",
+            **dict(item.split("=", 1) for item in args.env)
+        }, args.verbose)
+        try:
+            await wait_for_backend(f"http://127.0.0.1:{backend_port}")
+            report = await run_calls(f"ws://127.0.0.1:{backend_port}/ws/telephony", args)
+            report.update(
+                upstream_connections=script.connections,
+                upstream_drops=script.drops,
+                items_replayed=script.items_replayed
+            )
+        finally:
+            await stop_backend(backend)
+            realtime_server.close()
+
+    print(json.dumps(report, indent=2))
+    failed = report["errors"] or report["clears"] < report["expected_clears"] or not report["turns_measured"]
+    return 1 if failed else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Telephony endpoint of a running backend (default: start one with mocks)")
+    parser.add_argument("--calls", type=int, default=1, help="Concurrent calls")
+    parser.add_argument("--turns", type=int, default=3, help="Caller turns per call")
+    parser.add_argument("--speech-ms", type=int, default=1000, help="Caller audio per turn")
+    parser.add_argument("--barge-in", action="store_true", help="Interrupt the agent as soon as it starts talking")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the backend (repeatable)")
+    parser.add_argument("--verbose", action="store_true", help="Show backend logs")
+    add_script_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logging.getLogger("websockets").setLevel(logging.WARNING)
+    sys.exit(asyncio.run(main(parse_args())))
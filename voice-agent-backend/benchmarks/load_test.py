@@ -0,0 +1,325 @@
+"""
+Headless load test for /ws/voice.
+
+Starts the mock Realtime and RapidAPI servers, launches the backend as a
+single uvicorn worker pointed at them, and opens N synthetic clients that
+stream PCM16 in real time and measure time to first audio per turn. Each
+concurrency level reports p50/p95/p99 time to first audio plus the worker's
+CPU and memory per session.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.load_test --sessions 10,50,100 --turns 3
+    python -m benchmarks.load_test --sessions 50 --max-p95-ms 600   # CI gate
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+import websockets
+
+from benchmarks.mock_realtime import add_script_arguments, script_from_args, start_mock_realtime
+from benchmarks.mock_realty import start_mock_realty
+
+logger = logging.getLogger("load_test")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 24000
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+class ProcessSampler:
+    """Reads CPU time and resident memory of a process from /proc (Linux)."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            # utime and stime are fields 14 and 15 of the full stat line
+            return (int(fields[11]) + int(fields[12])) / self._ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_bytes(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            return None
+        return None
+
+
+class SyntheticClient:
+    """One caller: streams speech-sized PCM16 turns and times the replies."""
+
+    def __init__(self, url: str, turns: int, speech_ms: int, chunk_ms: int, binary: bool):
+        self.url = url
+        self.turns = turns
+        self.speech_ms = speech_ms
+        self.chunk_ms = chunk_ms
+        self.binary = binary
+        self.ttfa_ms: List[float] = []
+        self.error: Optional[str] = None
+
+    async def run(self, connected: asyncio.Event, start: asyncio.Event) -> None:
+        chunk = bytes(SAMPLE_RATE * self.chunk_ms // 1000 * 2)
+        chunks_per_turn = max(1, self.speech_ms // self.chunk_ms)
+        try:
+            async with websockets.connect(self.url, max_size=None, compression=None) as ws:
+                if self.binary:
+                    await ws.send(json.dumps({"type": "client_config", "audio_mode": "binary"}))
+                connected.set()
+                await start.wait()
+
+                for _ in range(self.turns):
+                    for _ in range(chunks_per_turn):
+                        if self.binary:
+                            await ws.send(chunk)
+                        else:
+                            await ws.send(json.dumps({"type": "audio", "audio": base64.b64encode(chunk).decode()}))
+                        await asyncio.sleep(self.chunk_ms / 1000)
+
+                    committed_at = time.perf_counter()
+                    await ws.send(json.dumps({"type": "audio_commit"}))
+                    await self._await_reply(ws, committed_at)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            connected.set()
+
+    async def _await_reply(self, ws, committed_at: float) -> None:
+        """Wait for the turn's audio reply, recording time to first audio."""
+        got_audio = False
+        while True:
+            raw = await asyncio.wait_for(ws.recv(), timeout=30)
+            if isinstance(raw, bytes):
+                continue
+            event_type = json.loads(raw).get("type")
+            if event_type == "response.audio.delta" and not got_audio:
+                got_audio = True
+                self.ttfa_ms.append((time.perf_counter() - committed_at) * 1000)
+            elif event_type == "response.done" and got_audio:
+                return
+
+
+def start_backend(port: int, env: Dict[str, str], verbose: bool = False) -> subprocess.Popen:
+    """Launch the backend as a single uvicorn worker."""
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        stdout=None if verbose else subprocess.DEVNULL,
+        stderr=None if verbose else subprocess.DEVNULL
+    )
+
+
+async def stop_backend(backend: subprocess.Popen, timeout: float = 10.0) -> None:
+    """
+    Stop the backend, killing it if it doesn't exit in time.
+    Waits without blocking the loop, so in-process mock servers can still
+    answer the backend's closing handshakes.
+    """
+    backend.terminate()
+    deadline = time.monotonic() + timeout
+    while backend.poll() is None:
+        if time.monotonic() > deadline:
+            backend.kill()
+            break
+        await asyncio.sleep(0.1)
+
+
+async def wait_for_backend(base_url: str, timeout: float = 30.0) -> None:
+    """Poll /health until the backend answers."""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Backend did not become healthy")
+
+
+async def run_level(args: argparse.Namespace, ws_url: str, sampler: ProcessSampler, sessions: int) -> Dict:
+    """Run one concurrency level and summarize it."""
+    clients = [
+        SyntheticClient(ws_url, args.turns, args.speech_ms, args.chunk_ms, not args.json_audio)
+        for _ in range(sessions)
+    ]
+    connected = [asyncio.Event() for _ in clients]
+    start = asyncio.Event()
+
+    rss_before = sampler.rss_bytes()
+    tasks = [asyncio.create_task(c.run(e, start)) for c, e in zip(clients, connected)]
+    await asyncio.gather(*(e.wait() for e in connected))
+    rss_connected = sampler.rss_bytes()
+
+    cpu_before = sampler.cpu_seconds()
+    started = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    cpu_after = sampler.cpu_seconds()
+
+    ttfa = [value for c in clients for value in c.ttfa_ms]
+    errors = [c.error for c in clients if c.error]
+    ok_sessions = sessions - len(errors)
+
+    cpu_per_session = None
+    if cpu_before is not None and cpu_after is not None and ok_sessions:
+        cpu_per_session = (cpu_after - cpu_before) / ok_sessions / elapsed
+
+    mem_per_session = None
+    if rss_before is not None and rss_connected is not None and sessions:
+        mem_per_session = (rss_connected - rss_before) / sessions
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+
+    return {
+        "sessions": sessions,
+        "sessions_ok": ok_sessions,
+        "errors": len(errors),
+        "sample_error": errors[0] if errors else None,
+        "turns_measured": len(ttfa),
+        "ttfa_p50_ms": ms(percentile(ttfa, 50)),
+        "ttfa_p95_ms": ms(percentile(ttfa, 95)),
+        "ttfa_p99_ms": ms(percentile(ttfa, 99)),
+        "ttfa_mean_ms": ms(statistics.fmean(ttfa)) if ttfa else None,
+        "cpu_cores_per_session": round(cpu_per_session, 5) if cpu_per_session is not None else None,
+        "memory_kib_per_session": round(mem_per_session / 1024, 1) if mem_per_session is not None else None,
+        "duration_s": round(elapsed, 2)
+    }
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict:
+    """Start the mocks and backend, run every concurrency level and return the report."""
+    realtime_port, realty_port, backend_port = free_port(), free_port(), free_port()
+
+    realtime_server = await start_mock_realtime("127.0.0.1", realtime_port, script_from_args(args))
+    realty_runner = await start_mock_realty("127.0.0.1", realty_port, args.realty_latency_ms, args.realty_jitter_ms)
+
+    env = {
+        "OPENAI_API_KEY": "load-test",
+        "OPENAI_REALTIME_BASE_URL": f"ws://127.0.0.1:{realtime_port}",
+        "RAPIDAPI_KEY": "load-test",
+        "RAPIDAPI_BASE_URL": f"http://127.0.0.1:{realty_port}",
+        "REALTIME_POOL_SIZE": str(args.pool_size),
+        **dict(item.split("=", 1) for item in args.env)
+    }
+    backend = start_backend(backend_port, env, args.verbose)
+
+    levels = []
+    try:
+        await wait_for_backend(f"http://127.0.0.1:{backend_port}")
+        sampler = ProcessSampler(backend.pid)
+        ws_url = f"ws://127.0.0.1:{backend_port}/ws/voice"
+
+        for sessions in args.sessions:
+            result = await run_level(args, ws_url, sampler, sessions)
+            levels.append(result)
+            logger.info(json.dumps(result))
+
+            if _breached(result, args.max_p95_ms) and args.stop_on_breach:
+                break
+            await asyncio.sleep(args.settle_seconds)
+    finally:
+        await stop_backend(backend)
+        realtime_server.close()
+        await realty_runner.cleanup()
+
+    within_sla = [
+        level["sessions"] for level in levels
+        if not level["errors"] and level["ttfa_p95_ms"] is not None
+        and (not args.max_p95_ms or level["ttfa_p95_ms"] <= args.max_p95_ms)
+    ]
+    return {
+        "levels": levels,
+        "max_sessions_per_worker_within_sla": max(within_sla) if within_sla else 0,
+        "max_p95_ms": args.max_p95_ms
+    }
+
+
+def _breached(level: Dict, max_p95_ms: Optional[float]) -> bool:
+    """Whether a level had errors or missed the p95 target."""
+    p95 = level["ttfa_p95_ms"]
+    return bool(level["errors"] or (max_p95_ms and (p95 is None or p95 > max_p95_ms)))
+
+
+async def main(args: argparse.Namespace) -> int:
+    report = await run_load_test(args)
+    exit_code = 1 if any(_breached(level, args.max_p95_ms) for level in report["levels"]) else 0
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return exit_code
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=lambda v: [int(x) for x in v.split(",")], default=[10],
+                        help="Comma-separated concurrency levels to run in order")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--speech-ms", type=int, default=1500, help="Audio streamed per turn")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="Client audio chunk size")
+    parser.add_argument("--json-audio", action="store_true", help="Use the legacy base64 JSON protocol")
+    parser.add_argument("--pool-size", type=int, default=2, help="REALTIME_POOL_SIZE for the backend")
+    parser.add_argument("--realty-latency-ms", type=float, default=150.0)
+    parser.add_argument("--realty-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--max-p95-ms", type=float, default=None,
+                        help="Fail (exit 1) if p95 time to first audio exceeds this")
+    parser.add_argument("--stop-on-breach", action="store_true", help="Stop at the first level over the SLA")
+    parser.add_argument("--settle-seconds", type=float, default=1.0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the backend (repeatable)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show backend logs")
+    add_script_arguments(parser)
+    return parser
+
+
+def parse_args() -> argparse.Namespace:
+    return build_parser().parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logging.getLogger("websockets").setLevel(logging.WARNING)
+    sys.exit(asyncio.run(main(parse_args())))
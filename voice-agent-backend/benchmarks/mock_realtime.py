@@ -0,0 +1,301 @@
+"""
+Local stand-in for the OpenAI Realtime WebSocket API.
+Accepts session.update, counts appended audio and answers each committed
+turn with scripted transcripts, audio deltas and (optionally) function calls.
+With --server-vad-silence-ms it detects turns itself from the energy of the
+appended audio, standing in for server VAD (for clients that never commit,
+like phone calls). With --drop-every-turns it closes the connection in the
+middle of every Nth answer, to exercise the backend's reconnect and
+conversation replay. With --prefill-ms-per-kb the first audio after a
+function output is delayed in proportion to the output's size, standing in
+for the time the model takes to read it.
+
+Run standalone:
+    python -m benchmarks.mock_realtime --port 9100
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import logging
+from typing import Optional
+
+import numpy as np
+
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+logger = logging.getLogger(__name__)
+
+_ids = itertools.count(1)
+
+
+def _new_id(prefix: str) -> str:
+    """Unique id in the style of the real API's ids."""
+    return f"{prefix}_{next(_ids):08d}"
+
+
+class MockRealtimeScript:
+    """Timing and shape of the scripted responses."""
+
+    def __init__(
+        self,
+        first_audio_delay_ms: float = 250.0,
+        audio_chunks: int = 20,
+        audio_chunk_ms: int = 100,
+        chunk_interval_ms: float = 20.0,
+        function_call_every: int = 0,
+        arguments_stream_ms: float = 150.0,
+        server_vad_silence_ms: int = 0,
+        drop_every_turns: int = 0,
+        prefill_ms_per_kb: float = 0.0,
+        sample_rate: int = 24000
+    ):
+        self.first_audio_delay_ms = first_audio_delay_ms
+        self.audio_chunks = audio_chunks
+        self.audio_chunk_ms = audio_chunk_ms
+        self.chunk_interval_ms = chunk_interval_ms
+        self.function_call_every = function_call_every
+        self.arguments_stream_ms = arguments_stream_ms
+        self.vad_silence_bytes = sample_rate * server_vad_silence_ms // 1000 * 2
+        self.drop_every_turns = drop_every_turns
+        self.prefill_ms_per_kb = prefill_ms_per_kb
+        self.sample_rate = sample_rate
+
+        # Totals across connections
+        self.connections = 0
+        self.drops = 0
+        self.items_replayed = 0
+
+        # One shared chunk of silence; the content doesn't matter, only its size
+        samples = sample_rate * audio_chunk_ms // 1000
+        self.audio_chunk_b64 = base64.b64encode(bytes(samples * 2)).decode()
+
+
+class MockRealtimeSession:
+    """Scripted behaviour for one Realtime connection."""
+
+    def __init__(self, ws: ServerConnection, script: MockRealtimeScript):
+        self.ws = ws
+        self.script = script
+        self.turns = 0
+        self.audio_bytes = 0
+        self.truncations = 0
+        self.items_created = 0
+        self._unread_bytes = 0
+        self._in_speech = False
+        self._quiet_bytes = 0
+        self._response_task: Optional[asyncio.Task] = None
+
+    async def send(self, event: dict) -> None:
+        event.setdefault("event_id", _new_id("event"))
+        # Match the real API: "type" is the first key in every event
+        ordered = {"type": event.pop("type"), **event}
+        await self.ws.send(json.dumps(ordered, separators=(",", ":")))
+
+    async def run(self) -> None:
+        self.script.connections += 1
+        await self.send({"type": "session.created", "session": {"id": _new_id("sess")}})
+        try:
+            async for raw in self.ws:
+                await self.handle(json.loads(raw))
+        except ConnectionClosed:
+            pass
+        finally:
+            if self._response_task:
+                self._response_task.cancel()
+
+    async def handle(self, event: dict) -> None:
+        event_type = event.get("type")
+
+        if event_type == "session.update":
+            await self.send({"type": "session.updated", "session": event.get("session", {})})
+        elif event_type == "input_audio_buffer.append":
+            if self.script.vad_silence_bytes:
+                audio = base64.b64decode(event.get("audio", ""))
+                self.audio_bytes += len(audio)
+                await self._detect_turn(audio)
+            else:
+                self.audio_bytes += len(event.get("audio", "")) * 3 // 4
+        elif event_type == "input_audio_buffer.commit":
+            await self._end_turn()
+        elif event_type == "response.create":
+            self._start_response(False)
+        elif event_type == "conversation.item.truncate":
+            self.truncations += 1
+            await self.send({
+                "type": "conversation.item.truncated",
+                "item_id": event.get("item_id"),
+                "content_index": event.get("content_index", 0),
+                "audio_end_ms": event.get("audio_end_ms", 0)
+            })
+        elif event_type == "conversation.item.create":
+            self.items_created += 1
+            item = event.get("item", {})
+            if "id" in item:
+                # Clients only choose item ids when restoring a conversation
+                self.script.items_replayed += 1
+            if item.get("type") == "function_call_output":
+                self._unread_bytes += len(item.get("output", "").encode())
+            item = {"id": _new_id("item"), **item}
+            await self.send({"type": "conversation.item.created", "item": item})
+        elif event_type == "response.cancel":
+            if self._response_task:
+                self._response_task.cancel()
+
+    async def _detect_turn(self, audio: bytes) -> None:
+        """Energy-based stand-in for server VAD."""
+        samples = np.frombuffer(audio, dtype="<i2", count=len(audio) // 2)
+        if len(samples) and int(np.abs(samples).max()) > 500:
+            self._quiet_bytes = 0
+            if not self._in_speech:
+                self._in_speech = True
+                # Like the real API, speech cancels the response in progress
+                if self._response_task and not self._response_task.done():
+                    self._response_task.cancel()
+                await self.send({"type": "input_audio_buffer.speech_started", "audio_start_ms": 0, "item_id": _new_id("item")})
+        elif self._in_speech:
+            self._quiet_bytes += len(audio)
+            if self._quiet_bytes >= self.script.vad_silence_bytes:
+                self._in_speech = False
+                await self._end_turn()
+
+    async def _end_turn(self) -> None:
+        self.turns += 1
+        await self.send({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": 0})
+        item_id = _new_id("item")
+        await self.send({"type": "input_audio_buffer.committed", "item_id": item_id})
+        await self.send({
+            "type": "conversation.item.created",
+            "item": {"id": item_id, "type": "message", "role": "user", "content": [{"type": "input_audio", "transcript": None}]}
+        })
+        await self.send({
+            "type": "conversation.item.input_audio_transcription.completed",
+            "item_id": item_id,
+            "content_index": 0,
+            "transcript": f"Show me houses, turn {self.turns}."
+        })
+        every = self.script.function_call_every
+        with_tool = every > 0 and self.turns % every == 0
+        drop_every = self.script.drop_every_turns
+        self._start_response(with_tool, drop=drop_every > 0 and self.turns % drop_every == 0)
+
+    def _start_response(self, with_tool: bool, drop: bool = False) -> None:
+        if self._response_task and not self._response_task.done():
+            self._response_task.cancel()
+        self._response_task = asyncio.create_task(self._respond(with_tool, drop))
+
+    async def _respond(self, with_tool: bool, drop: bool = False) -> None:
+        response_id = _new_id("resp")
+        await self.send({"type": "response.created", "response": {"id": response_id, "status": "in_progress"}})
+
+        if with_tool:
+            await self._stream_function_call(response_id)
+            await self.send({"type": "response.done", "response": {"id": response_id, "status": "completed"}})
+            return
+
+        prefill_ms = self._unread_bytes / 1024 * self.script.prefill_ms_per_kb
+        self._unread_bytes = 0
+        await asyncio.sleep((self.script.first_audio_delay_ms + prefill_ms) / 1000)
+        item_id = _new_id("item")
+        await self.send({
+            "type": "conversation.item.created",
+            "item": {"id": item_id, "type": "message", "role": "assistant", "content": []}
+        })
+        await self.send({"type": "response.audio_transcript.delta", "response_id": response_id, "item_id": item_id, "delta": "Sure, "})
+        for chunk in range(self.script.audio_chunks):
+            if drop and chunk == self.script.audio_chunks // 2:
+                # Simulate the upstream going away mid-answer
+                self.script.drops += 1
+                await self.ws.close(1011, "mock connection drop")
+                return
+            await self.send({
+                "type": "response.audio.delta",
+                "response_id": response_id,
+                "item_id": item_id,
+                "output_index": 0,
+                "content_index": 0,
+                "delta": self.script.audio_chunk_b64
+            })
+            await asyncio.sleep(self.script.chunk_interval_ms / 1000)
+        await self.send({"type": "response.audio.done", "response_id": response_id, "item_id": item_id})
+        await self.send({"type": "response.audio_transcript.done", "response_id": response_id, "item_id": item_id, "transcript": "Sure, here you go."})
+        await self.send({"type": "response.done", "response": {"id": response_id, "status": "completed"}})
+
+    async def _stream_function_call(self, response_id: str) -> None:
+        call_id = _new_id("call")
+        arguments = json.dumps({"location": "Parramatta", "bedrooms": 3, "property_type": "house"})
+        pieces = [arguments[i:i + 8] for i in range(0, len(arguments), 8)]
+        delay = self.script.arguments_stream_ms / 1000 / max(1, len(pieces))
+        for piece in pieces:
+            await self.send({
+                "type": "response.function_call_arguments.delta",
+                "response_id": response_id,
+                "call_id": call_id,
+                "delta": piece
+            })
+            await asyncio.sleep(delay)
+        await self.send({
+            "type": "response.function_call_arguments.done",
+            "response_id": response_id,
+            "call_id": call_id,
+            "name": "search_properties",
+            "arguments": arguments
+        })
+
+
+async def start_mock_realtime(host: str, port: int, script: MockRealtimeScript):
+    """Start the mock server and return the websockets Server object."""
+    async def handler(ws: ServerConnection) -> None:
+        await MockRealtimeSession(ws, script).run()
+
+    # No compression or frame size limit, like the real upstream
+    return await serve(handler, host, port, compression=None, max_size=None)
+
+
+def add_script_arguments(parser: argparse.ArgumentParser) -> None:
+    """Command line options controlling the scripted responses."""
+    parser.add_argument("--first-audio-delay-ms", type=float, default=250.0)
+    parser.add_argument("--audio-chunks", type=int, default=20)
+    parser.add_argument("--audio-chunk-ms", type=int, default=100)
+    parser.add_argument("--chunk-interval-ms", type=float, default=20.0)
+    parser.add_argument("--function-call-every", type=int, default=0,
+                        help="Answer every Nth turn with a search_properties call (0 = never)")
+    parser.add_argument("--arguments-stream-ms", type=float, default=150.0)
+    parser.add_argument("--server-vad-silence-ms", type=int, default=0,
+                        help="Detect turns from audio energy, ending them after this much silence (0 = wait for commit)")
+    parser.add_argument("--drop-every-turns", type=int, default=0,
+                        help="Close the connection halfway through every Nth answer (0 = never)")
+    parser.add_argument("--prefill-ms-per-kb", type=float, default=0.0,
+                        help="Extra delay before the first audio per KB of function output to read")
+
+
+def script_from_args(args: argparse.Namespace) -> MockRealtimeScript:
+    return MockRealtimeScript(
+        first_audio_delay_ms=args.first_audio_delay_ms,
+        audio_chunks=args.audio_chunks,
+        audio_chunk_ms=args.audio_chunk_ms,
+        chunk_interval_ms=args.chunk_interval_ms,
+        function_call_every=args.function_call_every,
+        arguments_stream_ms=args.arguments_stream_ms,
+        server_vad_silence_ms=args.server_vad_silence_ms,
+        drop_every_turns=args.drop_every_turns,
+        prefill_ms_per_kb=args.prefill_ms_per_kb
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = await start_mock_realtime(args.host, args.port, script_from_args(args))
+    logger.info(f"Mock Realtime API listening on ws://{args.host}:{args.port}")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_script_arguments(parser)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_main(parser.parse_args()))
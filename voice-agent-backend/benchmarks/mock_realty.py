@@ -0,0 +1,131 @@
+"""
+Local stand-in for the realty-in-au RapidAPI endpoints.
+Serves synthetic listings for /properties/list and /properties/detail with a
+configurable response latency. Failures can be injected: a fraction of
+requests answered with 503 or 429, and a fraction delayed by slow_ms to
+give the latency a long tail.
+
+Run standalone:
+    python -m benchmarks.mock_realty --port 9200
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import zlib
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SUBURBS = ["Parramatta", "Newtown", "Chatswood", "Bondi", "Penrith", "Manly", "Ryde", "Hornsby"]
+PROPERTY_TYPES = ["house", "apartment", "unit", "townhouse"]
+
+
+def make_listing(listing_id: int, suburb: str = "Parramatta", postcode: str = "2150") -> dict:
+    """A listing shaped like the realty-in-au payload the client formats."""
+    rng = random.Random(listing_id)
+    bedrooms = rng.randint(1, 5)
+    price = rng.randrange(450_000, 2_500_000, 5_000)
+    return {
+        "id": str(listing_id),
+        "listingId": str(listing_id),
+        "address": {
+            "displayAddress": f"{rng.randint(1, 200)} Example Street, {suburb} NSW {postcode}",
+            "suburb": suburb,
+            "postcode": postcode,
+            "state": "NSW"
+        },
+        "price": {"display": f"${price:,}"},
+        "bedrooms": bedrooms,
+        "bathrooms": max(1, bedrooms - 1),
+        "carSpaces": rng.randint(0, 2),
+        "propertyType": rng.choice(PROPERTY_TYPES),
+        "landSize": f"{rng.randint(150, 900)} m2",
+        "headline": f"Spacious {bedrooms} bedroom home in {suburb}",
+        "description": "Light-filled home close to transport, schools and shops. " * 12,
+        "features": ["Air conditioning", "Built-in wardrobes", "Dishwasher", "Balcony",
+                     "Garden", "Garage", "Alarm system", "Ensuite", "Study", "Pool", "Solar panels"]
+    }
+
+
+def create_app(
+    latency_ms: float = 150.0,
+    jitter_ms: float = 50.0,
+    results: int = 10,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_ms: float = 2000.0
+) -> web.Application:
+    """Build the mock RapidAPI application."""
+    async def delay() -> None:
+        latency = slow_ms if random.random() < slow_rate else latency_ms + random.uniform(-jitter_ms, jitter_ms)
+        await asyncio.sleep(max(0.0, latency) / 1000)
+
+    def injected_failure():
+        roll = random.random()
+        if roll < error_rate:
+            return web.json_response({"message": "service unavailable"}, status=503)
+        if roll < error_rate + throttle_rate:
+            return web.json_response({"message": "too many requests"}, status=429, headers={"Retry-After": "0"})
+        return None
+
+    async def properties_list(request: web.Request) -> web.Response:
+        await delay()
+        failure = injected_failure()
+        if failure is not None:
+            return failure
+        suburb = request.query.get("searchLocation", "Parramatta").title()
+        base = zlib.crc32(suburb.encode()) % 1_000_000 * 100
+        total = results * 5
+        page_size = int(request.query.get("pageSize", results))
+        start = (int(request.query.get("page", 1)) - 1) * page_size
+        return web.json_response({
+            "totalResultsCount": total,
+            "data": [make_listing(base + i, suburb) for i in range(start, min(start + page_size, total))]
+        })
+
+    async def properties_detail(request: web.Request) -> web.Response:
+        await delay()
+        failure = injected_failure()
+        if failure is not None:
+            return failure
+        try:
+            listing_id = int(request.query.get("id", "0"))
+        except ValueError:
+            return web.json_response({"message": "invalid id"}, status=400)
+        return web.json_response({"data": make_listing(listing_id)})
+
+    app = web.Application()
+    app.router.add_get("/properties/list", properties_list)
+    app.router.add_get("/properties/detail", properties_detail)
+    return app
+
+
+async def start_mock_realty(host: str, port: int, latency_ms: float, jitter_ms: float, **failures) -> web.AppRunner:
+    """
+    Start the mock server and return its runner (call cleanup() to stop).
+    failures are create_app's error_rate, throttle_rate, slow_rate and slow_ms.
+    """
+    runner = web.AppRunner(create_app(latency_ms, jitter_ms, **failures), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def _main(args: argparse.Namespace) -> None:
+    await start_mock_realty(args.host, args.port, args.latency_ms, args.jitter_ms)
+    logger.info(f"Mock realty API listening on http://{args.host}:{args.port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_main(parser.parse_args()))
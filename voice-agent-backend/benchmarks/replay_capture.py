@@ -0,0 +1,340 @@
+"""
+Replay captured OpenAI sessions against VoiceSessionHandler.
+
+Takes capture files written with EVENT_CAPTURE=true and runs each one
+through a real VoiceSessionHandler in this process. The OpenAI connection
+is replaced by the capture's server events, delivered on their original
+schedule (scaled by --speed; 0 replays as fast as possible). The caller is
+replaced by the capture's caller audio, fed into the handler as binary
+frames on the same schedule, along with its audio commits. The handler's
+own work (audio pipeline, tool calls, pacing, forwarding to the client)
+runs as in production. The captured server did react to what the
+original handler sent, so where the original handler sent a function
+output or requested a response, the replay holds the following server
+events until the replayed handler has done the same (for up to
+--sync-timeout seconds); at high speeds tool calls would otherwise still
+be running when the captured server moves on. The replayed handler's
+messages can still differ where it now decides differently.
+
+It reports:
+- dispatch lag: how late each event reached the handler against its
+  schedule;
+- handler time per server event;
+- how long the replay waited for the handler to catch up, and how often
+  it gave up;
+- what the handler sent to OpenAI, next to what the original session sent.
+
+Tool calls go to a local mock RapidAPI server with --mock-realty, or fail
+fast without one. Captures are read through a memory map, so long
+recordings replay without being loaded into memory.
+
+Run from voice-agent-backend/:
+    python -m benchmarks.replay_capture captures/*.vcap
+    python -m benchmarks.replay_capture --speed 0 --mock-realty captures/slow-call.vcap
+    python -m benchmarks.replay_capture --summary captures/slow-call.vcap
+    python -m benchmarks.replay_capture --speed 4 --max-lag-p99-ms 20 captures/*.vcap   # CI gate
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.load_test import free_port, percentile
+from benchmarks.mock_realty import start_mock_realty
+from config import Settings
+from event_capture import CLIENT_AUDIO, CLIENT_EVENT, MARK, SERVER_AUDIO, SERVER_EVENT, CaptureReader
+from openai_realtime import OpenAIRealtimeClient, RealtimeEvent, peek_event_type
+from realty_api import RealtyAPIClient
+from websocket_handler import VoiceSessionHandler
+
+# Events the original handler sent of its own accord; the server events
+# captured after one wait until the replayed handler has sent it too
+HANDLER_EVENTS = ("conversation.item.create", "response.create")
+
+
+class ReplayClientSocket:
+    """
+    Stands in for the caller's WebSocket: hands the handler the captured
+    caller audio and counts what the handler sends back.
+    """
+
+    def __init__(self, sample_rate: int):
+        self._frames: asyncio.Queue = asyncio.Queue()
+        self._frames.put_nowait({
+            "type": "websocket.receive",
+            "text": json.dumps({"type": "client_config", "audio_mode": "binary", "sample_rate": sample_rate})
+        })
+        self.sent: Counter = Counter()
+        self._handed_out = False
+
+    def feed_audio(self, pcm: bytes) -> None:
+        self._frames.put_nowait({"type": "websocket.receive", "bytes": pcm})
+
+    def commit_audio(self) -> None:
+        self._frames.put_nowait({"type": "websocket.receive", "text": '{"type":"audio_commit"}'})
+
+    def hang_up(self) -> None:
+        self._frames.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    async def receive(self) -> dict:
+        # Asking for the next frame means the handler is done with the last one
+        if self._handed_out:
+            self._frames.task_done()
+        frame = await self._frames.get()
+        self._handed_out = True
+        return frame
+
+    async def drained(self) -> None:
+        """Wait until the handler has dealt with every frame fed so far."""
+        await self._frames.join()
+
+    async def send_text(self, text: str) -> None:
+        self.sent[peek_event_type(text) or "unknown"] += 1
+
+
+class ReplayRealtimeClient(OpenAIRealtimeClient):
+    """
+    Stands in for the OpenAI connection, replaying a capture.
+    Server events are dispatched to the handler on the captured schedule;
+    whatever the handler sends is counted instead of going anywhere. After
+    the last record the caller hangs up, once the handler has dealt with
+    the caller's frames and finished its tool calls.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        reader: CaptureReader,
+        handler: VoiceSessionHandler,
+        client_ws: ReplayClientSocket,
+        speed: float,
+        sync_timeout: float = 5.0
+    ):
+        super().__init__(settings)
+        self.reader = reader
+        self.handler = handler
+        self.client_ws = client_ws
+        self.speed = speed
+        self.sync_timeout = sync_timeout
+        self._sent_changed = asyncio.Event()
+        self.sync_waits: List[float] = []
+        self.sync_timeouts = 0
+        self.sent: Counter = Counter()
+        self.captured_sent: Counter = Counter()
+        self.audio_bytes_sent = 0
+        self.captured_audio_bytes = 0
+        self.marks: List[str] = []
+        self.lags: List[float] = []
+        self.handler_times: List[float] = []
+        self.events = 0
+
+    async def connect(self) -> None:
+        self.sent["session.update"] += 1
+
+    async def send_message(self, message: dict) -> None:
+        self.sent[message.get("type", "unknown")] += 1
+        self._sent_changed.set()
+
+    async def send_audio_pcm(self, pcm: bytes) -> None:
+        self.sent["input_audio_buffer.append"] += 1
+        self.audio_bytes_sent += len(pcm)
+
+    async def receive_messages(
+        self,
+        on_message: Callable[[RealtimeEvent], Awaitable[None]],
+        on_reconnect: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first_ns: Optional[int] = None
+        try:
+            for kind, t_ns, payload in self.reader:
+                if first_ns is None:
+                    first_ns = t_ns
+                if self.speed > 0:
+                    due = started + (t_ns - first_ns) / 1e9 / self.speed
+                    delay = due - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    self.lags.append(max(0.0, loop.time() - due))
+                else:
+                    # Let the handler read the caller's frames as they are fed
+                    await asyncio.sleep(0)
+
+                if kind in (SERVER_EVENT, SERVER_AUDIO):
+                    raw = CaptureReader.server_audio_frame(payload) if kind == SERVER_AUDIO else payload.decode("utf-8")
+                    handler_started = time.perf_counter()
+                    await on_message(RealtimeEvent.from_raw(raw))
+                    self.handler_times.append(time.perf_counter() - handler_started)
+                    self.events += 1
+                elif kind == CLIENT_AUDIO:
+                    self.client_ws.feed_audio(payload)
+                    self.captured_sent["input_audio_buffer.append"] += 1
+                    self.captured_audio_bytes += len(payload)
+                elif kind == CLIENT_EVENT:
+                    event_type = peek_event_type(payload.decode("utf-8")) or "unknown"
+                    self.captured_sent[event_type] += 1
+                    if event_type == "input_audio_buffer.commit":
+                        # Only the caller commits audio; the rest is the handler's own
+                        self.client_ws.commit_audio()
+                    elif event_type in HANDLER_EVENTS:
+                        # Keep the schedule relative to the handler catching up
+                        started += await self._catch_up(event_type)
+                elif kind == MARK:
+                    self.marks.append(json.loads(payload).get("mark", ""))
+            await self._settle()
+        finally:
+            self.client_ws.hang_up()
+
+    async def _catch_up(self, event_type: str) -> float:
+        """
+        Wait until the replayed handler has sent event_type as often as the
+        original had at this point. Returns how long that took.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.sync_timeout
+        while self.sent[event_type] < self.captured_sent[event_type]:
+            self._sent_changed.clear()
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(self._sent_changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                self.sync_timeouts += 1
+                break
+        waited = loop.time() - started
+        self.sync_waits.append(waited)
+        return waited
+
+    async def _settle(self) -> None:
+        """Wait for the handler to send what the rest of the capture led to."""
+        await self.client_ws.drained()
+        await self.handler.audio_pipeline.flush()
+        # Each call task ends after submitting its output and any follow-up response.create
+        tasks = list(self.handler._tool_tasks.values())
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def disconnect(self) -> None:
+        self._closing = True
+
+
+def ms_summary(samples: List[float]) -> Dict:
+    ms = [sample * 1000 for sample in samples]
+    if not ms:
+        return {}
+    return {
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3)
+    }
+
+
+async def replay(
+    path: str,
+    settings: Settings,
+    realty_client: Optional[RealtyAPIClient],
+    speed: float,
+    sync_timeout: float = 5.0
+) -> Dict:
+    """Run one capture through a VoiceSessionHandler."""
+    with CaptureReader(path) as reader:
+        sample_rate = reader.metadata.get("sample_rate", settings.sample_rate)
+        client_ws = ReplayClientSocket(sample_rate)
+        handler = VoiceSessionHandler(client_ws, settings, realty_client=realty_client)
+        upstream = ReplayRealtimeClient(settings, reader, handler, client_ws, speed, sync_timeout)
+        handler.openai_client = upstream
+
+        started = time.perf_counter()
+        await handler.handle_session()
+        wall = time.perf_counter() - started
+
+    # Handler-originated events; the caller's audio is compared separately
+    compared = sorted((set(upstream.sent) | set(upstream.captured_sent)) - {"input_audio_buffer.append"})
+    return {
+        "capture": path,
+        "session_id": reader.metadata.get("session_id"),
+        "wall_s": round(wall, 3),
+        "server_events": upstream.events,
+        "dispatch_lag": ms_summary(upstream.lags),
+        "handler_time": ms_summary(upstream.handler_times),
+        "waited_for_handler": {**ms_summary(upstream.sync_waits), "timeouts": upstream.sync_timeouts},
+        "audio_bytes_to_openai": {"replayed": upstream.audio_bytes_sent, "captured": upstream.captured_audio_bytes},
+        "sent_to_openai": {
+            event_type: {"replayed": upstream.sent[event_type], "captured": upstream.captured_sent[event_type]}
+            for event_type in compared
+        },
+        "sent_to_client": dict(upstream.client_ws.sent),
+        "marks": upstream.marks
+    }
+
+
+def replay_settings(overrides: List[str]) -> Settings:
+    """Settings for the replayed handler, with KEY=VALUE overrides."""
+    fields = {"openai_api_key": "replay"}
+    for override in overrides:
+        key, _, value = override.partition("=")
+        fields[key.strip().lower()] = value
+    return Settings(**fields)
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.summary:
+        for path in args.captures:
+            with CaptureReader(path) as reader:
+                print(json.dumps({"capture": path, **reader.summary()}, indent=2))
+        return 0
+
+    settings = replay_settings(args.set)
+    runner = None
+    realty_client = None
+    if args.mock_realty:
+        port = free_port()
+        runner = await start_mock_realty("127.0.0.1", port, args.realty_latency_ms, args.realty_latency_ms / 3)
+        realty_client = RealtyAPIClient("replay", base_url=f"http://127.0.0.1:{port}")
+        await realty_client.start()
+
+    reports = []
+    try:
+        for path in args.captures:
+            reports.append(await replay(path, settings, realty_client, args.speed, args.sync_timeout))
+    finally:
+        if realty_client:
+            await realty_client.close()
+        if runner:
+            await runner.cleanup()
+
+    print(json.dumps({"speed": args.speed, "sessions": reports}, indent=2))
+    lag_p99s = [report["dispatch_lag"]["p99_ms"] for report in reports if report["dispatch_lag"]]
+    if args.max_lag_p99_ms is not None and any(lag > args.max_lag_p99_ms for lag in lag_p99s):
+        return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="Capture files (.vcap)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed: 1 is real time, 4 four times faster, 0 as fast as possible")
+    parser.add_argument("--sync-timeout", type=float, default=5.0,
+                        help="Longest wait for the handler to send what the original did before replay moves on")
+    parser.add_argument("--summary", action="store_true", help="Only print what each capture contains")
+    parser.add_argument("--mock-realty", action="store_true", help="Answer tool calls from a local mock RapidAPI")
+    parser.add_argument("--realty-latency-ms", type=float, default=150.0, help="Mock RapidAPI response latency")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Settings override for the replayed handler (repeatable)")
+    parser.add_argument("--max-lag-p99-ms", type=float, default=None,
+                        help="Exit 1 if any session's p99 dispatch lag exceeds this")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,233 @@
+"""
+Persistent call records for QA and analytics.
+Transcripts, tool calls and per-response timings are queued by the session
+and written to append-only JSON-lines segments by a background thread, so
+disk I/O never runs on the event loop.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from metrics import CALL_RECORD_WRITE_DURATION, CALL_RECORDS
+
+logger = logging.getLogger(__name__)
+
+# Bound once: labels() takes a lock and a dict lookup on every call
+_RECORDS_DROPPED = CALL_RECORDS.labels("dropped")
+_RECORDS_WRITTEN = CALL_RECORDS.labels("written")
+_RECORDS_WRITE_ERROR = CALL_RECORDS.labels("write_error")
+
+
+class CallRecorder:
+    """
+    Bounded queue of call records with a background segment writer.
+
+    record() never blocks: it puts a dict on the queue, and when the queue is
+    full the record is dropped and counted. The writer thread takes records
+    in batches of up to batch_max, serializes each batch as JSON lines and
+    appends it to the current segment with a single write. Segments are
+    fsynced at most every fsync_seconds (0 syncs every batch) and on close,
+    and a new segment is started once the current one would exceed
+    segment_max_bytes. Segment names carry the start time and the process
+    id, so several workers can share a directory; every segment but the
+    newest of each process is complete.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        queue_size: int = 10_000,
+        batch_max: int = 512,
+        fsync_seconds: float = 1.0
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.batch_max = batch_max
+        self.fsync_seconds = fsync_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Writer thread state
+        self._segment = None
+        self._segment_path: Optional[str] = None
+        self._segment_bytes = 0
+        self._segment_seq = 0
+        self._unsynced = False
+        self._synced_at = 0.0
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.write_errors = 0
+        self.batches = 0
+        self.bytes_written = 0
+        self.segments = 0
+
+    @classmethod
+    def for_settings(cls, settings) -> "CallRecorder":
+        """Build a recorder from the call_records_* settings."""
+        return cls(
+            settings.call_records_dir,
+            segment_max_bytes=settings.call_records_segment_max_mb * 1024 * 1024,
+            queue_size=settings.call_records_queue_size,
+            batch_max=settings.call_records_batch_max,
+            fsync_seconds=settings.call_records_fsync_seconds
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Create the directory and start the writer thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="call-recorder", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Write what is queued, sync and close the segment, and stop the writer.
+        Blocks; call it through asyncio.to_thread from the event loop.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Call recorder did not finish within %ss (%s records queued)",
+                               timeout, self.queue_depth)
+            self._thread = None
+
+    def record(self, session_id: str, event: str, **fields) -> bool:
+        """
+        Queue one record. Fields must be JSON-serializable (anything else is
+        written as its str()). Returns False if the record was dropped.
+        """
+        entry = {"ts": round(time.time(), 3), "session": session_id, "event": event}
+        entry.update(fields)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            _RECORDS_DROPPED.inc()
+            return False
+        self.recorded += 1
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_size": self._queue.maxsize,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "write_errors": self.write_errors,
+            "batches": self.batches,
+            "bytes_written": self.bytes_written,
+            "segments": self.segments,
+            "current_segment": self._segment_path
+        }
+
+    # Writer thread
+
+    def _run(self) -> None:
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._write_batch(batch)
+                if self._unsynced and time.monotonic() - self._synced_at >= self.fsync_seconds:
+                    self._sync()
+        except Exception as e:
+            logger.error("Call recorder stopped: %s", e)
+        finally:
+            self._close_segment()
+
+    def _next_batch(self) -> List[Dict]:
+        """Wait briefly for a record, then take whatever else is queued."""
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_max:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch: List[Dict]) -> None:
+        lines = []
+        for entry in batch:
+            try:
+                lines.append(json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str))
+            except ValueError as e:
+                logger.warning("Unserializable call record dropped: %s", e)
+                self.write_errors += 1
+                _RECORDS_WRITE_ERROR.inc()
+        if not lines:
+            return
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+
+        started = time.perf_counter()
+        try:
+            if self._segment is None or (
+                self._segment_bytes and self._segment_bytes + len(data) > self.segment_max_bytes
+            ):
+                self._rotate()
+            self._segment.write(data)
+        except OSError as e:
+            logger.error("Could not write %s call records: %s", len(lines), e)
+            self.write_errors += len(lines)
+            _RECORDS_WRITE_ERROR.inc(len(lines))
+            # Start a fresh segment with the next batch
+            self._close_segment()
+            return
+        self._unsynced = True
+        if self.fsync_seconds <= 0:
+            self._sync()
+        CALL_RECORD_WRITE_DURATION.observe(time.perf_counter() - started)
+
+        self._segment_bytes += len(data)
+        self.batches += 1
+        self.written += len(lines)
+        self.bytes_written += len(data)
+        _RECORDS_WRITTEN.inc(len(lines))
+
+    def _rotate(self) -> None:
+        """Close the current segment and start a new one."""
+        self._close_segment()
+        self._segment_seq += 1
+        name = f"calls-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._segment_seq:04d}.jsonl"
+        self._segment_path = os.path.join(self.directory, name)
+        # Unbuffered, so each batch is exactly one write
+        self._segment = open(self._segment_path, "ab", buffering=0)
+        self._segment_bytes = 0
+        self._synced_at = time.monotonic()
+        self.segments += 1
+
+    def _sync(self) -> None:
+        try:
+            os.fsync(self._segment.fileno())
+        except OSError as e:
+            logger.error("Could not sync call records: %s", e)
+        self._unsynced = False
+        self._synced_at = time.monotonic()
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        if self._unsynced:
+            self._sync()
+        try:
+            self._segment.close()
+        except OSError as e:
+            logger.error("Could not close call record segment: %s", e)
+        self._segment = None
@@ -13,30 +13,178 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
-        extra="ignore"
+        extra="ignore",
+        frozen=True
     )
     
     # OpenAI Configuration
     openai_api_key: str
     openai_model: str = "gpt-4o-realtime-preview-2024-12-17"
     openai_voice: str = "alloy"  # Any voice: alloy, ash, ballad, coral, echo, sage, shimmer, verse, marin, etc.
+    openai_realtime_base_url: str = "wss://api.openai.com/v1/realtime"  # Override to point at a mock server
     
     # Server Configuration
     host: str = "0.0.0.0"
     port: int = 8000
     
+    # Admission control and graceful shutdown (per worker)
+    max_sessions: int = 200
+    admission_queue_size: int = 0  # Callers allowed to wait for a slot; 0 rejects immediately
+    admission_queue_timeout_seconds: float = 5.0
+    drain_timeout_seconds: float = 30.0
+    
     # Audio Configuration (PCM16 at 24kHz is required by OpenAI Realtime API)
     audio_format: str = "pcm16"
     sample_rate: int = 24000
     
+    # Upstream audio pipeline: client chunks are coalesced into frames of at
+    # least audio_frame_ms before being sent to OpenAI
+    audio_frame_ms: int = 60
+    audio_queue_max_frames: int = 25
+    audio_queue_put_timeout_ms: int = 200
+    
+    # Server VAD (turn_detection) parameters sent to OpenAI
+    vad_threshold: float = 0.5
+    vad_prefix_padding_ms: int = 300
+    vad_silence_duration_ms: int = 500
+    
+    # Optional silence gate in front of OpenAI: once the caller has been quiet
+    # for longer than the VAD silence duration, audio below the threshold is
+    # held back (keeping the last vad_prefix_padding_ms for the next onset)
+    silence_gate: bool = False
+    silence_gate_threshold_dbfs: float = -50.0
+    silence_gate_window_ms: int = 20
+    
+    # Outbound audio pacing: agent audio is sent in frames no faster than
+    # real time plus a lead, so a barge-in only has the lead to throw away
+    # (always on for telephony)
+    outbound_pacing: bool = False
+    outbound_frame_ms: int = 40
+    outbound_lead_ms: int = 300
+    
+    # Transparent reconnect when the OpenAI socket drops mid-call: the session
+    # is re-created and the conversation replayed while caller audio waits
+    realtime_reconnect: bool = True
+    realtime_reconnect_attempts: int = 3
+    realtime_reconnect_buffer_ms: int = 5000
+    conversation_log_max_items: int = 50
+    
+    # Pre-warmed OpenAI Realtime connections (0 disables the pool)
+    realtime_pool_size: int = 2
+    realtime_pool_max_idle_seconds: float = 300.0
+    realtime_pool_health_check_seconds: float = 15.0
+    
     # RapidAPI Configuration (for property search)
     rapidapi_key: Optional[str] = None
     rapidapi_host: str = "realty-in-au.p.rapidapi.com"
+    rapidapi_base_url: Optional[str] = None  # Defaults to https://{rapidapi_host}
+    
+    # Shared HTTP client for RapidAPI (one keep-alive pool per worker)
+    rapidapi_timeout_seconds: float = 10.0
+    rapidapi_connect_timeout_seconds: float = 3.0
+    rapidapi_connection_limit: int = 100
+    rapidapi_connection_limit_per_host: int = 20
+    rapidapi_dns_cache_ttl_seconds: int = 300
+    rapidapi_keepalive_seconds: float = 30.0
+    
+    # RapidAPI request policy (per worker). Requests take a token from a
+    # bucket refilled at the plan's rate (0 disables it) and fail once one
+    # isn't available within the max wait. 429s, 5xx and network errors are
+    # retried with jittered exponential backoff. With hedge_after_ms > 0, a
+    # property search still unanswered after that long is sent again and
+    # the first answer wins. After circuit_failure_threshold failures in a
+    # row, requests fail fast (answered from stale results where possible)
+    # for circuit_reset_seconds before a probe request is let through.
+    rapidapi_rate_limit_per_second: float = 10.0
+    rapidapi_rate_limit_burst: int = 20
+    rapidapi_rate_limit_max_wait_ms: int = 2000
+    rapidapi_retry_attempts: int = 2
+    rapidapi_retry_base_ms: int = 200
+    rapidapi_retry_max_ms: int = 2000
+    rapidapi_hedge_after_ms: int = 0
+    rapidapi_circuit_failure_threshold: int = 5  # 0 disables the circuit breaker
+    rapidapi_circuit_reset_seconds: float = 30.0
+    
+    # Property tool result cache (a TTL of 0 disables caching for that tool)
+    cache_search_ttl_seconds: float = 300.0
+    cache_details_ttl_seconds: float = 1800.0
+    cache_max_entries: int = 2048
+    cache_max_bytes: int = 16 * 1024 * 1024
+    
+    # Local listing store: search_properties is answered from an on-disk
+    # SQLite index of ingested listings while a location's data is fresher
+    # than listing_store_max_age_seconds, and from RapidAPI otherwise
+    listing_store: bool = False
+    listing_store_path: str = "listings.sqlite3"
+    listing_store_seed_file: Optional[str] = None  # JSON / JSON-lines dump ingested at startup
+    listing_store_locations: str = ""  # Comma-separated locations always kept fresh
+    listing_store_max_age_seconds: float = 3600.0
+    # Regions searched within the max age are refreshed this often; a bit
+    # under the max age so they are re-ingested before going stale
+    listing_store_refresh_seconds: float = 3000.0
+    listing_store_max_regions: int = 200
+    listing_store_page_size: int = 30
+    listing_store_max_pages: int = 5
+    
+    # Tool results sent to the model: "compact-1" drops placeholders, uses
+    # abbreviated keys and trims each tool's output to its token budget
+    # (0 = no budget); "full" sends the formatted result as plain JSON
+    tool_output_schema: Literal["full", "compact-1"] = "compact-1"
+    tool_output_search_budget_tokens: int = 160
+    tool_output_details_budget_tokens: int = 150
+    tool_output_compare_budget_tokens: int = 260
+    
+    # Maximum time a tool call may run before the model is told it failed
+    tool_call_timeout_seconds: float = 8.0
+    
+    # Speculative detail prefetch for listings returned by search_properties
+    prefetch_details: bool = False
+    prefetch_listings: int = 3
+    prefetch_max_per_session: int = 2
+    prefetch_max_global: int = 16
+    
+    # compare_properties fetches the compared listings' details concurrently,
+    # at most this many at a time per call
+    compare_max_concurrent: int = 3
+    
+    # Logging: records are queued and written by a background thread. Each
+    # message template (or event type) is rate limited, and keys listed in
+    # log_sample_rates ("key=fraction,...") keep only that fraction of their
+    # records. log_openai_events logs every OpenAI event type at DEBUG level,
+    # under its event type as the key.
+    log_level: str = "INFO"
+    log_queue_size: int = 10000
+    log_rate_limit_per_second: float = 20.0  # 0 disables rate limiting
+    log_rate_limit_burst: int = 50
+    log_sample_rates: str = "response.audio.delta=0.01,response.audio_transcript.delta=0.05"
+    log_openai_events: bool = False
+    
+    # Call records: transcripts, tool calls and response timings of every
+    # session, queued and written by a background thread to JSON-lines
+    # segments in call_records_dir (fsynced every call_records_fsync_seconds,
+    # 0 = every batch). Records are dropped if the queue fills up.
+    call_records: bool = False
+    call_records_dir: str = "call_records"
+    call_records_segment_max_mb: int = 64
+    call_records_queue_size: int = 10000
+    call_records_batch_max: int = 512
+    call_records_fsync_seconds: float = 1.0
+    
+    # Event capture: both directions of a sampled fraction of OpenAI sessions
+    # are written to binary capture files in event_capture_dir, for replay
+    # with benchmarks/replay_capture.py. Capturing stops at the size limit.
+    event_capture: bool = False
+    event_capture_dir: str = "captures"
+    event_capture_sample_rate: float = 1.0
+    event_capture_max_mb: int = 200
+    
+    # Token required in the X-Admin-Token header for /admin endpoints
+    admin_token: Optional[str] = None
     
     @property
     def openai_realtime_url(self) -> str:
         """WebSocket URL for OpenAI Realtime API."""
-        return f"wss://api.openai.com/v1/realtime?model={self.openai_model}"
+        return f"{self.openai_realtime_base_url}?model={self.openai_model}"
     
     @property
     def openai_headers(self) -> dict:
@@ -47,6 +195,22 @@ class Settings(BaseSettings):
         }
 
 
+_settings: Optional[Settings] = None
+
+
 def get_settings() -> Settings:
-    """Get application settings singleton."""
-    return Settings()
+    """Get application settings singleton (loaded once, then immutable)."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """
+    Re-read settings from the environment and .env, replacing the singleton.
+    Raises without replacing anything if the new configuration is invalid.
+    """
+    global _settings
+    _settings = Settings()
+    return _settings
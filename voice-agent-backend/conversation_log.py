@@ -0,0 +1,152 @@
+"""
+Compact record of a voice session's conversation.
+Lets a replacement OpenAI connection be brought up to date after the
+original one drops mid-call.
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Server events the log is built from
+CONVERSATION_LOG_EVENTS = frozenset({
+    "conversation.item.created",
+    "conversation.item.deleted",
+    "conversation.item.input_audio_transcription.completed",
+    "response.audio_transcript.done",
+    "response.text.done",
+    "response.function_call_arguments.done"
+})
+
+
+class ConversationLog:
+    """
+    The conversation as text, in server order.
+
+    Items are recorded from the server's own events: conversation.item.created
+    fixes an item's place, and the matching *.done / transcription events
+    fill in its text, so only what the server acknowledged is kept. Spoken
+    turns are kept as their transcripts, which is all a new session needs to
+    carry on. Only the newest max_items are kept.
+    """
+
+    def __init__(self, max_items: int = 50):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, dict]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def record(self, event_type: str, event: dict) -> None:
+        """Update the log from one of CONVERSATION_LOG_EVENTS."""
+        if event_type == "conversation.item.created":
+            self._add_item(event.get("item", {}))
+        elif event_type == "conversation.item.deleted":
+            self._items.pop(event.get("item_id"), None)
+        elif event_type == "conversation.item.input_audio_transcription.completed":
+            self._set(event.get("item_id"), text=event.get("transcript", ""))
+        elif event_type == "response.audio_transcript.done":
+            self._set(event.get("item_id"), role="assistant", text=event.get("transcript", ""))
+        elif event_type == "response.text.done":
+            self._set(event.get("item_id"), role="assistant", text=event.get("text", ""))
+        elif event_type == "response.function_call_arguments.done":
+            self._set(
+                event.get("item_id"),
+                type="function_call",
+                call_id=event.get("call_id"),
+                name=event.get("name"),
+                arguments=event.get("arguments", "")
+            )
+
+    def replay_events(self) -> List[str]:
+        """
+        Serialized conversation.item.create events recreating the log.
+        Items keep their original ids, so the server's echoes of the replay
+        don't add them to the log a second time.
+        """
+        events = []
+        for item_id, entry in self._items.items():
+            item = self._to_item(item_id, entry)
+            if item is not None:
+                events.append(json.dumps({"type": "conversation.item.create", "item": item}))
+        return events
+
+    def _add_item(self, item: dict) -> None:
+        item_id = item.get("id")
+        if not item_id or item_id in self._items:
+            return
+
+        item_type = item.get("type")
+        if item_type == "message":
+            text = "".join(
+                part.get("text") or part.get("transcript") or ""
+                for part in item.get("content", [])
+            )
+            entry = {"type": "message", "role": item.get("role"), "text": text}
+        elif item_type == "function_call":
+            entry = {
+                "type": "function_call",
+                "call_id": item.get("call_id"),
+                "name": item.get("name"),
+                "arguments": item.get("arguments", "")
+            }
+        elif item_type == "function_call_output":
+            entry = {"type": "function_call_output", "call_id": item.get("call_id"), "output": item.get("output", "")}
+        else:
+            return
+
+        self._items[item_id] = entry
+        self._trim()
+
+    def _set(self, item_id: Optional[str], **fields) -> None:
+        """Fill in an item, adding it if its created event was missed."""
+        if not item_id:
+            return
+        entry = self._items.get(item_id)
+        if entry is None:
+            entry = {"type": "message"}
+            self._items[item_id] = entry
+            self._trim()
+        entry.update(fields)
+
+    def _trim(self) -> None:
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        # An output whose call was trimmed away can't be replayed on its own
+        while self._items:
+            first = next(iter(self._items.values()))
+            if first.get("type") != "function_call_output":
+                break
+            self._items.popitem(last=False)
+
+    @staticmethod
+    def _to_item(item_id: str, entry: dict) -> Optional[Dict]:
+        """The conversation item to create for a log entry, if it has content."""
+        if entry["type"] == "message":
+            text = entry.get("text")
+            if not text or entry.get("role") not in ("user", "assistant", "system"):
+                return None
+            part_type = "text" if entry["role"] == "assistant" else "input_text"
+            return {
+                "id": item_id,
+                "type": "message",
+                "role": entry["role"],
+                "content": [{"type": part_type, "text": text}]
+            }
+        if entry["type"] == "function_call":
+            return {
+                "id": item_id,
+                "type": "function_call",
+                "call_id": entry.get("call_id"),
+                "name": entry.get("name"),
+                "arguments": entry.get("arguments") or "{}"
+            }
+        return {
+            "id": item_id,
+            "type": "function_call_output",
+            "call_id": entry.get("call_id"),
+            "output": entry.get("output", "")
+        }
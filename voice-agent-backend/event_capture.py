@@ -0,0 +1,238 @@
+"""
+Capture of OpenAI Realtime traffic for replay.
+Both directions of a session are written to a compact binary file, so a
+slow production call can be replayed against the session handler later
+(see benchmarks/replay_capture.py).
+"""
+
+import binascii
+import json
+import logging
+import mmap
+import os
+import random
+import struct
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# File layout: MAGIC, then the header (version, metadata length) and the
+# metadata as JSON, then records. Each record is its header (kind, time in
+# ns since the capture started, payload length) followed by the payload.
+MAGIC = b"VCAP"
+VERSION = 1
+_FILE_HEADER = struct.Struct("<HI")
+_RECORD_HEADER = struct.Struct("<BQI")
+# Payload prefix of SERVER_AUDIO records: where the delta goes in the
+# event template, and the template's length
+_AUDIO_HEADER = struct.Struct("<II")
+
+# Record kinds
+SERVER_EVENT = 1   # Event from OpenAI, as the raw JSON frame
+SERVER_AUDIO = 2   # response.audio.delta: the frame without its delta, then the raw PCM
+CLIENT_EVENT = 3   # Event sent to OpenAI, as JSON
+CLIENT_AUDIO = 4   # Caller audio sent to OpenAI, as raw PCM
+MARK = 5           # Something that happened to the connection (e.g. a reconnect), as JSON
+
+KIND_NAMES = {
+    SERVER_EVENT: "server_event",
+    SERVER_AUDIO: "server_audio",
+    CLIENT_EVENT: "client_event",
+    CLIENT_AUDIO: "client_audio",
+    MARK: "mark"
+}
+
+_AUDIO_DELTA_PREFIX = '{"type":"response.audio.delta"'
+_DELTA_MARKER = '"delta":"'
+
+
+class EventCapture:
+    """
+    Writes one session's OpenAI traffic to a capture file.
+
+    Audio deltas from OpenAI and caller audio are stored as raw PCM rather
+    than base64, which makes captures about a quarter smaller. The delta is
+    cut out of the frame by position, without parsing it, and the frame
+    can be rebuilt byte for byte. Writes go through a large buffer, so the
+    event loop only touches the disk once per buffer. Once the file
+    reaches max_bytes, a "truncated" mark is written and the rest of the
+    session is not captured.
+    """
+
+    def __init__(self, path: str, metadata: Optional[Dict] = None, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.records = 0
+        self.bytes = 0
+        self.truncated = False
+        self._file = open(path, "wb", buffering=1024 * 1024)
+        self._origin = time.monotonic_ns()
+
+        meta = json.dumps({"started_at": time.time(), **(metadata or {})}).encode("utf-8")
+        self._file.write(MAGIC + _FILE_HEADER.pack(VERSION, len(meta)) + meta)
+        self.bytes = len(MAGIC) + _FILE_HEADER.size + len(meta)
+
+    @classmethod
+    def for_session(cls, settings, session_id: str, channel: str) -> Optional["EventCapture"]:
+        """Start a capture for a session if capturing is enabled and it is sampled."""
+        if not settings.event_capture or random.random() >= settings.event_capture_sample_rate:
+            return None
+        try:
+            os.makedirs(settings.event_capture_dir, exist_ok=True)
+            path = os.path.join(
+                settings.event_capture_dir,
+                f"{time.strftime('%Y%m%dT%H%M%S')}-{session_id}.vcap"
+            )
+            capture = cls(path, {
+                "session_id": session_id,
+                "channel": channel,
+                "model": settings.openai_model,
+                "voice": settings.openai_voice,
+                "sample_rate": settings.sample_rate
+            }, settings.event_capture_max_mb * 1024 * 1024)
+        except OSError as e:
+            logger.error("Could not start event capture: %s", e)
+            return None
+        logger.info("Capturing OpenAI events to %s", path)
+        return capture
+
+    def server_frame(self, raw) -> None:
+        """Record a frame received from OpenAI."""
+        if isinstance(raw, (bytes, bytearray)):
+            raw = raw.decode("utf-8")
+        if raw.startswith(_AUDIO_DELTA_PREFIX):
+            start = raw.find(_DELTA_MARKER)
+            if start != -1:
+                start += len(_DELTA_MARKER)
+                end = raw.find('"', start)
+                if end != -1:
+                    try:
+                        pcm = binascii.a2b_base64(raw[start:end])
+                    except binascii.Error:
+                        pass
+                    else:
+                        template = (raw[:start] + raw[end:]).encode("utf-8")
+                        split = len(raw[:start].encode("utf-8"))
+                        self._write(SERVER_AUDIO, _AUDIO_HEADER.pack(split, len(template)), template, pcm)
+                        return
+        self._write(SERVER_EVENT, raw.encode("utf-8"))
+
+    def client_message(self, data: str) -> None:
+        """Record a JSON event sent to OpenAI."""
+        self._write(CLIENT_EVENT, data.encode("utf-8"))
+
+    def client_audio(self, pcm: bytes) -> None:
+        """Record caller audio sent to OpenAI."""
+        self._write(CLIENT_AUDIO, pcm)
+
+    def mark(self, name: str, **fields) -> None:
+        """Record a connection event, such as a reconnect."""
+        self._write(MARK, json.dumps({"mark": name, **fields}).encode("utf-8"))
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        try:
+            self._file.close()
+        except OSError as e:
+            logger.error("Could not finish event capture %s: %s", self.path, e)
+        logger.info("Event capture finished: %s (%s records, %s bytes)", self.path, self.records, self.bytes)
+
+    def _write(self, kind: int, *parts) -> None:
+        if self.truncated or self._file.closed:
+            return
+        length = sum(len(part) for part in parts)
+        if self.bytes + _RECORD_HEADER.size + length > self.max_bytes:
+            self.truncated = True
+            parts = (json.dumps({"mark": "truncated"}).encode("utf-8"),)
+            kind, length = MARK, len(parts[0])
+        try:
+            self._file.write(_RECORD_HEADER.pack(kind, time.monotonic_ns() - self._origin, length))
+            for part in parts:
+                self._file.write(part)
+        except OSError as e:
+            logger.error("Event capture stopped: %s", e)
+            self.truncated = True
+            return
+        self.records += 1
+        self.bytes += _RECORD_HEADER.size + length
+
+
+class CaptureReader:
+    """
+    Reads a capture file through a memory map.
+    Records are read in order straight from the map, so long captures can
+    be replayed without loading them into memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty capture file: {path}")
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a capture file: {path}")
+        version, meta_length = _FILE_HEADER.unpack_from(self._map, len(MAGIC))
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported capture version {version}: {path}")
+        offset = len(MAGIC) + _FILE_HEADER.size
+        self.metadata: Dict = json.loads(self._map[offset:offset + meta_length])
+        self._records_start = offset + meta_length
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __iter__(self) -> Iterator[Tuple[int, int, bytes]]:
+        """Yield (kind, time in ns since the capture started, payload) per record."""
+        data = self._map
+        offset = self._records_start
+        end = len(data)
+        header_size = _RECORD_HEADER.size
+        while offset + header_size <= end:
+            kind, t_ns, length = _RECORD_HEADER.unpack_from(data, offset)
+            offset += header_size
+            if offset + length > end:
+                # The writer stopped mid-record (e.g. the process was killed)
+                logger.warning("Capture %s ends with a partial record", self.path)
+                return
+            yield kind, t_ns, data[offset:offset + length]
+            offset += length
+
+    @staticmethod
+    def server_audio_frame(payload: bytes) -> str:
+        """Rebuild the response.audio.delta frame of a SERVER_AUDIO record."""
+        split, template_length = _AUDIO_HEADER.unpack_from(payload)
+        template = payload[_AUDIO_HEADER.size:_AUDIO_HEADER.size + template_length]
+        pcm = payload[_AUDIO_HEADER.size + template_length:]
+        return (template[:split] + binascii.b2a_base64(pcm, newline=False) + template[split:]).decode("utf-8")
+
+    def summary(self) -> Dict:
+        """Record counts and payload bytes per kind, and the capture's duration."""
+        counts: Dict[str, int] = {}
+        payload_bytes: Dict[str, int] = {}
+        last_ns = 0
+        for kind, t_ns, payload in self:
+            name = KIND_NAMES.get(kind, str(kind))
+            counts[name] = counts.get(name, 0) + 1
+            payload_bytes[name] = payload_bytes.get(name, 0) + len(payload)
+            last_ns = t_ns
+        return {
+            "metadata": self.metadata,
+            "duration_s": round(last_ns / 1e9, 3),
+            "records": counts,
+            "payload_bytes": payload_bytes,
+            "file_bytes": len(self._map)
+        }
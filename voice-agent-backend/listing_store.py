@@ -0,0 +1,482 @@
+"""
+Local listing store for property searches.
+Keeps listings ingested from the realty API (or a file dump) in an on-disk
+SQLite index so search_properties can be answered without a network hop.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import LISTING_STORE_LOOKUPS, LISTING_STORE_QUERY_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Property types the search tool accepts that cover the same listings
+_TYPE_GROUPS = {
+    "apartment": ("apartment", "unit"),
+    "unit": ("apartment", "unit"),
+}
+
+_PRICE_PATTERN = re.compile(r"\$\s*([\d,]+(?:\.\d+)?)\s*([km])?", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    id TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    suburb TEXT,
+    postcode TEXT,
+    price INTEGER,
+    bedrooms INTEGER,
+    property_type TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS regions (
+    location TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    refreshed_at REAL NOT NULL DEFAULT 0,
+    last_used_at REAL NOT NULL DEFAULT 0,
+    listing_count INTEGER NOT NULL DEFAULT 0,
+    truncated INTEGER NOT NULL DEFAULT 0,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (location, channel)
+);
+CREATE TABLE IF NOT EXISTS region_listings (
+    location TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    listing_id TEXT NOT NULL,
+    PRIMARY KEY (location, channel, rank)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS region_listings_by_listing ON region_listings (listing_id);
+"""
+
+
+def region_key(location: str) -> str:
+    """Normalize a spoken location into the key its listings are stored under."""
+    return " ".join(location.split()).casefold()
+
+
+def parse_price(listing: Dict) -> Optional[int]:
+    """Best-effort numeric price (lower bound of a range) from a listing."""
+    price = listing.get("price") or {}
+    if isinstance(price, (int, float)):
+        return int(price)
+    value = price.get("value")
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _PRICE_PATTERN.search(price.get("display") or "")
+    if not match:
+        return None
+    amount = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    if suffix == "k":
+        amount *= 1_000
+    elif suffix == "m":
+        amount *= 1_000_000
+    return int(amount)
+
+
+def property_kind(listing: Dict) -> Optional[str]:
+    """Map a listing's property type onto the search tool's property types."""
+    raw = str(listing.get("propertyType") or "").casefold()
+    for kind in ("townhouse", "house", "apartment", "unit", "land"):
+        if kind in raw:
+            return kind
+    if "flat" in raw or "studio" in raw:
+        return "unit"
+    return raw or None
+
+
+def _bedrooms(listing: Dict) -> Optional[int]:
+    value = listing.get("bedrooms")
+    features = listing.get("features")
+    if value is None and isinstance(features, dict):
+        value = features.get("general", {}).get("bedrooms")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _listing_row(listing: Dict, channel: str, now: float) -> Optional[Tuple]:
+    listing_id = listing.get("id", listing.get("listingId"))
+    if listing_id is None:
+        return None
+    address = listing.get("address") or {}
+    return (
+        str(listing_id),
+        channel,
+        region_key(address.get("suburb") or "") or None,
+        str(address.get("postcode") or "") or None,
+        parse_price(listing),
+        _bedrooms(listing),
+        property_kind(listing),
+        json.dumps(listing, separators=(",", ":")),
+        now
+    )
+
+
+class ListingStore:
+    """
+    SQLite index of listings per searched location.
+
+    A location ("Parramatta", "2150", "Sydney") and channel form a region:
+    its listings in the order the API ranked them, plus when it was last
+    refreshed. Searches for a region refreshed within max_age_seconds are
+    answered locally by filtering those listings on price, bedrooms and
+    property type; anything else returns None so the caller goes live.
+    Regions that missed are tracked (up to max_regions, least recently
+    used first out) for the background refresher to ingest. It keeps
+    refreshing a region only while it is still searched: one not used
+    within max_age_seconds (and not pinned) is left to go stale.
+
+    Queries only read, on the event loop thread (they are index lookups
+    over a few hundred rows). Every write, including region tracking, goes
+    through a second connection meant to be used from a worker thread; the
+    database is in WAL mode so readers never wait for it.
+    """
+
+    def __init__(self, path: str, max_age_seconds: float = 3600.0, max_regions: int = 200):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.max_regions = max_regions
+        self._reader = self._connect()
+        self._writer = self._connect(check_same_thread=False)
+        self._writer.executescript(_SCHEMA)
+        # Stores created before regions recorded whether ingest was cut short
+        columns = {row[1] for row in self._writer.execute("PRAGMA table_info(regions)")}
+        if "truncated" not in columns:
+            self._writer.execute("ALTER TABLE regions ADD COLUMN truncated INTEGER NOT NULL DEFAULT 0")
+        self.counters = {"hits": 0, "stale": 0, "misses": 0, "partial": 0, "stale_served": 0}
+
+        # Region use since the last sync: (location, channel) -> (last used, pinned)
+        self._usage: Dict[Tuple[str, str], Tuple[float, bool]] = {}
+
+    @classmethod
+    def for_settings(cls, settings) -> "ListingStore":
+        """Build a store at the configured path, pinning the configured locations."""
+        store = cls(
+            settings.listing_store_path,
+            max_age_seconds=settings.listing_store_max_age_seconds,
+            max_regions=settings.listing_store_max_regions
+        )
+        for location in settings.listing_store_locations.split(","):
+            if location.strip():
+                for channel in ("BUY", "RENT"):
+                    store.track(location, channel, pinned=True)
+        store.sync_regions()
+        if settings.listing_store_seed_file:
+            store.ingest_file(settings.listing_store_seed_file)
+        return store
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=check_same_thread, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
+
+    def search(
+        self,
+        location: str,
+        channel: str = "BUY",
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        bedrooms: Optional[int] = None,
+        property_type: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10,
+        allow_stale: bool = False
+    ) -> Optional[Dict]:
+        """
+        Search a fresh region, returning the raw listings in the shape of a
+        /properties/list response, or None if the region isn't fresh. A
+        region whose ingest was truncated only holds the first listings, so
+        a result short of a full page from it is also None: RapidAPI may
+        have more. With allow_stale, any ingested region answers (a fallback while
+        RapidAPI is unavailable).
+        """
+        started = time.perf_counter()
+        key = region_key(location)
+        now = time.time()
+        region = self._reader.execute(
+            "SELECT refreshed_at, truncated FROM regions WHERE location = ? AND channel = ?", (key, channel)
+        ).fetchone()
+        if allow_stale:
+            if region is None or region[0] == 0:
+                return None
+        else:
+            self.track(location, channel)
+            if region is None or region[0] == 0:
+                self._count("misses", "miss")
+                return None
+            if now - region[0] > self.max_age_seconds:
+                self._count("stale", "stale")
+                return None
+
+        sql = [
+            "SELECT l.data FROM region_listings r JOIN listings l ON l.id = r.listing_id",
+            "WHERE r.location = ? AND r.channel = ?"
+        ]
+        params: List[Any] = [key, channel]
+        if min_price:
+            sql.append("AND l.price >= ?")
+            params.append(min_price)
+        if max_price:
+            sql.append("AND l.price <= ?")
+            params.append(max_price)
+        if bedrooms:
+            sql.append("AND l.bedrooms >= ?")
+            params.append(bedrooms)
+        if property_type:
+            kinds = _TYPE_GROUPS.get(property_type, (property_type,))
+            sql.append(f"AND l.property_type IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+        sql.append("ORDER BY r.rank LIMIT ? OFFSET ?")
+        params.extend((page_size, (page - 1) * page_size))
+
+        rows = self._reader.execute(" ".join(sql), params).fetchall()
+        if not allow_stale and region[1] and len(rows) < page_size:
+            self._count("partial", "partial")
+            return None
+        if allow_stale:
+            self._count("stale_served", "stale_served")
+        else:
+            self._count("hits", "hit")
+        LISTING_STORE_QUERY_DURATION.observe(time.perf_counter() - started)
+        return {"data": [json.loads(data) for data, in rows]}
+
+    def track(self, location: str, channel: str, pinned: bool = False) -> None:
+        """Ask for a region to be ingested and kept fresh (recorded at the next sync)."""
+        key = region_key(location)
+        if key:
+            previous = self._usage.get((key, channel))
+            self._usage[key, channel] = (time.time(), pinned or bool(previous and previous[1]))
+
+    def sync_regions(self) -> None:
+        """
+        Record tracked regions and their last use, then evict the least
+        recently used unpinned regions past max_regions.
+        """
+        usage, self._usage = self._usage, {}
+        conn = self._writer
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO regions (location, channel, last_used_at, pinned) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (location, channel) DO UPDATE SET "
+                "last_used_at = excluded.last_used_at, pinned = max(pinned, excluded.pinned)",
+                ((key, channel, used, int(pinned)) for (key, channel), (used, pinned) in usage.items())
+            )
+            excess = conn.execute("SELECT count(*) FROM regions").fetchone()[0] - self.max_regions
+            if excess > 0:
+                evicted = conn.execute(
+                    "SELECT location, channel FROM regions WHERE pinned = 0 ORDER BY last_used_at LIMIT ?",
+                    (excess,)
+                ).fetchall()
+                for key, channel in evicted:
+                    old_ids = self._region_listing_ids(key, channel)
+                    conn.execute("DELETE FROM regions WHERE location = ? AND channel = ?", (key, channel))
+                    conn.execute("DELETE FROM region_listings WHERE location = ? AND channel = ?", (key, channel))
+                    self._delete_orphans(old_ids)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def regions_due(self, refresh_seconds: float, limit: int) -> List[Tuple[str, str]]:
+        """
+        Regions last refreshed more than refresh_seconds ago, oldest first:
+        pinned ones, and others searched within max_age_seconds.
+        """
+        now = time.time()
+        return self._writer.execute(
+            "SELECT location, channel FROM regions WHERE refreshed_at < ? AND (pinned = 1 OR last_used_at >= ?) "
+            "ORDER BY refreshed_at LIMIT ?",
+            (now - refresh_seconds, now - self.max_age_seconds, limit)
+        ).fetchall()
+
+    def replace_region(self, location: str, channel: str, listings: Iterable[Dict], truncated: bool = False) -> int:
+        """
+        Store the current listings of a region, in ranked order.
+        Listings are upserted (rows whose data is unchanged are left alone)
+        and the region's membership is replaced. truncated records that
+        these are only the region's first listings. Returns the listing count.
+        """
+        key = region_key(location)
+        now = time.time()
+        rows = [row for row in (_listing_row(listing, channel, now) for listing in listings) if row]
+        conn = self._writer
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old_ids = self._region_listing_ids(key, channel)
+            self._upsert(rows)
+            conn.execute("DELETE FROM region_listings WHERE location = ? AND channel = ?", (key, channel))
+            conn.executemany(
+                "INSERT INTO region_listings (location, channel, rank, listing_id) VALUES (?, ?, ?, ?)",
+                ((key, channel, rank, row[0]) for rank, row in enumerate(rows))
+            )
+            conn.execute(
+                "INSERT INTO regions (location, channel, refreshed_at, listing_count, truncated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (location, channel) DO UPDATE SET "
+                "refreshed_at = excluded.refreshed_at, listing_count = excluded.listing_count, "
+                "truncated = excluded.truncated",
+                (key, channel, now, len(rows), int(truncated))
+            )
+            self._delete_orphans(old_ids - {row[0] for row in rows})
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def ingest_dump(self, listings: Iterable[Dict], channel: str = "BUY") -> int:
+        """
+        Load a dump of listings, making each suburb and postcode in it a
+        fresh region. Returns the number of listings stored.
+        """
+        listings = list(listings)
+        regions: Dict[str, List[Dict]] = {}
+        for listing in listings:
+            address = listing.get("address") or {}
+            for location in (address.get("suburb"), address.get("postcode")):
+                if location:
+                    regions.setdefault(region_key(str(location)), []).append(listing)
+        for location, members in regions.items():
+            self.replace_region(location, channel, members)
+        return len(listings)
+
+    def ingest_file(self, path: str, channel: str = "BUY") -> int:
+        """Load a JSON array, /properties/list response or JSON-lines file of listings."""
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = [json.loads(line) for line in text.splitlines() if line.strip()]
+        if isinstance(data, dict):
+            data = data.get("data", data.get("listings", []))
+        count = self.ingest_dump(data, channel)
+        logger.info("Ingested %s listings from %s", count, path)
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        """Sizes and lookup counters for logging and the admin API."""
+        listings = self._reader.execute("SELECT count(*) FROM listings").fetchone()[0]
+        regions, fresh = self._reader.execute(
+            "SELECT count(*), coalesce(sum(refreshed_at >= ?), 0) FROM regions",
+            (time.time() - self.max_age_seconds,)
+        ).fetchone()
+        return {**self.counters, "listings": listings, "regions": regions, "fresh_regions": fresh}
+
+    def _upsert(self, rows: List[Tuple]) -> None:
+        self._writer.executemany(
+            "INSERT INTO listings (id, channel, suburb, postcode, price, bedrooms, property_type, data, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET channel = excluded.channel, suburb = excluded.suburb, "
+            "postcode = excluded.postcode, price = excluded.price, bedrooms = excluded.bedrooms, "
+            "property_type = excluded.property_type, data = excluded.data, updated_at = excluded.updated_at "
+            "WHERE listings.data != excluded.data",
+            rows
+        )
+
+    def _region_listing_ids(self, key: str, channel: str) -> set:
+        return {listing_id for listing_id, in self._writer.execute(
+            "SELECT listing_id FROM region_listings WHERE location = ? AND channel = ?", (key, channel)
+        )}
+
+    def _delete_orphans(self, listing_ids: Iterable[str]) -> None:
+        """Drop listings that left a region and no other region refers to (withdrawn or sold)."""
+        self._writer.executemany(
+            "DELETE FROM listings WHERE id = ? AND NOT EXISTS "
+            "(SELECT 1 FROM region_listings r WHERE r.listing_id = listings.id)",
+            ((listing_id,) for listing_id in listing_ids)
+        )
+
+    def _count(self, counter: str, outcome: str) -> None:
+        self.counters[counter] += 1
+        LISTING_STORE_LOOKUPS.labels(outcome).inc()
+
+
+class ListingRefresher:
+    """
+    Background task keeping the store's regions fresh.
+
+    Every poll it records the regions searches asked for, then ingests the
+    ones due for a refresh, oldest first and one at a time, through
+    fetch_region (which returns a region's listings and whether they were
+    truncated, or None if the upstream request failed; failed regions are
+    retried after retry_seconds). Database writes run in a worker thread so the event
+    loop keeps serving calls.
+    """
+
+    def __init__(
+        self,
+        store: ListingStore,
+        fetch_region: Callable[[str, str], Awaitable[Optional[Tuple[List[Dict], bool]]]],
+        refresh_seconds: float = 3000.0,
+        poll_seconds: float = 5.0,
+        retry_seconds: float = 60.0,
+        batch: int = 10
+    ):
+        self.store = store
+        self._fetch_region = fetch_region
+        self.refresh_seconds = refresh_seconds
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.batch = batch
+        self._task: Optional[asyncio.Task] = None
+        self._retry_at: Dict[Tuple[str, str], float] = {}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh_due(self) -> int:
+        """Refresh one batch of due regions; returns how many were refreshed."""
+        await asyncio.to_thread(self.store.sync_regions)
+        now = time.monotonic()
+        refreshed = 0
+        for region in self.store.regions_due(self.refresh_seconds, self.batch + len(self._retry_at)):
+            if self._retry_at.get(region, 0) > now:
+                continue
+            if refreshed >= self.batch:
+                break
+            location, channel = region
+            fetched = await self._fetch_region(location, channel)
+            if fetched is None:
+                self._retry_at[region] = now + self.retry_seconds
+                continue
+            self._retry_at.pop(region, None)
+            listings, truncated = fetched
+            count = await asyncio.to_thread(self.store.replace_region, location, channel, listings, truncated)
+            logger.info("Refreshed listing store region %r (%s): %s listings", location, channel, count)
+            refreshed += 1
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_due()
+            except Exception as e:
+                logger.error("Listing store refresh failed: %s", e)
+            await asyncio.sleep(self.poll_seconds)
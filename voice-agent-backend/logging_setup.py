@@ -0,0 +1,212 @@
+"""
+Logging for the Voice Agent backend.
+Log records are queued on the calling thread and written by a background
+thread, so a slow stderr never stalls the event loop. High-frequency
+records can be sampled and rate limited, and every record carries the
+session and turn it belongs to.
+"""
+
+import atexit
+import contextvars
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO
+
+from metrics import LOG_RECORDS_DROPPED
+
+# Bound once: labels() takes a lock and a dict lookup on every call
+_DROPPED_SAMPLED = LOG_RECORDS_DROPPED.labels("sampled")
+_DROPPED_RATE_LIMITED = LOG_RECORDS_DROPPED.labels("rate_limited")
+_DROPPED_QUEUE_FULL = LOG_RECORDS_DROPPED.labels("queue_full")
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(session_id)s %(turn_id)s] %(message)s"
+
+
+class LogContext:
+    """
+    Per-session logging context.
+    One object is shared by all of a session's tasks, so advancing the turn
+    is seen everywhere (a context variable alone would only change it in the
+    task that set it).
+    """
+
+    __slots__ = ("session_id", "turn")
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.turn = 0
+
+    def next_turn(self) -> int:
+        self.turn += 1
+        return self.turn
+
+
+_log_context: contextvars.ContextVar[Optional[LogContext]] = contextvars.ContextVar("log_context", default=None)
+
+
+def bind_session(session_id: Optional[str] = None) -> LogContext:
+    """
+    Start a logging context for the current task and the tasks it creates.
+    Call at the top of a session's task, before any child tasks exist.
+    """
+    context = LogContext(session_id)
+    _log_context.set(context)
+    return context
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the session and turn of the code that logged them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        if context is None:
+            record.session_id = "-"
+            record.turn_id = "-"
+        else:
+            record.session_id = context.session_id
+            record.turn_id = f"t{context.turn}"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Sampling and rate limiting for high-frequency records.
+
+    Records are keyed by their event_type extra (e.g. an OpenAI event type)
+    or, failing that, by their unformatted message template, which is why
+    hot-path logging passes arguments instead of f-strings. A key listed in
+    sample_rates keeps that fraction of its records; every key is then
+    limited to rate_per_second with bursts of up to burst. Warnings and
+    errors are rate limited but never sampled.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 20.0,
+        burst: int = 50,
+        sample_rates: Optional[Dict[str, float]] = None
+    ):
+        super().__init__()
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.sample_rates = dict(sample_rates or {})
+        self._buckets: Dict[str, list] = {}
+
+    @staticmethod
+    def parse_sample_rates(spec: str) -> Dict[str, float]:
+        """Parse 'response.audio.delta=0.01,Function call: %s=0.5' into a mapping."""
+        rates = {}
+        for item in spec.split(","):
+            key, sep, rate = item.rpartition("=")
+            if sep and key.strip():
+                rates[key.strip()] = float(rate)
+        return rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "event_type", None) or record.msg
+        if not isinstance(key, str):
+            key = str(key)
+
+        rate = self.sample_rates.get(key)
+        if rate is not None and record.levelno < logging.WARNING and random.random() >= rate:
+            _DROPPED_SAMPLED.inc()
+            return False
+
+        if self.rate_per_second <= 0:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= 10_000:
+                self._buckets.clear()
+            bucket = self._buckets[key] = [float(self.burst), now, 0]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_second)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            _DROPPED_RATE_LIMITED.inc()
+            return False
+        bucket[0] = tokens - 1
+        if bucket[2]:
+            record.msg = f"{record.msg} (after {bucket[2]} similar records were suppressed)"
+            bucket[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks or formats on the calling thread.
+
+    Records are enqueued as they are; the message is only built by the
+    listener thread, so arguments should not be mutated after logging.
+    Exception info is rendered up front because tracebacks don't outlive
+    the except block reliably. When the queue is full the record is dropped
+    and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DROPPED_QUEUE_FULL.inc()
+
+
+def configure_logging(
+    level: str = "INFO",
+    queue_size: int = 10_000,
+    rate_per_second: float = 20.0,
+    burst: int = 50,
+    sample_rates: Optional[Dict[str, float]] = None,
+    stream: Optional[TextIO] = None
+) -> QueueListener:
+    """
+    Route all logging (including uvicorn's) through a queue to a background
+    writer. Returns the started listener; it is stopped, flushing what is
+    left in the queue, at interpreter exit.
+    """
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(rate_per_second, burst, sample_rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    # uvicorn installs its own stderr handlers; send its records through ours
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def configure_logging_for_settings(settings) -> QueueListener:
+    """Configure logging from the log_* settings."""
+    return configure_logging(
+        level=settings.log_level,
+        queue_size=settings.log_queue_size,
+        rate_per_second=settings.log_rate_limit_per_second,
+        burst=settings.log_rate_limit_burst,
+        sample_rates=SamplingFilter.parse_sample_rates(settings.log_sample_rates)
+    )
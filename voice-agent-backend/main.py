@@ -3,20 +3,29 @@ FastAPI application for OpenAI Realtime Voice Agent.
 Provides WebSocket endpoint for real-time voice conversations.
 """
 
+import asyncio
 import logging
+import signal
 from contextlib import asynccontextmanager
+from typing import Literal, Optional
 
-from fastapi import FastAPI, WebSocket
+from fastapi import Depends, FastAPI, Header, HTTPException, Response, WebSocket
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from config import get_settings
+from admission import SessionAdmission
+from call_records import CallRecorder
+from config import get_settings, reload_settings
+from logging_setup import configure_logging_for_settings
+from metrics import CALL_RECORDS_QUEUE_DEPTH, UPSTREAM_CONNECTIONS, render_latest
+from openai_realtime import get_session_template
+from realtime_pool import RealtimeConnectionPool
+from realty_api import RealtyAPIClient
+from telephony import TelephonySessionHandler
 from websocket_handler import handle_voice_websocket
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging (queued, written by a background thread)
+configure_logging_for_settings(get_settings())
 logger = logging.getLogger(__name__)
 
 
@@ -25,10 +34,86 @@ async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     logger.info("Starting Voice Agent Backend...")
     settings = get_settings()
-    logger.info(f"Using model: {settings.openai_model}")
-    logger.info(f"Using voice: {settings.openai_voice}")
+    logger.info("Using model: %s", settings.openai_model)
+    logger.info("Using voice: %s", settings.openai_voice)
+    
+    # Serialize the session.update payload once, before the first call
+    get_session_template(settings)
+    
+    # Keep configured OpenAI connections ready for new sessions
+    realtime_pool = RealtimeConnectionPool.for_settings(settings)
+    await realtime_pool.start()
+    app.state.realtime_pool = realtime_pool
+    UPSTREAM_CONNECTIONS.labels("idle").set_function(lambda: realtime_pool.idle_count)
+    
+    # SIGHUP reloads settings for new sessions without restarting the worker
+    # (the shared HTTP client keeps its original connection settings)
+    def on_sighup() -> None:
+        try:
+            new_settings = reload_settings()
+        except Exception as e:
+            logger.error("Settings reload failed, keeping current settings: %s", e)
+            return
+        get_session_template(new_settings)
+        asyncio.create_task(realtime_pool.reconfigure(new_settings))
+        logger.info("Settings reloaded")
+    
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, on_sighup)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        # Not available on Windows, or when the loop isn't in the main thread
+        logger.info("Settings reload on SIGHUP is not supported here")
+    
+    # Cap concurrent sessions; SIGTERM drains live calls before uvicorn stops
+    admission = SessionAdmission.for_settings(settings)
+    app.state.admission = admission
+    previous_sigterm = signal.getsignal(signal.SIGTERM)
+    
+    async def drain_then_exit() -> None:
+        await admission.drain(settings.drain_timeout_seconds)
+        # Hand the signal back to the server so it shuts down as usual
+        loop.remove_signal_handler(signal.SIGTERM)
+        signal.signal(signal.SIGTERM, previous_sigterm)
+        signal.raise_signal(signal.SIGTERM)
+    
+    def on_sigterm() -> None:
+        if not admission.draining:
+            asyncio.create_task(drain_then_exit())
+    
+    try:
+        loop.add_signal_handler(signal.SIGTERM, on_sigterm)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        logger.info("Graceful drain on SIGTERM is not supported here")
+    
+    # One pooled HTTP client for property lookups, shared by all sessions
+    realty_client = RealtyAPIClient.for_settings(settings) if settings.rapidapi_key else None
+    if realty_client:
+        await realty_client.start()
+    app.state.realty_client = realty_client
+    
+    # Transcripts and tool calls, written to disk by a background thread
+    call_recorder = CallRecorder.for_settings(settings) if settings.call_records else None
+    if call_recorder:
+        call_recorder.start()
+        CALL_RECORDS_QUEUE_DEPTH.set_function(lambda: call_recorder.queue_depth)
+    app.state.call_recorder = call_recorder
+    
     yield
     logger.info("Shutting down Voice Agent Backend...")
+    try:
+        loop.remove_signal_handler(signal.SIGHUP)
+        if loop.remove_signal_handler(signal.SIGTERM):
+            signal.signal(signal.SIGTERM, previous_sigterm)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        pass
+    await admission.drain(settings.drain_timeout_seconds)
+    await realtime_pool.close()
+    if realty_client:
+        await realty_client.close()
+    if call_recorder:
+        # After the drain, so the last sessions' records are written
+        await asyncio.to_thread(call_recorder.close)
 
 
 app = FastAPI(
@@ -51,7 +136,87 @@ app.add_middleware(
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "voice-agent-backend"}
+    return {
+        "status": "healthy",
+        "service": "voice-agent-backend",
+        "realtime_pool": app.state.realtime_pool.stats()
+    }
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness for load balancers: 503 while draining or when the worker can
+    neither admit nor queue another session. The body reports current load.
+    """
+    admission = app.state.admission
+    ready = not admission.draining and (not admission.at_capacity or admission.can_queue)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, **admission.load()}
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-turn latency histograms and load gauges."""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Allow admin requests only with the configured admin token."""
+    admin_token = get_settings().admin_token
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def get_realty_client() -> RealtyAPIClient:
+    """Return the shared property API client, if RapidAPI is configured."""
+    realty_client = app.state.realty_client
+    if realty_client is None:
+        raise HTTPException(status_code=404, detail="RapidAPI not configured")
+    return realty_client
+
+
+@app.get("/admin/cache", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    """Property tool cache, prefetch, RapidAPI policy and listing store counters."""
+    realty_client = get_realty_client()
+    stats = {
+        **realty_client.cache.stats(),
+        "prefetch": realty_client.prefetch_stats(),
+        "upstream": realty_client.upstream_stats()
+    }
+    if realty_client.listing_store:
+        stats["listing_store"] = realty_client.listing_store.stats()
+    return stats
+
+
+@app.delete("/admin/cache", dependencies=[Depends(require_admin)])
+async def invalidate_cache(kind: Optional[Literal["search", "details"]] = None):
+    """Invalidate cached property results, optionally only one kind."""
+    removed = get_realty_client().cache.invalidate(kind)
+    logger.info("Invalidated %s cached property results (kind=%s)", removed, kind or 'all')
+    return {"invalidated": removed}
+
+
+@app.get("/admin/call-records", dependencies=[Depends(require_admin)])
+async def call_record_stats():
+    """Call record queue depth, drops and writer counters."""
+    call_recorder = app.state.call_recorder
+    if call_recorder is None:
+        raise HTTPException(status_code=404, detail="Call records not enabled")
+    return call_recorder.stats()
+
+
+@app.post("/admin/drain", dependencies=[Depends(require_admin)])
+async def start_drain():
+    """Stop admitting new sessions ahead of a deploy; live calls continue."""
+    await app.state.admission.start_draining()
+    return app.state.admission.load()
 
 
 @app.get("/")
@@ -62,7 +227,10 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
-            "voice_websocket": "/ws/voice"
+            "ready": "/ready",
+            "metrics": "/metrics",
+            "voice_websocket": "/ws/voice",
+            "telephony_websocket": "/ws/telephony"
         }
     }
 
@@ -73,12 +241,52 @@ async def voice_websocket(websocket: WebSocket):
     WebSocket endpoint for real-time voice conversations.
     
     Protocol:
-    - Client sends: {"type": "audio", "audio": "<base64-pcm16-24khz>"}
+    - Client sends: {"type": "client_config", "audio_mode": "binary"} to opt in
+      to binary audio; the server replies with {"type": "client_config.updated"}
+    - Client may add "sample_rate" (e.g. 8000, 16000, 44100, 48000) to
+      client_config to send audio at its capture rate, and
+      "resample_output": true to receive audio deltas at that rate too
+    - Client sends: raw PCM16 bytes as binary frames (binary audio mode)
+    - Client sends: {"type": "audio", "audio": "<base64-pcm16>"} (JSON mode)
     - Client sends: {"type": "audio_commit"} when done speaking
     - Server sends: OpenAI Realtime API events (audio deltas, transcripts, etc.)
+    - Server sends: {"type": "output_audio.cleared"} when the caller barges in
+      (with OUTBOUND_PACING); the client should stop playing buffered audio
+    """
+    settings = get_settings()
+    await handle_voice_websocket(
+        websocket,
+        settings,
+        realtime_pool=websocket.app.state.realtime_pool,
+        realty_client=websocket.app.state.realty_client,
+        admission=websocket.app.state.admission,
+        call_recorder=websocket.app.state.call_recorder
+    )
+
+
+@app.websocket("/ws/telephony")
+async def telephony_websocket(websocket: WebSocket):
+    """
+    WebSocket endpoint for phone calls (Twilio-style media streams).
+    
+    Protocol:
+    - Carrier sends: {"event": "connected"}, then {"event": "start", "streamSid": ...}
+    - Carrier sends: {"event": "media", "media": {"payload": "<base64-mulaw-8khz>"}}
+    - Carrier sends: {"event": "mark", "mark": {"name": ...}} once audio up to a mark has played
+    - Carrier sends: {"event": "stop"} when the call ends
+    - Server sends: media events with the agent's audio, a mark after each
+      response, and {"event": "clear"} when the caller barges in
     """
     settings = get_settings()
-    await handle_voice_websocket(websocket, settings)
+    await handle_voice_websocket(
+        websocket,
+        settings,
+        realtime_pool=websocket.app.state.realtime_pool,
+        realty_client=websocket.app.state.realty_client,
+        admission=websocket.app.state.admission,
+        handler_class=TelephonySessionHandler,
+        call_recorder=websocket.app.state.call_recorder
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,214 @@
+"""
+Prometheus metrics for the Voice Agent backend.
+Defines the latency histograms and load gauges exported on /metrics.
+"""
+
+import time
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Buckets tuned for conversational latency (tens of ms up to several seconds)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0)
+SEND_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+TIME_TO_FIRST_AUDIO = Histogram(
+    "voice_time_to_first_audio_seconds",
+    "Time from input_audio_buffer.speech_stopped to the first response.audio.delta sent to the client",
+    buckets=LATENCY_BUCKETS
+)
+FUNCTION_ARGUMENTS_STREAM = Histogram(
+    "voice_function_call_arguments_seconds",
+    "Time OpenAI spent streaming function call arguments",
+    ["tool"],
+    buckets=LATENCY_BUCKETS
+)
+TOOL_CALL_DURATION = Histogram(
+    "voice_tool_call_seconds",
+    "Time to execute a tool call, including upstream requests",
+    ["tool"],
+    buckets=LATENCY_BUCKETS
+)
+TOOL_CALL_SLOT_WAIT = Histogram(
+    "voice_tool_call_slot_wait_seconds",
+    "Time a tool call waited for a per-session or worker-wide concurrency slot",
+    ["tool"],
+    buckets=LATENCY_BUCKETS
+)
+RAPIDAPI_REQUEST_DURATION = Histogram(
+    "rapidapi_request_seconds",
+    "RapidAPI request latency per endpoint",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+REALTIME_POOL_WAIT = Histogram(
+    "voice_realtime_pool_wait_seconds",
+    "Time a session waited to check out an OpenAI Realtime connection",
+    buckets=LATENCY_BUCKETS
+)
+REALTIME_RECONNECT_DURATION = Histogram(
+    "voice_realtime_reconnect_seconds",
+    "Time to reconnect to OpenAI mid-call, including session setup and conversation replay",
+    buckets=LATENCY_BUCKETS
+)
+REALTIME_REPLAY_ITEMS = Histogram(
+    "voice_realtime_replay_items",
+    "Conversation items replayed onto a new OpenAI connection after a reconnect",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+REALTIME_REPLAY_BYTES = Histogram(
+    "voice_realtime_replay_bytes",
+    "Size of the conversation replayed after a reconnect",
+    buckets=(0, 256, 1024, 4096, 16384, 65536, 262144)
+)
+LISTING_STORE_QUERY_DURATION = Histogram(
+    "listing_store_query_seconds",
+    "Time to answer a property search from the local listing store",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+)
+CALL_RECORD_WRITE_DURATION = Histogram(
+    "voice_call_record_write_seconds",
+    "Time the call record writer spent writing (and syncing) one batch",
+    buckets=SEND_BUCKETS
+)
+UPSTREAM_RATE_LIMIT_WAIT = Histogram(
+    "upstream_rate_limit_wait_seconds",
+    "Time a request waited for a token from an upstream's rate limiter",
+    ["upstream"],
+    buckets=LATENCY_BUCKETS
+)
+CLIENT_SEND_DURATION = Histogram(
+    "voice_client_send_seconds",
+    "Time spent sending a message to the client WebSocket",
+    buckets=SEND_BUCKETS
+)
+
+ACTIVE_SESSIONS = Gauge(
+    "voice_active_sessions",
+    "Voice sessions currently connected"
+)
+UPSTREAM_CONNECTIONS = Gauge(
+    "voice_upstream_connections",
+    "OpenAI Realtime connections by state",
+    ["state"]
+)
+AUDIO_QUEUE_DEPTH = Gauge(
+    "voice_upstream_audio_queue_frames",
+    "Audio frames queued for OpenAI across all sessions"
+)
+CALL_RECORDS_QUEUE_DEPTH = Gauge(
+    "voice_call_records_queue_depth",
+    "Call records waiting for the background writer"
+)
+
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state",
+    "Circuit breaker state per upstream (0 closed, 1 half open, 2 open)",
+    ["upstream"]
+)
+
+TOOL_CALLS_IN_FLIGHT = Gauge(
+    "voice_tool_calls_in_flight",
+    "Tool calls running (holding a concurrency slot) per tool",
+    ["tool"]
+)
+
+TOOL_CALLS = Counter(
+    "voice_tool_calls",
+    "Tool calls by tool and outcome (ok, error, invalid, busy, timeout, unavailable, unknown)",
+    ["tool", "outcome"]
+)
+
+RAPIDAPI_REQUESTS = Counter(
+    "rapidapi_requests",
+    "RapidAPI requests by endpoint and final outcome (ok, client_error, failed, throttled, circuit_open)",
+    ["endpoint", "outcome"]
+)
+
+RAPIDAPI_RETRIES = Counter(
+    "rapidapi_retries",
+    "RapidAPI request retries by endpoint and reason (rate_limited, server_error, network_error)",
+    ["endpoint", "reason"]
+)
+
+RAPIDAPI_HEDGES = Counter(
+    "rapidapi_hedges",
+    "Hedged RapidAPI requests (sent, won when the hedge answered first, skipped for lack of a rate limit token)",
+    ["outcome"]
+)
+
+RAPIDAPI_FALLBACKS = Counter(
+    "rapidapi_fallbacks",
+    "Tool results served while RapidAPI was unavailable, by kind (stale_cache, stale_store, canned)",
+    ["kind"]
+)
+
+UPSTREAM_CIRCUIT_TRANSITIONS = Counter(
+    "upstream_circuit_transitions",
+    "Circuit breaker state changes per upstream, by the state entered",
+    ["upstream", "state"]
+)
+
+UPSTREAM_AUDIO_BYTES = Counter(
+    "voice_upstream_audio_bytes",
+    "Client audio bytes received by the silence gate and sent on to OpenAI",
+    ["stage"]
+)
+
+REALTIME_RECONNECTS = Counter(
+    "voice_realtime_reconnects",
+    "Mid-call reconnects to OpenAI by outcome",
+    ["outcome"]
+)
+
+LISTING_STORE_LOOKUPS = Counter(
+    "listing_store_lookups",
+    "Property searches tried against the local listing store, by outcome (hit, stale, miss, partial, stale_served)",
+    ["outcome"]
+)
+
+CALL_RECORDS = Counter(
+    "voice_call_records",
+    "Call records by outcome (written, dropped when the queue was full, write_error)",
+    ["outcome"]
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "voice_log_records_dropped",
+    "Log records not written, by reason (sampled, rate_limited, queue_full)",
+    ["reason"]
+)
+
+
+def render_latest() -> tuple:
+    """Return the current metrics exposition and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class TurnTimeline:
+    """
+    Timestamps for the current conversational turn of a session.
+    Records time to first audio once per turn, measured from the moment the
+    caller stopped speaking to the first audio chunk sent back to them.
+    """
+
+    def __init__(self):
+        self.turn_id = 0
+        self._speech_stopped_at: Optional[float] = None
+
+    def speech_stopped(self) -> None:
+        """Start a new turn when server VAD detects the end of speech."""
+        self.turn_id += 1
+        self._speech_stopped_at = time.perf_counter()
+
+    def audio_sent(self) -> Optional[float]:
+        """
+        Record time to first audio if this is the turn's first audio chunk.
+        Returns the time recorded, or None for later chunks.
+        """
+        if self._speech_stopped_at is None:
+            return None
+        elapsed = time.perf_counter() - self._speech_stopped_at
+        TIME_TO_FIRST_AUDIO.observe(elapsed)
+        self._speech_stopped_at = None
+        return elapsed
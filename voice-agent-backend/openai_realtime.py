@@ -4,52 +4,74 @@ Handles WebSocket connection and message streaming with OpenAI.
 """
 
 import asyncio
+import binascii
+import contextlib
 import json
 import logging
+import time
+from collections import deque
+from functools import lru_cache
 from typing import Callable, Awaitable, Optional
 import websockets
 from websockets.asyncio.client import ClientConnection
+from websockets.protocol import State
 
 from config import Settings
-from realty_api import REALTY_TOOLS
+from conversation_log import ConversationLog
+from event_capture import EventCapture
+from metrics import (
+    REALTIME_RECONNECT_DURATION,
+    REALTIME_RECONNECTS,
+    REALTIME_REPLAY_BYTES,
+    REALTIME_REPLAY_ITEMS,
+)
+from tool_output import COMPACT_LEGEND
+from tools import TOOL_REGISTRY
 
 logger = logging.getLogger(__name__)
 
+# Fixed parts of an input_audio_buffer.append event, so binary client audio
+# can be framed without building and serializing a dict per chunk.
+_AUDIO_APPEND_PREFIX = b'{"type":"input_audio_buffer.append","audio":"'
+_AUDIO_APPEND_SUFFIX = b'"}'
 
-class OpenAIRealtimeClient:
+
+class AudioAppendEncoder:
     """
-    Client for OpenAI Realtime API.
-    Manages WebSocket connection and bidirectional streaming.
+    Encodes raw PCM16 chunks into input_audio_buffer.append events.
+    The event is assembled in a preallocated buffer that is reused across
+    chunks and only grows when a larger chunk arrives.
     """
     
-    def __init__(self, settings: Settings):
-        self.settings = settings
-        self.ws: Optional[ClientConnection] = None
-        self._receive_task: Optional[asyncio.Task] = None
-        
-    async def connect(self) -> None:
-        """Establish WebSocket connection to OpenAI Realtime API."""
-        logger.info(f"Connecting to OpenAI Realtime API: {self.settings.openai_realtime_url}")
-        
-        self.ws = await websockets.connect(
-            self.settings.openai_realtime_url,
-            additional_headers=self.settings.openai_headers,
-        )
-        
-        logger.info("Connected to OpenAI Realtime API")
-        
-        # Configure the session
-        await self._configure_session()
+    def __init__(self, initial_pcm_bytes: int = 8192):
+        self._buffer = bytearray()
+        self._reserve(initial_pcm_bytes)
+    
+    def _reserve(self, pcm_bytes: int) -> None:
+        """Make sure the buffer can hold an event for a chunk of this size."""
+        encoded_len = 4 * ((pcm_bytes + 2) // 3)
+        needed = len(_AUDIO_APPEND_PREFIX) + encoded_len + len(_AUDIO_APPEND_SUFFIX)
+        if len(self._buffer) < needed:
+            self._buffer = bytearray(needed)
+            self._buffer[:len(_AUDIO_APPEND_PREFIX)] = _AUDIO_APPEND_PREFIX
     
-    async def _configure_session(self) -> None:
-        """Send initial session configuration to OpenAI."""
-        session_config = {
-            "type": "session.update",
-            "session": {
-                "modalities": ["text", "audio"],
-                "instructions": """Act as a realtime audio output real estate agent for Australian properties. Speak in an emotive, friendly tone. Keep responses short and conversational.
+    def encode(self, pcm: bytes) -> memoryview:
+        """
+        Return the append event for a PCM16 chunk.
+        The returned view is only valid until the next call to encode().
+        """
+        self._reserve(len(pcm))
+        encoded = binascii.b2a_base64(pcm, newline=False)
+        start = len(_AUDIO_APPEND_PREFIX)
+        end = start + len(encoded)
+        self._buffer[start:end] = encoded
+        self._buffer[end:end + len(_AUDIO_APPEND_SUFFIX)] = _AUDIO_APPEND_SUFFIX
+        return memoryview(self._buffer)[:end + len(_AUDIO_APPEND_SUFFIX)]
+
 
-IMPORTANT: When users ask about properties, USE the search_properties function to find real listings. When they want details, use get_property_details.
+AGENT_INSTRUCTIONS = """Act as a realtime audio output real estate agent for Australian properties. Speak in an emotive, friendly tone. Keep responses short and conversational.
+
+IMPORTANT: When users ask about properties, USE the search_properties function to find real listings. When they want details, use get_property_details. When they want to compare listings, use compare_properties with all their IDs in one call.
 
 Guidelines:
 - Always ask a short follow-up after each answer.
@@ -81,33 +103,249 @@ Assistant: Got it! What day works best for you?
 User: Saturday afternoon.
 Assistant: Perfect! I’ll check availability and get back to you. Anything else you’d like to see?
 
-""",
-                "voice": self.settings.openai_voice,
-                "input_audio_format": self.settings.audio_format,
-                "output_audio_format": self.settings.audio_format,
-                "input_audio_transcription": {
-                    "model": "whisper-1"
-                },
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "prefix_padding_ms": 300,
-                    "silence_duration_ms": 500
-                },
-                "tools": REALTY_TOOLS,
-                "tool_choice": "auto"
-            }
+"""
+
+
+def build_session_config(settings: Settings) -> dict:
+    """Session fields sent to OpenAI in the initial session.update."""
+    instructions = AGENT_INSTRUCTIONS
+    if settings.tool_output_schema != "full":
+        instructions += COMPACT_LEGEND
+    return {
+        "modalities": ["text", "audio"],
+        "instructions": instructions,
+        "voice": settings.openai_voice,
+        "input_audio_format": settings.audio_format,
+        "output_audio_format": settings.audio_format,
+        "input_audio_transcription": {
+            "model": "whisper-1"
+        },
+        "turn_detection": {
+            "type": "server_vad",
+            "threshold": settings.vad_threshold,
+            "prefix_padding_ms": settings.vad_prefix_padding_ms,
+            "silence_duration_ms": settings.vad_silence_duration_ms
+        },
+        "tools": TOOL_REGISTRY.definitions(),
+        "tool_choice": "auto"
+    }
+
+
+class SessionConfigTemplate:
+    """
+    Pre-serialized session.update event.
+    
+    Every session field is serialized once up front. Rendering with no
+    overrides returns the cached bytes; overrides only serialize the fields
+    they replace, so the cost stays flat however large the instructions
+    and tool list grow.
+    """
+    
+    def __init__(self, session: dict):
+        self._fields = {
+            key: json.dumps(value, separators=(",", ":"))
+            for key, value in session.items()
         }
+        self._default = self._assemble(self._fields)
+    
+    def render(self, **overrides) -> bytes:
+        """Return the session.update event, with any fields overridden."""
+        if not overrides:
+            return self._default
+        fields = dict(self._fields)
+        for key, value in overrides.items():
+            fields[key] = json.dumps(value, separators=(",", ":"))
+        return self._assemble(fields)
+    
+    @staticmethod
+    def _assemble(fields: dict) -> bytes:
+        """Join serialized fields into a complete session.update event."""
+        body = ",".join(f"{json.dumps(key)}:{value}" for key, value in fields.items())
+        return f'{{"type":"session.update","session":{{{body}}}}}'.encode("utf-8")
+
+
+@lru_cache(maxsize=4)
+def get_session_template(settings: Settings) -> SessionConfigTemplate:
+    """Compiled session template for a settings snapshot."""
+    return SessionConfigTemplate(build_session_config(settings))
+
+
+# Server events put "type" first, so it can usually be read straight from
+# the raw frame without parsing the (often large) rest of the payload.
+_EVENT_TYPE_MARKERS = ('"type":"', '"type": "')
+_EVENT_TYPE_SCAN_LIMIT = 64
+
+
+def peek_event_type(raw: str) -> Optional[str]:
+    """
+    Read the top-level event type from a raw JSON frame without parsing it.
+    Returns None when the type isn't found near the start of the frame.
+    """
+    for marker in _EVENT_TYPE_MARKERS:
+        start = raw.find(marker, 0, _EVENT_TYPE_SCAN_LIMIT)
+        if start == -1:
+            continue
+        # A nested object before the marker means it isn't the top-level type
+        if "{" in raw[1:start]:
+            return None
+        start += len(marker)
+        end = raw.find('"', start)
+        if end == -1:
+            return None
+        return raw[start:end]
+    return None
+
+
+class RealtimeEvent:
+    """
+    An event received from OpenAI.
+    Keeps the raw frame so it can be forwarded as-is, and only parses the
+    JSON payload when something actually reads it.
+    """
+    
+    __slots__ = ("type", "raw", "_data")
+    
+    def __init__(self, raw: str, event_type: str, data: Optional[dict] = None):
+        self.type = event_type
+        self.raw = raw
+        self._data = data
+    
+    @classmethod
+    def from_raw(cls, raw) -> "RealtimeEvent":
+        """Build an event, parsing the frame only if its type can't be peeked."""
+        if isinstance(raw, (bytes, bytearray)):
+            raw = raw.decode("utf-8")
+        event_type = peek_event_type(raw)
+        if event_type is not None:
+            return cls(raw, event_type)
+        data = json.loads(raw)
+        return cls(raw, data.get("type", ""), data)
+    
+    @property
+    def data(self) -> dict:
+        """The parsed event payload."""
+        if self._data is None:
+            self._data = json.loads(self.raw)
+        return self._data
+    
+    def get(self, key: str, default=None):
+        """Read a top-level field from the parsed payload."""
+        return self.data.get(key, default)
+
+
+class OpenAIRealtimeClient:
+    """
+    Client for OpenAI Realtime API.
+    Manages WebSocket connection and bidirectional streaming.
+    
+    If the connection drops while receiving, the client reconnects, re-sends
+    the session configuration and replays the conversation_log (when one is
+    attached). Anything sent while reconnecting is held back and delivered
+    afterwards, with audio capped at realtime_reconnect_buffer_ms.
+    
+    With a capture attached, everything sent and received is also written
+    to it for later replay.
+    """
+    
+    # Gap audio is flushed in appends of at most this size
+    _GAP_FLUSH_BYTES = 64 * 1024
+    
+    def __init__(self, settings: Settings, session_overrides: Optional[dict] = None):
+        self.settings = settings
+        self.session_overrides = dict(session_overrides or {})
+        self.ws: Optional[ClientConnection] = None
+        self._receive_task: Optional[asyncio.Task] = None
+        self._audio_encoder = AudioAppendEncoder()
+        self.conversation_log: Optional[ConversationLog] = None
+        self.capture: Optional[EventCapture] = None
+        self._session_config: Optional[str] = None
+        self.reconnects = 0
+        self._closing = False
+        self._reconnecting = False
+        
+        # Messages sent during a reconnect: ("audio", bytearray) or ("message", str)
+        self._gap: deque = deque()
+        self._gap_audio_bytes = 0
+        self._gap_audio_limit = settings.sample_rate * 2 * settings.realtime_reconnect_buffer_ms // 1000
+        self.gap_audio_dropped = 0
         
-        await self.send_message(session_config)
+    async def connect(self) -> None:
+        """Establish WebSocket connection to OpenAI Realtime API."""
+        logger.info("Connecting to OpenAI Realtime API: %s", self.settings.openai_realtime_url)
+        
+        self.ws = await websockets.connect(
+            self.settings.openai_realtime_url,
+            additional_headers=self.settings.openai_headers,
+        )
+        
+        logger.info("Connected to OpenAI Realtime API")
+        
+        # Configure the session
+        await self._configure_session()
+    
+    @property
+    def can_reconnect(self) -> bool:
+        """Whether a dropped connection should be re-established."""
+        return self.settings.realtime_reconnect and not self._closing
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether the WebSocket connection is currently open."""
+        return self.ws is not None and self.ws.state is State.OPEN
+    
+    async def ping(self, timeout: float = 5.0) -> bool:
+        """Check that the connection is alive by waiting for a pong."""
+        if not self.is_open:
+            return False
+        try:
+            pong_waiter = await self.ws.ping()
+            await asyncio.wait_for(pong_waiter, timeout=timeout)
+            return True
+        except Exception as e:
+            logger.warning("OpenAI connection failed health check: %s", e)
+            return False
+    
+    async def _configure_session(self, ws: Optional[ClientConnection] = None) -> None:
+        """Send initial session configuration to OpenAI (on ws, default the current connection)."""
+        template = get_session_template(self.settings)
+        config = template.render(**self.session_overrides)
+        await (ws or self.ws).send(config, text=True)
+        self._session_config = config.decode("utf-8")
+        if self.capture:
+            self.capture.client_message(self._session_config)
         logger.info("Session configuration sent")
     
+    def attach_capture(self, capture: Optional[EventCapture]) -> None:
+        """
+        Write this connection's traffic to capture from now on. A connection
+        that is already configured (e.g. one from the pool) records the
+        session configuration it sent, so the capture starts with it.
+        """
+        self.capture = capture
+        if capture and self._session_config:
+            capture.client_message(self._session_config)
+    
+    async def update_session(self, **overrides) -> None:
+        """Change session fields (e.g. voice) after the session is configured."""
+        self.session_overrides.update(overrides)
+        await self.send_message({"type": "session.update", "session": overrides})
+    
     async def send_message(self, message: dict) -> None:
-        """Send a JSON message to OpenAI."""
+        """Send a JSON message to OpenAI (held back while reconnecting)."""
         if self.ws is None:
             raise RuntimeError("WebSocket not connected")
         
-        await self.ws.send(json.dumps(message))
+        data = json.dumps(message)
+        if self.capture:
+            self.capture.client_message(data)
+        if not self._reconnecting:
+            try:
+                await self.ws.send(data)
+                return
+            except websockets.exceptions.ConnectionClosed:
+                if not self.can_reconnect:
+                    raise
+        self._gap.append(("message", data))
     
     async def send_audio(self, audio_base64: str) -> None:
         """
@@ -120,6 +358,48 @@ Assistant: Perfect! I’ll check availability and get back to you. Anything else
         }
         await self.send_message(message)
     
+    async def send_audio_pcm(self, pcm: bytes) -> None:
+        """
+        Send raw PCM16 audio at 24kHz to OpenAI.
+        The audio is base64-encoded once, straight into the outgoing event.
+        """
+        if self.ws is None:
+            raise RuntimeError("WebSocket not connected")
+        
+        if self.capture:
+            self.capture.client_audio(pcm)
+        if not self._reconnecting:
+            try:
+                # The client connection masks (and therefore copies) the payload
+                # while framing it, so the encoder buffer is free again once
+                # send() returns.
+                await self.ws.send(self._audio_encoder.encode(pcm), text=True)
+                return
+            except websockets.exceptions.ConnectionClosed:
+                if not self.can_reconnect:
+                    raise
+        self._hold_gap_audio(pcm)
+    
+    def _hold_gap_audio(self, pcm: bytes) -> None:
+        """Buffer caller audio during a reconnect, dropping the oldest past the limit."""
+        if self._gap and self._gap[-1][0] == "audio":
+            self._gap[-1][1].extend(pcm)
+        else:
+            self._gap.append(("audio", bytearray(pcm)))
+        self._gap_audio_bytes += len(pcm)
+        
+        while self._gap_audio_bytes > self._gap_audio_limit:
+            index, chunk = next((i, entry[1]) for i, entry in enumerate(self._gap) if entry[0] == "audio")
+            excess = min(len(chunk), self._gap_audio_bytes - self._gap_audio_limit)
+            excess -= excess % 2
+            if excess == 0:
+                break
+            del chunk[:excess]
+            self._gap_audio_bytes -= excess
+            self.gap_audio_dropped += excess
+            if not chunk:
+                del self._gap[index]
+    
     async def commit_audio(self) -> None:
         """Commit the audio buffer to trigger a response."""
         message = {"type": "input_audio_buffer.commit"}
@@ -132,32 +412,125 @@ Assistant: Perfect! I’ll check availability and get back to you. Anything else
     
     async def receive_messages(
         self, 
-        on_message: Callable[[dict], Awaitable[None]]
+        on_message: Callable[[RealtimeEvent], Awaitable[None]],
+        on_reconnect: Optional[Callable[[], Awaitable[None]]] = None
     ) -> None:
         """
-        Continuously receive messages from OpenAI and dispatch them.
+        Continuously receive messages from OpenAI and dispatch them,
+        reconnecting if the connection drops.
         
         Args:
-            on_message: Async callback for each received message
+            on_message: Async callback for each received event. Events are
+                parsed lazily, so callbacks that only forward them never
+                pay for decoding the payload.
+            on_reconnect: Async callback after the connection was replaced
         """
         if self.ws is None:
             raise RuntimeError("WebSocket not connected")
         
+        while True:
+            try:
+                async for message in self.ws:
+                    if self.capture:
+                        self.capture.server_frame(message)
+                    try:
+                        await on_message(RealtimeEvent.from_raw(message))
+                    except json.JSONDecodeError:
+                        logger.error("Failed to parse message: %s", message)
+                if not self.can_reconnect:
+                    return
+                logger.warning("OpenAI connection closed by the server")
+            except websockets.exceptions.ConnectionClosed as e:
+                if not self.can_reconnect:
+                    logger.info("OpenAI connection closed: %s", e)
+                    return
+                logger.warning("OpenAI connection lost: %s", e)
+            except Exception as e:
+                logger.error("Error receiving messages: %s", e)
+                raise
+            
+            if not await self._reconnect():
+                return
+            if on_reconnect:
+                await on_reconnect()
+    
+    async def _reconnect(self) -> bool:
+        """
+        Replace a dropped connection: connect, configure the session, replay
+        the conversation, then deliver whatever was sent in the meantime.
+        The new socket only replaces self.ws once all of that succeeded; a
+        socket from a failed attempt is closed, since OpenAI bills every
+        open connection as a session.
+        """
+        self._reconnecting = True
+        started = time.perf_counter()
+        attempts = self.settings.realtime_reconnect_attempts
+        with contextlib.suppress(Exception):
+            await self.ws.close()
         try:
-            async for message in self.ws:
+            for attempt in range(1, attempts + 1):
+                ws = None
                 try:
-                    data = json.loads(message)
-                    await on_message(data)
-                except json.JSONDecodeError:
-                    logger.error(f"Failed to parse message: {message}")
-        except websockets.exceptions.ConnectionClosed as e:
-            logger.info(f"OpenAI connection closed: {e}")
-        except Exception as e:
-            logger.error(f"Error receiving messages: {e}")
-            raise
+                    ws = await websockets.connect(
+                        self.settings.openai_realtime_url,
+                        additional_headers=self.settings.openai_headers,
+                    )
+                    await self._configure_session(ws)
+                    replay = self.conversation_log.replay_events() if self.conversation_log else []
+                    for event in replay:
+                        await ws.send(event)
+                    await self._flush_gap(ws)
+                except asyncio.CancelledError:
+                    # The session is ending (disconnect cancels the receive task)
+                    if ws is not None:
+                        with contextlib.suppress(Exception):
+                            await ws.close()
+                    raise
+                except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                    logger.warning("Reconnect attempt %s/%s failed: %s", attempt, attempts, e)
+                    if ws is not None:
+                        with contextlib.suppress(Exception):
+                            await ws.close()
+                    if attempt < attempts:
+                        await asyncio.sleep(min(2.0, 0.25 * 2 ** (attempt - 1)))
+                    continue
+                
+                self.ws = ws
+                elapsed = time.perf_counter() - started
+                self.reconnects += 1
+                REALTIME_RECONNECTS.labels("success").inc()
+                REALTIME_RECONNECT_DURATION.observe(elapsed)
+                REALTIME_REPLAY_ITEMS.observe(len(replay))
+                REALTIME_REPLAY_BYTES.observe(sum(len(event) for event in replay))
+                logger.info("Reconnected to OpenAI in %.0fms, replayed %s items", elapsed * 1000, len(replay))
+                if self.capture:
+                    self.capture.mark("reconnect", attempts=attempt, replayed_items=len(replay))
+                return True
+            
+            REALTIME_RECONNECTS.labels("failed").inc()
+            logger.error("Could not reconnect to OpenAI after %s attempts", attempts)
+            return False
+        finally:
+            self._reconnecting = False
+    
+    async def _flush_gap(self, ws: ClientConnection) -> None:
+        """Send everything held back during the reconnect on ws, in order."""
+        while self._gap:
+            kind, payload = self._gap[0]
+            if kind == "audio":
+                chunk = bytes(payload[:self._GAP_FLUSH_BYTES])
+                await ws.send(self._audio_encoder.encode(chunk), text=True)
+                del payload[:len(chunk)]
+                self._gap_audio_bytes -= len(chunk)
+                if not payload:
+                    self._gap.popleft()
+            else:
+                await ws.send(payload)
+                self._gap.popleft()
     
     async def disconnect(self) -> None:
         """Close the WebSocket connection."""
+        self._closing = True
         if self._receive_task:
             self._receive_task.cancel()
             try:
@@ -0,0 +1,222 @@
+"""
+Pool of pre-warmed OpenAI Realtime connections.
+Keeps connections connected and configured so new voice sessions can start
+streaming audio without waiting for the handshake.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from config import Settings
+from metrics import REALTIME_POOL_WAIT
+from openai_realtime import OpenAIRealtimeClient
+
+logger = logging.getLogger(__name__)
+
+
+class RealtimeConnectionPool:
+    """
+    Pool of connected, configured OpenAIRealtimeClient instances.
+
+    Connections are single use: a session checks one out and closes it when
+    the call ends, and the pool refills itself in the background. Idle
+    connections are dropped once they exceed the max idle age or fail a
+    health check, so a checked-out connection is always fresh.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        size: int,
+        max_idle_seconds: float = 300.0,
+        health_check_interval: float = 15.0,
+        health_check_timeout: float = 5.0
+    ):
+        self.settings = settings
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+
+        self._idle: Deque[Tuple[OpenAIRealtimeClient, float]] = deque()
+        self._refill_needed = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._closing_tasks: Set[asyncio.Task] = set()
+        self._closed = False
+        # Bumped by reconfigure(); connections opened under an older
+        # generation were configured with old settings
+        self._generation = 0
+
+        # Metrics
+        self.connections_opened = 0
+        self.connections_failed = 0
+        self.connections_evicted = 0
+        self.acquired_warm = 0
+        self.acquired_cold = 0
+        self.last_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self._total_wait_ms = 0.0
+
+    @classmethod
+    def for_settings(cls, settings: Settings) -> "RealtimeConnectionPool":
+        """Build a pool sized and tuned from settings."""
+        return cls(
+            settings,
+            size=settings.realtime_pool_size,
+            max_idle_seconds=settings.realtime_pool_max_idle_seconds,
+            health_check_interval=settings.realtime_pool_health_check_seconds
+        )
+
+    @property
+    def idle_count(self) -> int:
+        """Number of warm connections ready to be checked out."""
+        return len(self._idle)
+
+    async def start(self) -> None:
+        """Start filling the pool in the background."""
+        if self.size > 0 and self._refill_task is None:
+            self._refill_task = asyncio.create_task(self._run_refill())
+            self._refill_needed.set()
+            logger.info("Realtime connection pool started (size=%s)", self.size)
+
+    async def close(self) -> None:
+        """Stop refilling and close all idle connections."""
+        self._closed = True
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+        while self._idle:
+            client, _ = self._idle.popleft()
+            await self._discard(client)
+        logger.info("Realtime connection pool closed")
+
+    async def acquire(self) -> OpenAIRealtimeClient:
+        """
+        Check out a connected and configured client.
+        Falls back to connecting inline when no warm connection is available.
+        """
+        started = time.perf_counter()
+        client = self._take_idle()
+
+        if client is not None:
+            self.acquired_warm += 1
+        else:
+            self.acquired_cold += 1
+            client = OpenAIRealtimeClient(self.settings)
+            await client.connect()
+
+        self._refill_needed.set()
+        self._record_wait((time.perf_counter() - started) * 1000)
+        return client
+
+    def stats(self) -> Dict[str, float]:
+        """Pool size and wait-time metrics."""
+        acquired = self.acquired_warm + self.acquired_cold
+        return {
+            "size": self.size,
+            "idle": self.idle_count,
+            "connections_opened": self.connections_opened,
+            "connections_failed": self.connections_failed,
+            "connections_evicted": self.connections_evicted,
+            "acquired_warm": self.acquired_warm,
+            "acquired_cold": self.acquired_cold,
+            "last_wait_ms": round(self.last_wait_ms, 2),
+            "avg_wait_ms": round(self._total_wait_ms / acquired, 2) if acquired else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2)
+        }
+
+    async def reconfigure(self, settings: Settings) -> None:
+        """
+        Switch to new settings after a config reload.
+        Idle connections were configured with the old settings, so they are
+        closed (as is one the refill is still opening, once it connects) and
+        the pool refills with freshly configured ones.
+        """
+        self.settings = settings
+        self._generation += 1
+        while self._idle:
+            client, _ = self._idle.popleft()
+            self.connections_evicted += 1
+            await self._discard(client)
+        self._refill_needed.set()
+
+    def _take_idle(self) -> Optional[OpenAIRealtimeClient]:
+        """Pop the oldest usable idle connection, skipping dead or stale ones."""
+        now = time.monotonic()
+        while self._idle:
+            client, created_at = self._idle.pop()
+            if now - created_at < self.max_idle_seconds and client.is_open:
+                return client
+            self.connections_evicted += 1
+            task = asyncio.create_task(self._discard(client))
+            self._closing_tasks.add(task)
+            task.add_done_callback(self._closing_tasks.discard)
+        return None
+
+    def _record_wait(self, wait_ms: float) -> None:
+        """Track how long sessions waited for a connection."""
+        self.last_wait_ms = wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self._total_wait_ms += wait_ms
+        REALTIME_POOL_WAIT.observe(wait_ms / 1000)
+
+    async def _run_refill(self) -> None:
+        """Keep the pool topped up and evict stale or unhealthy connections."""
+        backoff = 1.0
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._refill_needed.wait(), timeout=self.health_check_interval)
+            except asyncio.TimeoutError:
+                await self._check_idle()
+            self._refill_needed.clear()
+
+            while not self._closed and len(self._idle) < self.size:
+                generation = self._generation
+                client = OpenAIRealtimeClient(self.settings)
+                try:
+                    await client.connect()
+                except Exception as e:
+                    self.connections_failed += 1
+                    logger.error("Failed to pre-warm OpenAI connection: %s", e)
+                    await self._discard(client)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                    continue
+
+                backoff = 1.0
+                self.connections_opened += 1
+                if generation != self._generation:
+                    # Settings were reloaded while this one was connecting
+                    self.connections_evicted += 1
+                    await self._discard(client)
+                    continue
+                self._idle.appendleft((client, time.monotonic()))
+
+    async def _check_idle(self) -> None:
+        """Health-check idle connections, dropping stale or unresponsive ones."""
+        now = time.monotonic()
+        for entry in list(self._idle):
+            client, created_at = entry
+            if now - created_at < self.max_idle_seconds and await client.ping(self.health_check_timeout):
+                continue
+
+            # The connection may have been checked out while it was being pinged
+            if entry in self._idle:
+                self._idle.remove(entry)
+                self.connections_evicted += 1
+                await self._discard(client)
+
+    async def _discard(self, client: OpenAIRealtimeClient) -> None:
+        """Close a connection that is leaving the pool."""
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.warning("Error closing pooled OpenAI connection: %s", e)
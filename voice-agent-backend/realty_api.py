@@ -4,8 +4,16 @@ Provides functions that OpenAI can call during voice conversations.
 """
 
 import aiohttp
+import asyncio
+import json
 import logging
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Awaitable, Callable, Hashable, Set, Tuple
+
+from listing_store import ListingRefresher, ListingStore
+from metrics import RAPIDAPI_FALLBACKS, RAPIDAPI_HEDGES, RAPIDAPI_REQUEST_DURATION, RAPIDAPI_REQUESTS, RAPIDAPI_RETRIES
+from upstream_policy import CircuitBreaker, TokenBucket, backoff_delay
 
 logger = logging.getLogger(__name__)
 
@@ -13,35 +21,432 @@ logger = logging.getLogger(__name__)
 RAPIDAPI_HOST = "realty-in-au.p.rapidapi.com"
 RAPIDAPI_BASE_URL = f"https://{RAPIDAPI_HOST}"
 
+# Returned by _make_request when RapidAPI can't be reached within the
+# request policy; the model reads it out, so it's phrased for the caller
+UNAVAILABLE_MESSAGE = "the property service isn't responding right now, please try again in a minute"
+STALE_NOTE = "The property service isn't responding, so these results are from earlier and may be out of date."
+
+# Details fields shown side by side by compare_properties
+_COMPARE_FIELDS = ("address", "price", "bedrooms", "bathrooms", "parking", "property_type", "land_size")
+
+
+class ResultCache:
+    """
+    In-memory TTL cache for formatted tool results.
+    
+    Entries are evicted least-recently-used first once either the entry
+    count or the approximate serialized size exceeds its limit. Expired
+    entries stay until evicted, as a fallback while RapidAPI is
+    unavailable (see get_stale). Concurrent
+    lookups for a key that is already being fetched wait on the same
+    upstream request instead of issuing their own.
+    """
+    
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Dict]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._bytes = 0
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """Return a fresh cached value, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def get_stale(self, key: Hashable) -> Optional[Dict]:
+        """Return the cached value for key even if it has expired, or None."""
+        entry = self._entries.get(key)
+        return entry[2] if entry is not None else None
+    
+    def contains(self, key: Hashable) -> bool:
+        """Whether key is cached and fresh, or currently being fetched."""
+        return key in self._inflight or self.get(key) is not None
+    
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Tuple[Dict, bool]]]
+    ) -> Dict:
+        """
+        Return the cached value for key, fetching it on a miss.
+        
+        Args:
+            key: Normalized cache key
+            ttl: Seconds to keep the result (0 disables storing it)
+            fetch: Coroutine factory returning (value, cacheable)
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key, ttl, fetch))
+            self._inflight[key] = task
+        
+        # Shielded so a cancelled caller doesn't abort the fetch for the others
+        return await asyncio.shield(task)
+    
+    def put(self, key: Hashable, value: Dict, ttl: float) -> None:
+        """Store a value and evict old entries to stay within limits."""
+        if ttl <= 0:
+            return
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+        
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    def invalidate(self, kind: Optional[str] = None) -> int:
+        """
+        Drop cached entries.
+        
+        Args:
+            kind: Only drop keys of this kind ("search" or "details"); all if None
+        
+        Returns:
+            Number of entries removed
+        """
+        keys = [key for key in self._entries if kind is None or key[0] == kind]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight)
+        }
+    
+    async def _fetch(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Tuple[Dict, bool]]]
+    ) -> Dict:
+        """Run a fetch for key and store its result when cacheable."""
+        try:
+            value, cacheable = await fetch()
+            if cacheable:
+                self.put(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+    
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and release its size."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a spoken location for use in cache keys."""
+    return " ".join(location.split()).casefold()
+
 
 class RealtyAPIClient:
-    """Client for RapidAPI Realty-in-AU API."""
+    """
+    Client for RapidAPI Realty-in-AU API.
+    
+    A single instance is shared by all sessions in a worker. It owns one
+    aiohttp session with a keep-alive connection pool, so tool calls reuse
+    warm TCP/TLS connections instead of opening a new one per request.
     
-    def __init__(self, api_key: str):
+    With a listing_store, searches for locations it holds fresh listings
+    for are answered locally, and a background refresher ingests the
+    locations callers ask about.
+    
+    Upstream requests share a token bucket at the plan's rate, are retried
+    with jittered backoff on 429s, 5xx and network errors, and go through a
+    circuit breaker. While RapidAPI is unavailable, searches and details
+    are answered from expired cache entries or stale listing store regions
+    where possible.
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = RAPIDAPI_BASE_URL,
+        host: str = RAPIDAPI_HOST,
+        timeout_seconds: float = 10.0,
+        connect_timeout_seconds: float = 3.0,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 20,
+        dns_cache_ttl_seconds: int = 300,
+        keepalive_seconds: float = 30.0,
+        cache: Optional[ResultCache] = None,
+        search_ttl_seconds: float = 300.0,
+        details_ttl_seconds: float = 1800.0,
+        prefetch_max_global: int = 16,
+        compare_max_concurrent: int = 3,
+        listing_store: Optional[ListingStore] = None,
+        listing_refresh_seconds: float = 3000.0,
+        listing_page_size: int = 30,
+        listing_max_pages: int = 5,
+        rate_limit_per_second: float = 10.0,
+        rate_limit_burst: int = 20,
+        rate_limit_max_wait_seconds: float = 2.0,
+        retry_attempts: int = 2,
+        retry_base_seconds: float = 0.2,
+        retry_max_seconds: float = 2.0,
+        hedge_after_seconds: float = 0.0,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_seconds: float = 30.0
+    ):
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
         self.headers = {
             "x-rapidapi-key": api_key,
-            "x-rapidapi-host": RAPIDAPI_HOST
+            "x-rapidapi-host": host
         }
+        self.timeout = aiohttp.ClientTimeout(total=timeout_seconds, connect=connect_timeout_seconds)
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.dns_cache_ttl_seconds = dns_cache_ttl_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.cache = cache or ResultCache()
+        self.search_ttl_seconds = search_ttl_seconds
+        self.details_ttl_seconds = details_ttl_seconds
+        
+        # Request policy, shared by all sessions and the listing refresher
+        self.rate_limiter = TokenBucket("rapidapi", rate_limit_per_second, rate_limit_burst)
+        self.rate_limit_max_wait_seconds = rate_limit_max_wait_seconds
+        self.retry_attempts = retry_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.circuit = CircuitBreaker("rapidapi", circuit_failure_threshold, circuit_reset_seconds)
+        
+        # Worker-wide budget and counters for speculative detail fetches
+        self.prefetch_slots = asyncio.Semaphore(prefetch_max_global)
+        self.prefetch_counters = {
+            "scheduled": 0,
+            "fetched": 0,
+            "hits": 0,
+            "wasted": 0,
+            "cancelled": 0
+        }
+        
+        self.compare_max_concurrent = compare_max_concurrent
+        
+        self.listing_store = listing_store
+        self.listing_page_size = listing_page_size
+        self.listing_max_pages = listing_max_pages
+        self.listing_refresher = (
+            ListingRefresher(listing_store, self.fetch_region_listings, refresh_seconds=listing_refresh_seconds)
+            if listing_store else None
+        )
+    
+    @classmethod
+    def for_settings(cls, settings) -> "RealtyAPIClient":
+        """Build a client using the RapidAPI key and HTTP tuning from settings."""
+        return cls(
+            settings.rapidapi_key,
+            base_url=settings.rapidapi_base_url or f"https://{settings.rapidapi_host}",
+            host=settings.rapidapi_host,
+            timeout_seconds=settings.rapidapi_timeout_seconds,
+            connect_timeout_seconds=settings.rapidapi_connect_timeout_seconds,
+            connection_limit=settings.rapidapi_connection_limit,
+            connection_limit_per_host=settings.rapidapi_connection_limit_per_host,
+            dns_cache_ttl_seconds=settings.rapidapi_dns_cache_ttl_seconds,
+            keepalive_seconds=settings.rapidapi_keepalive_seconds,
+            cache=ResultCache(
+                max_entries=settings.cache_max_entries,
+                max_bytes=settings.cache_max_bytes
+            ),
+            search_ttl_seconds=settings.cache_search_ttl_seconds,
+            details_ttl_seconds=settings.cache_details_ttl_seconds,
+            prefetch_max_global=settings.prefetch_max_global,
+            compare_max_concurrent=settings.compare_max_concurrent,
+            listing_store=ListingStore.for_settings(settings) if settings.listing_store else None,
+            listing_refresh_seconds=settings.listing_store_refresh_seconds,
+            listing_page_size=settings.listing_store_page_size,
+            listing_max_pages=settings.listing_store_max_pages,
+            rate_limit_per_second=settings.rapidapi_rate_limit_per_second,
+            rate_limit_burst=settings.rapidapi_rate_limit_burst,
+            rate_limit_max_wait_seconds=settings.rapidapi_rate_limit_max_wait_ms / 1000,
+            retry_attempts=settings.rapidapi_retry_attempts,
+            retry_base_seconds=settings.rapidapi_retry_base_ms / 1000,
+            retry_max_seconds=settings.rapidapi_retry_max_ms / 1000,
+            hedge_after_seconds=settings.rapidapi_hedge_after_ms / 1000,
+            circuit_failure_threshold=settings.rapidapi_circuit_failure_threshold,
+            circuit_reset_seconds=settings.rapidapi_circuit_reset_seconds
+        )
+    
+    async def start(self) -> None:
+        """Open the shared HTTP session and start refreshing the listing store."""
+        self._get_session()
+        if self.listing_refresher:
+            self.listing_refresher.start()
+    
+    async def close(self) -> None:
+        """Close the shared HTTP session and its pooled connections."""
+        if self.listing_refresher:
+            await self.listing_refresher.close()
+            self.listing_store.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl_seconds,
+                keepalive_timeout=self.keepalive_seconds
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers=self.headers
+            )
+        return self._session
+    
+    async def _make_request(self, endpoint: str, params: Dict[str, Any] = None, hedge: bool = False) -> Dict:
+        """
+        Make an async HTTP request to RapidAPI within the request policy.
+        
+        Returns the response data, {"error": ...} for a request RapidAPI
+        rejected, or {"error": ..., "unavailable": True} when it couldn't be
+        answered (circuit open, no rate limit token in time, or still
+        failing after the retries).
+        
+        Args:
+            endpoint: API path
+            params: Query parameters
+            hedge: Send a second request if the first is slower than hedge_after_seconds
+        """
+        if not self.circuit.allow():
+            RAPIDAPI_REQUESTS.labels(endpoint, "circuit_open").inc()
+            return {"error": UNAVAILABLE_MESSAGE, "unavailable": True}
+        
+        try:
+            attempt = 0
+            while True:
+                if not await self.rate_limiter.acquire(self.rate_limit_max_wait_seconds):
+                    logger.warning("RapidAPI rate limit reached, not requesting %s", endpoint)
+                    self.circuit.release()
+                    RAPIDAPI_REQUESTS.labels(endpoint, "throttled").inc()
+                    return {"error": UNAVAILABLE_MESSAGE, "unavailable": True}
+                
+                if hedge and self.hedge_after_seconds > 0:
+                    status, data, retry_after = await self._hedged_attempt(endpoint, params)
+                else:
+                    status, data, retry_after = await self._attempt(endpoint, params)
+                
+                if status == 200:
+                    self.circuit.record_success()
+                    RAPIDAPI_REQUESTS.labels(endpoint, "ok").inc()
+                    return data
+                if 0 < status < 500 and status != 429:
+                    # The API is up and said no; retrying won't change that
+                    self.circuit.record_success()
+                    RAPIDAPI_REQUESTS.labels(endpoint, "client_error").inc()
+                    return {"error": f"API error: {status}"}
+                
+                self.circuit.record_failure()
+                attempt += 1
+                if attempt > self.retry_attempts or not self.circuit.allow():
+                    RAPIDAPI_REQUESTS.labels(endpoint, "failed").inc()
+                    return {"error": UNAVAILABLE_MESSAGE, "unavailable": True}
+                reason = "network_error" if status == 0 else "rate_limited" if status == 429 else "server_error"
+                RAPIDAPI_RETRIES.labels(endpoint, reason).inc()
+                await asyncio.sleep(backoff_delay(attempt, self.retry_base_seconds, self.retry_max_seconds, retry_after))
+        except BaseException:
+            # A probe that was cancelled (tool timeout, barge-in) never reports
+            # an outcome; without this the circuit would stay half open
+            self.circuit.release()
+            raise
     
-    async def _make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict:
-        """Make an async HTTP request to RapidAPI."""
-        url = f"{RAPIDAPI_BASE_URL}{endpoint}"
+    async def _attempt(self, endpoint: str, params: Optional[Dict[str, Any]]) -> Tuple[int, Optional[Dict], Optional[float]]:
+        """
+        Send one request. Returns (status, data, retry_after), with status 0
+        for a network error and retry_after from a Retry-After header.
+        """
+        url = f"{self.base_url}{endpoint}"
+        started = time.perf_counter()
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info(f"RapidAPI response status: 200 OK")
-                        return data
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"RapidAPI error {response.status}: {error_text}")
-                        return {"error": f"API error: {response.status}"}
+            session = self._get_session()
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("RapidAPI response status: 200 OK")
+                    return 200, data, None
+                error_text = await response.text()
+                logger.error("RapidAPI error %s: %s", response.status, error_text)
+                retry_after = response.headers.get("Retry-After", "")
+                return response.status, None, float(retry_after) if retry_after.isdigit() else None
         except Exception as e:
-            logger.error(f"RapidAPI request failed: {e}")
-            return {"error": str(e)}
+            logger.error("RapidAPI request failed: %s", e)
+            return 0, None, None
+        finally:
+            RAPIDAPI_REQUEST_DURATION.labels(endpoint).observe(time.perf_counter() - started)
+    
+    async def _hedged_attempt(self, endpoint: str, params: Optional[Dict[str, Any]]) -> Tuple[int, Optional[Dict], Optional[float]]:
+        """
+        Send a request, and a second one if the first hasn't answered within
+        hedge_after_seconds and a rate limit token is free right away. The
+        first successful answer wins and the other request is cancelled.
+        """
+        tasks = [asyncio.create_task(self._attempt(endpoint, params))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after_seconds)
+            if done:
+                return tasks[0].result()
+            if not self.rate_limiter.try_acquire():
+                RAPIDAPI_HEDGES.labels("skipped").inc()
+                return await tasks[0]
+            
+            RAPIDAPI_HEDGES.labels("sent").inc()
+            tasks.append(asyncio.create_task(self._attempt(endpoint, params)))
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    if outcome[0] == 200 or not pending:
+                        if task is tasks[1]:
+                            RAPIDAPI_HEDGES.labels("won").inc()
+                        return outcome
+        finally:
+            for task in tasks:
+                task.cancel()
     
     async def search_properties(
         self,
@@ -52,7 +457,8 @@ class RealtyAPIClient:
         property_type: Optional[str] = None,
         channel: str = "BUY",
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        use_cache: bool = True
     ) -> Dict:
         """
         Search for properties in Australia.
@@ -66,10 +472,22 @@ class RealtyAPIClient:
             channel: BUY or RENT
             page: Page number for pagination
             page_size: Number of results per page
+            use_cache: Whether the result cache may answer (and keep) the search
         
         Returns:
             Dictionary with property listings
         """
+        location = " ".join(location.split())
+        channel = channel.upper()
+        property_type = property_type.lower() if property_type else None
+        
+        if self.listing_store:
+            local = self.listing_store.search(
+                location, channel, min_price, max_price, bedrooms, property_type, page, page_size
+            )
+            if local is not None:
+                return self._format_search_results(local)
+        
         params = {
             "searchLocation": location,
             "channel": channel,
@@ -86,31 +504,192 @@ class RealtyAPIClient:
         if property_type:
             params["propertyTypes"] = property_type
         
-        logger.info(f"Searching properties: {params}")
-        result = await self._make_request("/properties/list", params)
+        key = (
+            "search", normalize_location(location), channel,
+            min_price or None, max_price or None, bedrooms or None, property_type,
+            page, page_size
+        )
+        if not use_cache:
+            return (await self._fetch_search(params, key))[0]
+        return await self.cache.get_or_fetch(
+            key, self.search_ttl_seconds, lambda: self._fetch_search(params, key)
+        )
+    
+    async def _fetch_search(self, params: Dict[str, Any], key: Hashable) -> Tuple[Dict, bool]:
+        """Run a property search upstream and format it for voice."""
+        logger.debug("Searching properties: %s", params)
+        result = await self._make_request("/properties/list", params, hedge=True)
+        if result.get("unavailable"):
+            return self._search_fallback(params, key) or self._format_search_results(result), False
         
         # Format the response for OpenAI to speak
         formatted = self._format_search_results(result)
-        logger.info(f"Search result: {formatted['summary']}")
-        if formatted.get('properties'):
+        logger.info("Search result: %s", formatted['summary'])
+        if formatted.get('properties') and logger.isEnabledFor(logging.DEBUG):
             for i, prop in enumerate(formatted['properties'][:3], 1):
-                logger.info(f"  Property {i}: {prop.get('address', 'N/A')} - {prop.get('price', 'N/A')} - {prop.get('bedrooms', 'N/A')} bed")
-        return formatted
+                logger.debug("  Property %s: %s - %s - %s bed", i, prop.get('address', 'N/A'), prop.get('price', 'N/A'), prop.get('bedrooms', 'N/A'))
+        return formatted, "error" not in result
     
-    async def get_property_details(self, listing_id: str) -> Dict:
+    def _search_fallback(self, params: Dict[str, Any], key: Hashable) -> Optional[Dict]:
+        """
+        A search result from before RapidAPI became unavailable: an expired
+        cache entry, or a stale listing store region. None if there is neither.
+        """
+        cached = self.cache.get_stale(key)
+        if cached is not None:
+            RAPIDAPI_FALLBACKS.labels("stale_cache").inc()
+            return {**cached, "summary": f"{STALE_NOTE} {cached['summary']}"}
+        if self.listing_store:
+            local = self.listing_store.search(
+                params["searchLocation"], params["channel"], params.get("minPrice"), params.get("maxPrice"),
+                params.get("minimumBedrooms"), params.get("propertyTypes"), params["page"], params["pageSize"],
+                allow_stale=True
+            )
+            if local is not None and local["data"]:
+                RAPIDAPI_FALLBACKS.labels("stale_store").inc()
+                formatted = self._format_search_results(local)
+                return {**formatted, "summary": f"{STALE_NOTE} {formatted['summary']}"}
+        RAPIDAPI_FALLBACKS.labels("canned").inc()
+        return None
+    
+    async def fetch_region_listings(self, location: str, channel: str) -> Optional[Tuple[List[Dict], bool]]:
+        """
+        All listings for a location (up to listing_max_pages pages) in the
+        API's order, for the listing store, and whether there were more
+        than that (or a later page failed). None if the first page failed.
+        """
+        listings: List[Dict] = []
+        truncated = True
+        total = None
+        for page in range(1, self.listing_max_pages + 1):
+            result = await self._make_request("/properties/list", {
+                "searchLocation": location,
+                "channel": channel,
+                "page": page,
+                "pageSize": self.listing_page_size
+            })
+            if "error" in result:
+                if page == 1:
+                    return None
+                break
+            if page == 1:
+                total = result.get("totalResultsCount")
+            batch = result.get("data", result.get("listings", []))
+            listings.extend(batch)
+            if len(batch) < self.listing_page_size:
+                truncated = False
+                break
+        if isinstance(total, int):
+            truncated = len(listings) < total
+        return listings, truncated
+    
+    async def get_property_details(self, listing_id: str, use_cache: bool = True) -> Dict:
         """
         Get detailed information about a specific property.
         
         Args:
             listing_id: The unique listing ID
+            use_cache: Whether the result cache may answer (and keep) the lookup
         
         Returns:
             Dictionary with property details
         """
+        listing_id = str(listing_id).strip()
+        if not use_cache:
+            return (await self._fetch_details(listing_id))[0]
+        return await self.cache.get_or_fetch(
+            self.details_key(listing_id),
+            self.details_ttl_seconds,
+            lambda: self._fetch_details(listing_id)
+        )
+    
+    async def compare_properties(self, listing_ids: List[str], use_cache: bool = True) -> Dict:
+        """
+        Get several properties' details side by side.
+        
+        Details are fetched concurrently, at most compare_max_concurrent at
+        a time, through the same cache as get_property_details. Listings
+        that can't be fetched are named in the result's "unavailable" list
+        instead of failing the comparison.
+        
+        Args:
+            listing_ids: The listings to compare, in the order to present them
+            use_cache: Whether the result cache may answer (and keep) the lookups
+        
+        Returns:
+            Dictionary with a summary, the compared properties and unavailable IDs
+        """
+        listing_ids = list(dict.fromkeys(str(listing_id).strip() for listing_id in listing_ids))
+        slots = asyncio.Semaphore(self.compare_max_concurrent)
+        
+        async def fetch(listing_id: str) -> Dict:
+            async with slots:
+                return await self.get_property_details(listing_id, use_cache=use_cache)
+        
+        results = await asyncio.gather(*(fetch(listing_id) for listing_id in listing_ids), return_exceptions=True)
+        
+        properties = []
+        unavailable = []
+        stale = False
+        for listing_id, details in zip(listing_ids, results):
+            if isinstance(details, Exception):
+                logger.warning("Comparison could not get listing %s: %s", listing_id, details)
+                details = None
+            if not details or "address" not in details:
+                unavailable.append(listing_id)
+                continue
+            stale = stale or details.get("summary") == STALE_NOTE
+            properties.append({
+                "id": listing_id,
+                **{key: details[key] for key in _COMPARE_FIELDS if key in details},
+                "features": details.get("features", [])[:3]
+            })
+        
+        if not properties:
+            summary = "Sorry, I couldn't get details for those properties right now."
+        elif unavailable:
+            summary = f"Here are {len(properties)} of the {len(listing_ids)} properties; I couldn't get details for the others."
+        else:
+            summary = f"Here are the {len(properties)} properties side by side:"
+        if stale:
+            summary = f"{STALE_NOTE} {summary}"
+        return {"summary": summary, "properties": properties, "unavailable": unavailable}
+    
+    @staticmethod
+    def details_key(listing_id: str) -> Tuple[str, str]:
+        """Cache key for a listing's details."""
+        return ("details", str(listing_id).strip())
+    
+    def upstream_stats(self) -> Dict[str, Any]:
+        """Circuit breaker state and rate limiter settings for the admin API."""
+        return {
+            "circuit": self.circuit.state,
+            "consecutive_failures": self.circuit.failures,
+            "circuit_retry_in": self.circuit.retry_in,
+            "rate_limit_per_second": self.rate_limiter.rate_per_second,
+            "rate_limit_burst": self.rate_limiter.burst
+        }
+    
+    def prefetch_stats(self) -> Dict[str, float]:
+        """Prefetch counters and the share of upstream prefetches that were used."""
+        fetched = self.prefetch_counters["fetched"]
+        return {
+            **self.prefetch_counters,
+            "hit_rate": round(self.prefetch_counters["hits"] / fetched, 3) if fetched else 0.0
+        }
+    
+    async def _fetch_details(self, listing_id: str) -> Tuple[Dict, bool]:
+        """Fetch property details upstream and format them for voice."""
         params = {"id": listing_id}
-        logger.info(f"Getting property details: {listing_id}")
+        logger.info("Getting property details: %s", listing_id)
         result = await self._make_request("/properties/detail", params)
-        return self._format_property_details(result)
+        if result.get("unavailable"):
+            cached = self.cache.get_stale(self.details_key(listing_id))
+            if cached is not None:
+                RAPIDAPI_FALLBACKS.labels("stale_cache").inc()
+                return {**cached, "summary": STALE_NOTE}, False
+            RAPIDAPI_FALLBACKS.labels("canned").inc()
+        return self._format_property_details(result), "error" not in result
     
     async def get_agent_listings(
         self,
@@ -138,7 +717,7 @@ class RealtyAPIClient:
             "pageSize": page_size
         }
         
-        logger.info(f"Getting agent listings: {params}")
+        logger.info("Getting agent listings: %s", params)
         result = await self._make_request("/agents/get-listings", params)
         return self._format_search_results(result)
     
@@ -188,58 +767,80 @@ class RealtyAPIClient:
         }
 
 
-# Tool definitions for OpenAI Realtime API
-REALTY_TOOLS = [
-    {
-        "type": "function",
-        "name": "search_properties",
-        "description": "Search for properties (houses, apartments, units) for sale or rent in Australia. Use this when the user asks about finding properties, homes, or real estate.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "location": {
-                    "type": "string",
-                    "description": "The city, suburb, or postcode to search in (e.g., 'Sydney', 'Melbourne', '2000')"
-                },
-                "max_price": {
-                    "type": "integer",
-                    "description": "Maximum price in AUD"
-                },
-                "min_price": {
-                    "type": "integer",
-                    "description": "Minimum price in AUD"
-                },
-                "bedrooms": {
-                    "type": "integer",
-                    "description": "Minimum number of bedrooms"
-                },
-                "property_type": {
-                    "type": "string",
-                    "enum": ["house", "apartment", "unit", "townhouse", "land"],
-                    "description": "Type of property"
-                },
-                "channel": {
-                    "type": "string",
-                    "enum": ["BUY", "RENT"],
-                    "description": "Whether to buy or rent. Default is BUY."
-                }
-            },
-            "required": ["location"]
-        }
-    },
-    {
-        "type": "function",
-        "name": "get_property_details",
-        "description": "Get detailed information about a specific property using its listing ID. Use this when the user wants more details about a property.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "listing_id": {
-                    "type": "string",
-                    "description": "The unique listing ID of the property"
-                }
-            },
-            "required": ["listing_id"]
-        }
-    }
-]
+class DetailPrefetcher:
+    """
+    Speculatively fetches details for listings a session was just shown.
+    
+    Fetches go through the client's cache, so a later get_property_details
+    for a prefetched listing is answered from the warm entry (or joins the
+    request already in flight). Concurrency is bounded per session and by
+    the client's worker-wide budget. Prefetches still queued when the
+    session ends are cancelled.
+    """
+    
+    def __init__(self, client: RealtyAPIClient, max_concurrent: int = 2, max_listings: int = 3):
+        self.client = client
+        self.max_listings = max_listings
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._state: Dict[str, str] = {}
+        self._claimed: Set[str] = set()
+    
+    def schedule(self, search_result: Dict) -> None:
+        """Start prefetching details for the top listings of a search result."""
+        for prop in search_result.get("properties", [])[:self.max_listings]:
+            listing_id = str(prop.get("id", "")).strip()
+            if not listing_id or listing_id == "unknown" or listing_id in self._tasks:
+                continue
+            if self.client.cache.contains(self.client.details_key(listing_id)):
+                continue
+            
+            self.client.prefetch_counters["scheduled"] += 1
+            self._state[listing_id] = "queued"
+            self._tasks[listing_id] = asyncio.create_task(self._prefetch(listing_id))
+    
+    def claim(self, listing_id: str) -> None:
+        """Record that the session asked for a listing's details."""
+        listing_id = str(listing_id).strip()
+        state = self._state.get(listing_id)
+        if state is None or listing_id in self._claimed:
+            return
+        
+        self._claimed.add(listing_id)
+        if state == "queued":
+            # The real request is about to go upstream; don't duplicate it
+            self._tasks[listing_id].cancel()
+            self.client.prefetch_counters["cancelled"] += 1
+        elif state in ("fetching", "done"):
+            self.client.prefetch_counters["hits"] += 1
+    
+    async def close(self) -> None:
+        """Cancel outstanding prefetches and count the ones never used."""
+        for listing_id, task in self._tasks.items():
+            if listing_id in self._claimed:
+                continue
+            if self._state[listing_id] == "queued":
+                self.client.prefetch_counters["cancelled"] += 1
+            elif self._state[listing_id] in ("fetching", "done"):
+                self.client.prefetch_counters["wasted"] += 1
+            task.cancel()
+        
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+    
+    async def _prefetch(self, listing_id: str) -> None:
+        """Fetch one listing's details once both concurrency budgets allow."""
+        try:
+            async with self._slots, self.client.prefetch_slots:
+                if self.client.cache.contains(self.client.details_key(listing_id)):
+                    self._state[listing_id] = "skipped"
+                    return
+                self._state[listing_id] = "fetching"
+                self.client.prefetch_counters["fetched"] += 1
+                await self.client.get_property_details(listing_id)
+                self._state[listing_id] = "done"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Prefetch failed for listing %s: %s", listing_id, e)
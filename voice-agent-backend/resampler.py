@@ -0,0 +1,90 @@
+"""
+Streaming sample rate conversion for PCM16 audio.
+Polyphase FIR resampler that keeps its state across chunks.
+"""
+
+import math
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Client capture rates accepted in client_config
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int, taps_per_phase: int) -> np.ndarray:
+    """
+    Kaiser-windowed sinc low-pass split into its polyphase components.
+    Row p holds the taps applied at phase p, newest input sample first.
+    """
+    length = up * taps_per_phase
+    # Cut off just below the lower of the two Nyquist frequencies
+    cutoff = 0.5 / max(up, down) * 0.92
+    n = np.arange(length) - (length - 1) / 2
+    prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+    # Zero-stuffing divides the signal by up, so the filter makes it back
+    prototype *= up / prototype.sum()
+    bank = np.ascontiguousarray(prototype.reshape(taps_per_phase, up).T, dtype=np.float32)
+    bank.setflags(write=False)
+    return bank
+
+
+class StreamingResampler:
+    """
+    Converts a PCM16 mono stream from one sample rate to another.
+
+    The rate ratio is reduced to up/down, and every output sample is one dot
+    product of taps_per_phase input samples with the filter phase it falls
+    on, computed for a whole chunk at once. The last input samples and the
+    output position carry over between calls, so a stream split into chunks
+    of any size converts exactly like the stream in one piece.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 32):
+        divisor = math.gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.taps = taps_per_phase
+        self._bank = _polyphase_filter(self.up, self.down, taps_per_phase)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the stream so far, e.g. before unrelated audio."""
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Position of the next output sample on the upsampled time axis,
+        # relative to the start of the history buffer
+        self._position = (self.taps - 1) * self.up
+        self._odd_byte = b""
+
+    def process(self, pcm: bytes) -> bytes:
+        """Resample a chunk of PCM16 and return whatever output it completes."""
+        if self._odd_byte:
+            pcm = self._odd_byte + pcm
+        usable = len(pcm) - len(pcm) % 2
+        self._odd_byte = pcm[usable:]
+        if not usable:
+            return b""
+
+        samples = np.frombuffer(pcm, dtype="<i2", count=usable // 2).astype(np.float32)
+        buffer = np.concatenate((self._history, samples))
+
+        positions = np.arange(self._position, len(buffer) * self.up, self.down)
+        if len(positions):
+            bases = positions // self.up
+            phases = positions % self.up
+            # windows[i] is the taps input samples ending at bases[i], oldest first
+            windows = sliding_window_view(buffer, self.taps)[bases - (self.taps - 1)]
+            out = np.einsum("ij,ij->i", windows[:, ::-1], self._bank[phases])
+            next_position = int(positions[-1]) + self.down
+        else:
+            out = np.empty(0, dtype=np.float32)
+            next_position = self._position
+
+        consumed = len(buffer) - (self.taps - 1)
+        self._position = next_position - consumed * self.up
+        self._history = buffer[consumed:]
+        return np.clip(np.rint(out), -32768, 32767).astype("<i2").tobytes()
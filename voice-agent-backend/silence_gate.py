@@ -0,0 +1,153 @@
+"""
+Energy-based silence gate for upstream audio.
+Holds back long stretches of silence so they are not streamed to OpenAI.
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+from metrics import UPSTREAM_AUDIO_BYTES
+
+logger = logging.getLogger(__name__)
+
+_RECEIVED_BYTES = UPSTREAM_AUDIO_BYTES.labels("received")
+_SENT_BYTES = UPSTREAM_AUDIO_BYTES.labels("sent")
+
+
+class SilenceGate:
+    """
+    Per-session gate over PCM16 mono audio.
+
+    Audio is split into short windows and the RMS of every window is computed
+    in one vectorized pass. Windows above the threshold open the gate. After
+    the last voiced window the gate stays open for the hangover, so server VAD
+    still hears the silence it needs to end the turn; after that, quiet
+    windows are held back. The most recent prefix_ms of held-back audio is
+    released ahead of the next voiced window so speech onsets aren't clipped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        threshold_dbfs: float = -50.0,
+        window_ms: int = 20,
+        hangover_ms: int = 500,
+        prefix_ms: int = 300
+    ):
+        self.window_samples = max(1, sample_rate * window_ms // 1000)
+        self.window_bytes = self.window_samples * 2
+        # RMS threshold in sample units (full scale is 32768)
+        self.threshold = 32768.0 * 10 ** (threshold_dbfs / 20)
+        self.hangover_windows = math.ceil(hangover_ms / window_ms)
+        self._prefix: deque = deque(maxlen=math.ceil(prefix_ms / window_ms))
+        self._remainder = b""
+        # Quiet windows since the last voiced one; starts closed
+        self._quiet_windows = self.hangover_windows + 1
+
+        # Counters
+        self.bytes_in = 0
+        self.bytes_sent = 0
+
+    @classmethod
+    def for_settings(cls, settings) -> "SilenceGate":
+        """Build a gate whose hangover and prefix match the session's turn detection."""
+        return cls(
+            sample_rate=settings.sample_rate,
+            threshold_dbfs=settings.silence_gate_threshold_dbfs,
+            window_ms=settings.silence_gate_window_ms,
+            # One extra window so the gate never closes before VAD has ended the turn
+            hangover_ms=settings.vad_silence_duration_ms + settings.silence_gate_window_ms,
+            prefix_ms=settings.vad_prefix_padding_ms
+        )
+
+    @property
+    def is_open(self) -> bool:
+        """Whether quiet audio is currently being passed through."""
+        return self._quiet_windows <= self.hangover_windows
+
+    def process(self, pcm: bytes, final: bool = False) -> bytes:
+        """
+        Gate a chunk of PCM16 and return the audio that should go upstream.
+
+        A trailing partial window is carried over to the next call unless
+        final is set, in which case it is judged on its own.
+        """
+        data = self._remainder + pcm if self._remainder else pcm
+        whole = len(data) - len(data) % self.window_bytes
+        if final:
+            whole = len(data) - len(data) % 2
+        self._remainder = bytes(data[whole:])
+        if not whole:
+            return b""
+        self.bytes_in += whole
+        _RECEIVED_BYTES.inc(whole)
+
+        samples = np.frombuffer(data, dtype="<i2", count=whole // 2).astype(np.float32)
+        windows = len(samples) // self.window_samples
+        rms = np.empty(windows + (len(samples) % self.window_samples > 0), dtype=np.float32)
+        full = samples[:windows * self.window_samples].reshape(windows, self.window_samples)
+        rms[:windows] = np.sqrt(np.mean(full * full, axis=1))
+        if len(rms) > windows:
+            tail = samples[windows * self.window_samples:]
+            rms[windows] = np.sqrt(np.mean(tail * tail))
+        voiced = rms >= self.threshold
+
+        # Common cases: continuous speech, or silence well past the hangover
+        if voiced.all() and self.is_open:
+            self._quiet_windows = 0
+            return self._passed(data[:whole])
+        if not voiced.any() and not self.is_open:
+            self._hold(data, whole)
+            return b""
+
+        out = bytearray()
+        for index, is_voiced in enumerate(voiced):
+            window = data[index * self.window_bytes:min(whole, (index + 1) * self.window_bytes)]
+            if is_voiced:
+                if not self.is_open:
+                    for held in self._prefix:
+                        out += held
+                    self._prefix.clear()
+                self._quiet_windows = 0
+                out += window
+            else:
+                self._quiet_windows += 1
+                if self.is_open:
+                    out += window
+                else:
+                    self._prefix.append(window)
+        return self._passed(bytes(out))
+
+    @property
+    def bytes_suppressed(self) -> int:
+        """Audio held back for good (the pending prefix may still be sent)."""
+        held = sum(len(window) for window in self._prefix)
+        return max(0, self.bytes_in - self.bytes_sent - held)
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for logging and metrics."""
+        suppressed = self.bytes_suppressed
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_sent": self.bytes_sent,
+            "bytes_suppressed": suppressed,
+            "suppressed_ratio": round(suppressed / self.bytes_in, 3) if self.bytes_in else 0.0
+        }
+
+    def _passed(self, audio: bytes) -> bytes:
+        """Count audio that is going upstream."""
+        self.bytes_sent += len(audio)
+        _SENT_BYTES.inc(len(audio))
+        return audio
+
+    def _hold(self, data: bytes, whole: int) -> None:
+        """Keep the tail of a fully silent chunk as the prefix for the next onset."""
+        self._quiet_windows += (whole + self.window_bytes - 1) // self.window_bytes
+        start = max(0, whole - self._prefix.maxlen * self.window_bytes) if self._prefix.maxlen else whole
+        start -= start % self.window_bytes
+        for offset in range(start, whole, self.window_bytes):
+            self._prefix.append(data[offset:min(whole, offset + self.window_bytes)])
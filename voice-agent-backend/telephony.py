@@ -0,0 +1,198 @@
+"""
+Telephony media streams for the Voice Agent.
+Speaks a Twilio-style media stream protocol (8 kHz G.711 mu-law in JSON
+events) and bridges it to the OpenAI Realtime session.
+"""
+
+import binascii
+import json
+import logging
+from typing import Optional, Set
+
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+
+from audio_pacer import OutboundAudioPacer
+from openai_realtime import RealtimeEvent
+from websocket_handler import VoiceSessionHandler
+
+logger = logging.getLogger(__name__)
+
+# Phone audio: 8 kHz mono G.711 mu-law
+TELEPHONY_SAMPLE_RATE = 8000
+TELEPHONY_ENCODING = "audio/x-mulaw"
+
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+
+def _build_ulaw_tables():
+    """
+    Lookup tables for G.711 mu-law.
+    Decoding indexes 256 codes; encoding indexes all 65536 PCM16 values by
+    their unsigned 16-bit pattern, so both directions are a single take().
+    """
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = ((((codes & 0x0F) << 3) + _ULAW_BIAS) << exponent) - _ULAW_BIAS
+    decode = np.where(codes & 0x80, -magnitude, magnitude).astype("<i2")
+
+    # Encoding works on 14-bit magnitudes, as in the reference G.711 coder
+    samples = np.arange(65536, dtype=np.int32)
+    samples = np.where(samples >= 32768, samples - 65536, samples) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    segment = np.searchsorted(_ULAW_SEGMENT_ENDS, magnitude)
+    code = np.where(segment < 8, (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F), 0x7F)
+    encode = (code ^ mask).astype(np.uint8)
+
+    decode.setflags(write=False)
+    encode.setflags(write=False)
+    return decode, encode
+
+
+_ULAW_TO_PCM16, _PCM16_TO_ULAW = _build_ulaw_tables()
+
+
+def ulaw_to_pcm16(data: bytes) -> bytes:
+    """Decode G.711 mu-law bytes to PCM16."""
+    return _ULAW_TO_PCM16.take(np.frombuffer(data, dtype=np.uint8)).tobytes()
+
+
+def pcm16_to_ulaw(pcm: bytes) -> bytes:
+    """Encode PCM16 to G.711 mu-law bytes."""
+    usable = len(pcm) - len(pcm) % 2
+    return _PCM16_TO_ULAW.take(np.frombuffer(pcm, dtype="<u2", count=usable // 2)).tobytes()
+
+
+class TelephonySessionHandler(VoiceSessionHandler):
+    """
+    Voice session for a phone call delivered as a media stream.
+
+    The carrier sends connected/start/media/mark/stop events with base64
+    mu-law payloads. Caller audio is decoded and resampled to the upstream
+    rate; the agent's audio is paced, resampled to 8 kHz, encoded and sent
+    back as media events. When the caller barges in, unsent audio is dropped
+    and a clear event makes the carrier drop whatever it still has buffered.
+    """
+
+    CALL_CHANNEL = "phone"
+
+    FORWARD_EVENTS = frozenset({
+        "response.audio.delta",
+        "response.audio.done"
+    })
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream_sid: Optional[str] = None
+        self.call_sid: Optional[str] = None
+        self._pending_marks: Set[str] = set()
+        self._configure_resampling(TELEPHONY_SAMPLE_RATE, resample_output=True)
+        # Carriers buffer everything they're sent, so always pace phone audio
+        if self.audio_pacer is None:
+            self.audio_pacer = OutboundAudioPacer.for_settings(self._send_paced_audio, self.settings)
+
+    @classmethod
+    async def notify_queued(cls, websocket: WebSocket) -> None:
+        """Carriers have no queued event; the caller just hears silence."""
+
+    @classmethod
+    async def notify_rejected(cls, websocket: WebSocket, reason: str) -> None:
+        """Carriers have no error event; closing the stream is the signal."""
+
+    async def _notify_ending(self, reason: str) -> None:
+        """Nothing to send; closing the stream hands the call back to the carrier."""
+
+    async def _forward_client_to_openai(self) -> None:
+        """Receive media stream events and forward the caller's audio."""
+        try:
+            while self._running:
+                try:
+                    message = json.loads(await self.client_ws.receive_text())
+                    event = message.get("event")
+
+                    if event == "media":
+                        media = message.get("media", {})
+                        payload = media.get("payload")
+                        if payload and media.get("track", "inbound") == "inbound":
+                            await self._push_client_audio(ulaw_to_pcm16(binascii.a2b_base64(payload)))
+                    elif event == "start":
+                        self._start_stream(message)
+                    elif event == "mark":
+                        self._mark_played(message.get("mark", {}).get("name"))
+                    elif event == "stop":
+                        logger.info("Media stream stopped: %s", self.stream_sid)
+                        self._running = False
+                    elif event in ("connected", "dtmf"):
+                        logger.debug("Media stream event: %s", event)
+                    else:
+                        logger.warning("Unknown media stream event: %s", event)
+
+                except json.JSONDecodeError as e:
+                    logger.error("Invalid JSON from carrier: %s", e)
+                except binascii.Error as e:
+                    logger.error("Invalid base64 audio from carrier: %s", e)
+
+        except WebSocketDisconnect:
+            logger.info("Carrier disconnected")
+            self._running = False
+        except Exception as e:
+            logger.error("Error forwarding carrier messages: %s", e)
+            self._running = False
+
+    def _start_stream(self, message: dict) -> None:
+        """Record the stream identifiers and check the media format."""
+        start = message.get("start", {})
+        self.stream_sid = message.get("streamSid") or start.get("streamSid")
+        self.call_sid = start.get("callSid")
+
+        media_format = start.get("mediaFormat", {})
+        encoding = media_format.get("encoding", TELEPHONY_ENCODING)
+        sample_rate = media_format.get("sampleRate", TELEPHONY_SAMPLE_RATE)
+        if encoding != TELEPHONY_ENCODING or sample_rate != TELEPHONY_SAMPLE_RATE:
+            logger.warning("Unexpected media format %s at %s Hz, treating as 8 kHz mu-law", encoding, sample_rate)
+        logger.info("Media stream started: %s (call %s)", self.stream_sid, self.call_sid)
+        self._record("stream.start", stream_sid=self.stream_sid, call_sid=self.call_sid)
+
+    async def _forward_to_client(self, event: RealtimeEvent) -> None:
+        """Translate OpenAI audio events into media stream events."""
+        if self.stream_sid is None:
+            return
+
+        if event.type == "response.audio.delta":
+            self.audio_pacer.push(binascii.a2b_base64(event.get("delta", "")), self._audio_meta(event))
+
+        elif event.type == "response.audio.done":
+            # The carrier echoes the mark once the audio before it has played
+            name = event.get("item_id") or event.get("response_id", "")
+            self.audio_pacer.end_item()
+            self.audio_pacer.after_audio(lambda: self._send_mark(name))
+
+    async def _send_paced_audio(self, meta: dict, pcm: bytes) -> None:
+        """Send one paced frame of agent audio as a mu-law media event."""
+        pcm = self._outbound_resampler.process(pcm)
+        if pcm:
+            payload = binascii.b2a_base64(pcm16_to_ulaw(pcm), newline=False).decode("ascii")
+            await self._send_stream_event("media", media={"payload": payload})
+            self._audio_delivered()
+
+    async def _send_mark(self, name: str) -> None:
+        self._pending_marks.add(name)
+        await self._send_stream_event("mark", mark={"name": name})
+
+    def _mark_played(self, name: Optional[str]) -> None:
+        """The carrier played an item's audio up to its mark; a barge-in has nothing of it to cut."""
+        if name in self._pending_marks:
+            self._pending_marks.discard(name)
+            self.audio_pacer.played(name)
+
+    async def _notify_playback_cleared(self, item_id: str, audio_end_ms: int) -> None:
+        """Barge-in: make the carrier drop agent audio it hasn't played yet."""
+        await self._send_stream_event("clear")
+        self._pending_marks.clear()
+
+    async def _send_stream_event(self, event: str, **fields) -> None:
+        """Send a media stream event for this call."""
+        await self._send_to_client(json.dumps({"event": event, "streamSid": self.stream_sid, **fields}))
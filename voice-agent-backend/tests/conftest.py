@@ -0,0 +1,6 @@
+"""Make the backend's flat modules importable when pytest runs from anywhere."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
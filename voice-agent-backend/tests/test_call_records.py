@@ -0,0 +1,91 @@
+"""Tests for CallRecorder's segment writer and its bounded queue."""
+
+import json
+import os
+import time
+
+import pytest
+
+import call_records
+from call_records import CallRecorder
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    """Count fsyncs instead of waiting for the disk."""
+    calls = []
+    monkeypatch.setattr(call_records.os, "fsync", calls.append)
+    return calls
+
+
+def read_segments(directory) -> list:
+    records = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name)) as f:
+            records.append([json.loads(line) for line in f])
+    return records
+
+
+def test_records_are_written_as_json_lines(tmp_path, fsyncs):
+    recorder = CallRecorder(str(tmp_path))
+    recorder.start()
+    recorder.record("s1", "session.start", channel="web")
+    recorder.record("s1", "transcript", role="caller", text="Two bedrooms in Bondi")
+    recorder.close()
+
+    [segment] = read_segments(tmp_path)
+    assert [(entry["session"], entry["event"]) for entry in segment] == [("s1", "session.start"), ("s1", "transcript")]
+    assert segment[1]["text"] == "Two bedrooms in Bondi"
+    assert recorder.stats()["written"] == 2
+
+
+def test_each_batch_is_synced_once_with_zero_fsync_seconds(tmp_path, fsyncs):
+    recorder = CallRecorder(str(tmp_path), fsync_seconds=0)
+    recorder.start()
+    for n in range(5):
+        recorder.record("s1", "turn", n=n)
+        # One record per batch: wait for the writer to take it
+        deadline = time.monotonic() + 5
+        while recorder.written <= n and time.monotonic() < deadline:
+            time.sleep(0.005)
+    recorder.close()
+
+    assert recorder.batches == 5
+    assert len(fsyncs) == 5
+
+
+def test_segment_rotates_at_max_bytes(tmp_path, fsyncs):
+    batch = [{"session": "s1", "event": "turn", "text": "x" * 80} for _ in range(2)]
+    batch_bytes = len("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in batch))
+    # Room for three batches, so the fourth starts a new segment
+    recorder = CallRecorder(str(tmp_path), segment_max_bytes=3 * batch_bytes + 10)
+    for _ in range(4):
+        recorder._write_batch(batch)
+    recorder._close_segment()
+
+    assert recorder.segments == 2
+    assert [len(segment) for segment in read_segments(tmp_path)] == [6, 2]
+    assert all(os.path.getsize(tmp_path / name) <= recorder.segment_max_bytes for name in os.listdir(tmp_path))
+    # Each segment is synced when it is closed
+    assert len(fsyncs) == 2
+
+
+def test_batch_larger_than_a_segment_still_gets_written(tmp_path, fsyncs):
+    recorder = CallRecorder(str(tmp_path), segment_max_bytes=50)
+    recorder._write_batch([{"event": "turn", "text": "x" * 100}])
+    recorder._write_batch([{"event": "turn", "text": "y" * 100}])
+    recorder._close_segment()
+
+    assert recorder.segments == 2
+    assert [len(segment) for segment in read_segments(tmp_path)] == [1, 1]
+
+
+def test_records_past_a_full_queue_are_dropped_and_counted(tmp_path):
+    # Not started: nothing drains the queue
+    recorder = CallRecorder(str(tmp_path), queue_size=3)
+    results = [recorder.record("s1", "turn", n=n) for n in range(5)]
+
+    assert results == [True, True, True, False, False]
+    assert recorder.stats()["recorded"] == 3
+    assert recorder.stats()["dropped"] == 2
+    assert recorder.queue_depth == 3
@@ -0,0 +1,135 @@
+"""Tests for writing OpenAI traffic to a capture file and reading it back."""
+
+import base64
+import json
+
+import pytest
+
+from config import Settings
+from event_capture import (
+    CLIENT_AUDIO,
+    CLIENT_EVENT,
+    MARK,
+    SERVER_AUDIO,
+    SERVER_EVENT,
+    CaptureReader,
+    EventCapture
+)
+from openai_realtime import OpenAIRealtimeClient
+
+
+def audio_delta(pcm: bytes, item_id: str = "item_1") -> str:
+    delta = base64.b64encode(pcm).decode("ascii")
+    return f'{{"type":"response.audio.delta","event_id":"ev_1","response_id":"resp_1","item_id":"{item_id}","delta":"{delta}"}}'
+
+
+def test_round_trip_rebuilds_frames_byte_for_byte(tmp_path):
+    path = str(tmp_path / "session.vcap")
+    pcm = bytes(range(256)) * 20
+    frames = [audio_delta(pcm), audio_delta(b"\x00\x01" * 3, "item_ü"), audio_delta(b"")]
+    caller_pcm = b"\x10\x00\xf0\xff" * 480
+    session_update = '{"type":"session.update","session":{"voice":"alloy"}}'
+
+    capture = EventCapture(path, {"session_id": "abc", "sample_rate": 24000})
+    capture.client_message(session_update)
+    capture.client_audio(caller_pcm)
+    capture.server_frame('{"type":"session.created"}')
+    for frame in frames:
+        capture.server_frame(frame.encode("utf-8"))
+    capture.mark("reconnect", attempts=1)
+    capture.close()
+
+    with CaptureReader(path) as reader:
+        assert reader.metadata["session_id"] == "abc"
+        records = [(kind, bytes(payload)) for kind, _, payload in reader]
+
+    assert [kind for kind, _ in records] == [
+        CLIENT_EVENT, CLIENT_AUDIO, SERVER_EVENT, SERVER_AUDIO, SERVER_AUDIO, SERVER_AUDIO, MARK
+    ]
+    assert records[0][1].decode("utf-8") == session_update
+    assert records[1][1] == caller_pcm
+    assert records[2][1] == b'{"type":"session.created"}'
+    assert [CaptureReader.server_audio_frame(payload) for _, payload in records[3:6]] == frames
+    assert json.loads(records[6][1]) == {"mark": "reconnect", "attempts": 1}
+
+
+def test_audio_is_stored_as_raw_pcm(tmp_path):
+    path = str(tmp_path / "session.vcap")
+    pcm = b"\x01\x02" * 2400
+    capture = EventCapture(path)
+    capture.server_frame(audio_delta(pcm))
+    capture.close()
+
+    with CaptureReader(path) as reader:
+        [(kind, _, payload)] = list(reader)
+    assert kind == SERVER_AUDIO
+    assert bytes(payload).endswith(pcm)
+    assert len(payload) < len(audio_delta(pcm))
+
+
+def test_capture_stops_at_max_bytes_with_a_mark(tmp_path):
+    path = str(tmp_path / "session.vcap")
+    capture = EventCapture(path, max_bytes=4096)
+    for _ in range(10):
+        capture.client_audio(b"\x00" * 1000)
+    capture.close()
+
+    with CaptureReader(path) as reader:
+        kinds = [kind for kind, _, _ in reader]
+    assert capture.truncated
+    assert kinds[-1] == MARK
+    assert kinds.count(MARK) == 1
+    assert all(kind == CLIENT_AUDIO for kind in kinds[:-1])
+
+
+def test_partial_last_record_is_skipped(tmp_path):
+    path = str(tmp_path / "session.vcap")
+    capture = EventCapture(path)
+    capture.client_message('{"type":"response.create"}')
+    capture.client_audio(b"\x00" * 100)
+    capture.close()
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 10)
+
+    with CaptureReader(path) as reader:
+        assert [kind for kind, _, _ in reader] == [CLIENT_EVENT]
+
+
+def test_reader_rejects_other_files(tmp_path):
+    path = tmp_path / "notes.vcap"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError, match="Not a capture file"):
+        CaptureReader(str(path))
+
+
+class StubWebSocket:
+    """The OpenAI WebSocket; frames sent on it are kept."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data, text=False):
+        self.sent.append(data)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("pooled", [False, True])
+async def test_capture_starts_with_the_session_configuration(tmp_path, pooled):
+    path = str(tmp_path / "session.vcap")
+    capture = EventCapture(path)
+    client = OpenAIRealtimeClient(Settings(openai_api_key="test"))
+    ws = StubWebSocket()
+    if pooled:
+        # A pooled connection was configured before the session attached its capture
+        await client._configure_session(ws)
+        client.attach_capture(capture)
+    else:
+        client.attach_capture(capture)
+        await client._configure_session(ws)
+    capture.close()
+
+    with CaptureReader(path) as reader:
+        [(kind, _, payload)] = list(reader)
+    assert kind == CLIENT_EVENT
+    assert bytes(payload) == ws.sent[0]
+    assert json.loads(payload)["type"] == "session.update"
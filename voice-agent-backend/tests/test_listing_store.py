@@ -0,0 +1,61 @@
+"""Tests for which listing store regions the background refresher ingests."""
+
+import time
+
+import pytest
+
+from listing_store import ListingStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ListingStore(str(tmp_path / "listings.sqlite3"), max_age_seconds=3600, max_regions=10)
+    yield store
+    store.close()
+
+
+def age_region(store: ListingStore, location: str, refreshed_ago: float, used_ago: float) -> None:
+    now = time.time()
+    store._writer.execute(
+        "UPDATE regions SET refreshed_at = ?, last_used_at = ? WHERE location = ?",
+        (now - refreshed_ago, now - used_ago, location)
+    )
+
+
+def test_searched_region_is_due_for_its_first_ingest(store):
+    assert store.search("Bondi") is None
+    store.sync_regions()
+    assert store.regions_due(3000, 10) == [("bondi", "BUY")]
+
+
+def test_region_still_searched_is_refreshed(store):
+    store.search("Bondi")
+    store.sync_regions()
+    store.replace_region("Bondi", "BUY", [])
+    assert store.regions_due(3000, 10) == []
+
+    age_region(store, "bondi", refreshed_ago=3100, used_ago=600)
+    assert store.regions_due(3000, 10) == [("bondi", "BUY")]
+
+
+def test_region_no_longer_searched_is_left_to_go_stale(store):
+    store.search("Bondi Junctoin")
+    store.sync_regions()
+    store.replace_region("Bondi Junctoin", "BUY", [])
+
+    age_region(store, "bondi junctoin", refreshed_ago=3100, used_ago=3700)
+    assert store.regions_due(3000, 10) == []
+
+    # Searching it again puts it back in rotation
+    store.search("Bondi Junctoin")
+    store.sync_regions()
+    assert store.regions_due(3000, 10) == [("bondi junctoin", "BUY")]
+
+
+def test_pinned_region_is_always_refreshed(store):
+    store.track("Parramatta", "BUY", pinned=True)
+    store.sync_regions()
+    store.replace_region("Parramatta", "BUY", [])
+
+    age_region(store, "parramatta", refreshed_ago=3100, used_ago=86400)
+    assert store.regions_due(3000, 10) == [("parramatta", "BUY")]
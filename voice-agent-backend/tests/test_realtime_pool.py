@@ -0,0 +1,105 @@
+"""Tests for RealtimeConnectionPool refills across a settings reload."""
+
+import asyncio
+from typing import List
+
+import pytest
+
+import realtime_pool
+from config import Settings
+from realtime_pool import RealtimeConnectionPool
+
+
+class StubRealtimeClient:
+    """A pooled connection; connect() waits until the test lets it finish."""
+
+    instances: List["StubRealtimeClient"] = []
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.connecting = asyncio.Event()
+        self.finish_connect = asyncio.Event()
+        self.is_open = False
+        self.disconnected = False
+        StubRealtimeClient.instances.append(self)
+
+    async def connect(self) -> None:
+        self.connecting.set()
+        await self.finish_connect.wait()
+        self.is_open = True
+
+    async def disconnect(self) -> None:
+        self.is_open = False
+        self.disconnected = True
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    StubRealtimeClient.instances = []
+    monkeypatch.setattr(realtime_pool, "OpenAIRealtimeClient", StubRealtimeClient)
+    return StubRealtimeClient.instances
+
+
+async def next_client(clients: List[StubRealtimeClient], count: int) -> StubRealtimeClient:
+    """Wait for the pool to start opening its count-th connection."""
+    async def opened() -> None:
+        while len(clients) < count:
+            await asyncio.sleep(0)
+        await clients[count - 1].connecting.wait()
+
+    await asyncio.wait_for(opened(), timeout=1)
+    return clients[count - 1]
+
+
+async def until_idle(pool: RealtimeConnectionPool, count: int) -> None:
+    async def filled() -> None:
+        while pool.idle_count < count:
+            await asyncio.sleep(0)
+
+    await asyncio.wait_for(filled(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_connection_opened_during_reconfigure_is_discarded(clients):
+    old_settings = Settings(openai_api_key="test", openai_voice="alloy")
+    new_settings = Settings(openai_api_key="test", openai_voice="verse")
+    pool = RealtimeConnectionPool(old_settings, size=1)
+    await pool.start()
+    try:
+        opening = await next_client(clients, 1)
+        await pool.reconfigure(new_settings)
+        opening.finish_connect.set()
+
+        replacement = await next_client(clients, 2)
+        assert opening.disconnected
+        assert pool.idle_count == 0
+        assert replacement.settings is new_settings
+
+        replacement.finish_connect.set()
+        await until_idle(pool, 1)
+        assert await pool.acquire() is replacement
+        assert pool.stats()["connections_evicted"] == 1
+    finally:
+        for client in clients:
+            client.finish_connect.set()
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_are_replaced_on_reconfigure(clients):
+    pool = RealtimeConnectionPool(Settings(openai_api_key="test"), size=1)
+    await pool.start()
+    try:
+        first = await next_client(clients, 1)
+        first.finish_connect.set()
+        await until_idle(pool, 1)
+
+        new_settings = Settings(openai_api_key="test", openai_voice="verse")
+        await pool.reconfigure(new_settings)
+        assert first.disconnected
+        second = await next_client(clients, 2)
+        assert second.settings is new_settings
+    finally:
+        for client in clients:
+            client.finish_connect.set()
+        await pool.close()
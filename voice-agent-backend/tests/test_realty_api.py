@@ -0,0 +1,29 @@
+"""Tests for how RealtyAPIClient is built from settings."""
+
+from config import Settings
+from realty_api import RAPIDAPI_HOST, RealtyAPIClient
+
+
+def test_default_host_is_sent_in_the_header():
+    client = RealtyAPIClient("key")
+    assert client.headers["x-rapidapi-host"] == RAPIDAPI_HOST
+    assert client.base_url == f"https://{RAPIDAPI_HOST}"
+
+
+def test_host_override_changes_url_and_header():
+    settings = Settings(openai_api_key="test", rapidapi_key="key", rapidapi_host="realty-in-au.example.com")
+    client = RealtyAPIClient.for_settings(settings)
+    assert client.base_url == "https://realty-in-au.example.com"
+    assert client.headers == {"x-rapidapi-key": "key", "x-rapidapi-host": "realty-in-au.example.com"}
+
+
+def test_base_url_override_keeps_the_configured_host():
+    settings = Settings(
+        openai_api_key="test",
+        rapidapi_key="key",
+        rapidapi_host="realty-in-au.example.com",
+        rapidapi_base_url="http://127.0.0.1:9200"
+    )
+    client = RealtyAPIClient.for_settings(settings)
+    assert client.base_url == "http://127.0.0.1:9200"
+    assert client.headers["x-rapidapi-host"] == "realty-in-au.example.com"
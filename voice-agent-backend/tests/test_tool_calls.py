@@ -0,0 +1,274 @@
+"""
+Tests for how VoiceSessionHandler runs tool calls: outputs submitted in call
+order, one response.create per response, and cancellation when the caller
+barges in or a newer response makes the calls obsolete.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+import pytest
+import pytest_asyncio
+from prometheus_client import REGISTRY
+
+from config import Settings
+from openai_realtime import RealtimeEvent
+from tools import Tool, ToolRegistry
+from websocket_handler import VoiceSessionHandler
+
+
+class StubClientSocket:
+    """The caller's WebSocket; only what the handler forwards is kept."""
+
+    def __init__(self):
+        self.sent: List[str] = []
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(text)
+
+
+class StubRealtimeClient:
+    """The OpenAI connection: events are delivered by the test, sends are kept."""
+
+    def __init__(self):
+        self.sent: List[dict] = []
+        self._on_message = None
+        self._connected = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    async def send_message(self, message: dict) -> None:
+        self.sent.append(message)
+
+    async def create_response(self) -> None:
+        await self.send_message({"type": "response.create"})
+
+    async def receive_messages(self, on_message, on_reconnect=None) -> None:
+        self._on_message = on_message
+        self._connected.set()
+        await self._closed.wait()
+
+    async def deliver(self, event_type: str, **fields) -> None:
+        await self._connected.wait()
+        await self._on_message(RealtimeEvent.from_raw(json.dumps({"type": event_type, **fields})))
+
+    def outputs(self) -> List[tuple]:
+        """(call_id, decoded output) of each function result sent, in order."""
+        return [
+            (message["item"]["call_id"], json.loads(message["item"]["output"]))
+            for message in self.sent
+            if message["type"] == "conversation.item.create"
+        ]
+
+    def responses_requested(self) -> int:
+        return sum(1 for message in self.sent if message["type"] == "response.create")
+
+
+class Gates:
+    """
+    Per-key events that hold a lookup tool call until the test releases it.
+    The key "missing" returns an error result straight away, like an API 404.
+    """
+
+    def __init__(self):
+        self.started: Dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+        self.release: Dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+        self.cancelled: List[str] = []
+
+    async def handler(self, context, args, use_cache) -> Dict:
+        key = args["key"]
+        if key == "missing":
+            return {"error": "API error: 404"}
+        self.started[key].set()
+        try:
+            await self.release[key].wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(key)
+            raise
+        return {"summary": key}
+
+
+class StubCallRecorder:
+    """Keeps the call records the handler queues."""
+
+    def __init__(self):
+        self.records: List[dict] = []
+
+    def record(self, session_id: str, event: str, **fields) -> None:
+        self.records.append({"event": event, **fields})
+
+
+@pytest.fixture
+def gates():
+    return Gates()
+
+
+@pytest_asyncio.fixture
+async def session(gates):
+    settings = Settings(openai_api_key="test", outbound_pacing=False, call_records=False)
+    handler = VoiceSessionHandler(StubClientSocket(), settings)
+    handler.openai_client = upstream = StubRealtimeClient()
+    handler.tools = ToolRegistry([Tool(
+        name="lookup",
+        description="Test tool",
+        parameters={"type": "object", "properties": {"key": {"type": "string"}}},
+        handler=gates.handler,
+        timeout_seconds=5.0
+    )])
+    handler._tool_slots = handler.tools.session_slots()
+    handler.call_recorder = StubCallRecorder()
+    handler._running = True
+    receiver = asyncio.create_task(handler._forward_openai_to_client())
+    yield handler, upstream
+    handler._running = False
+    await handler._cancel_tool_calls()
+    upstream._closed.set()
+    await receiver
+
+
+async def call_tool(upstream: StubRealtimeClient, response_id: str, call_id: str, key: str) -> None:
+    await upstream.deliver(
+        "response.function_call_arguments.done",
+        response_id=response_id, call_id=call_id, name="lookup", arguments=json.dumps({"key": key})
+    )
+
+
+async def settle(handler: VoiceSessionHandler) -> None:
+    """Let finished tool calls submit their outputs."""
+    tasks = list(handler._tool_tasks.values())
+    if tasks:
+        await asyncio.wait(tasks, timeout=0.1)
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_outputs_are_submitted_in_call_order(session, gates):
+    handler, upstream = session
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    await call_tool(upstream, "resp_1", "call_a", "a")
+    await call_tool(upstream, "resp_1", "call_b", "b")
+    await upstream.deliver("response.done", response={"id": "resp_1", "status": "completed"})
+
+    # The second call finishes first; its output waits for the first call's
+    gates.release["b"].set()
+    await settle(handler)
+    assert upstream.outputs() == []
+    assert upstream.responses_requested() == 0
+
+    gates.release["a"].set()
+    await settle(handler)
+    assert [call_id for call_id, _ in upstream.outputs()] == ["call_a", "call_b"]
+    assert [output["summary"] for _, output in upstream.outputs()] == ["a", "b"]
+    assert upstream.responses_requested() == 1
+    assert handler._tool_turns == {}
+
+
+@pytest.mark.asyncio
+async def test_follow_up_response_waits_for_response_done(session, gates):
+    handler, upstream = session
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    await call_tool(upstream, "resp_1", "call_a", "a")
+    await call_tool(upstream, "resp_1", "call_b", "b")
+
+    gates.release["a"].set()
+    gates.release["b"].set()
+    await settle(handler)
+    assert len(upstream.outputs()) == 2
+    assert upstream.responses_requested() == 0
+
+    await upstream.deliver("response.done", response={"id": "resp_1", "status": "completed"})
+    await upstream.deliver("response.done", response={"id": "resp_1", "status": "completed"})
+    assert upstream.responses_requested() == 1
+
+
+@pytest.mark.asyncio
+async def test_barge_in_cancels_calls_in_flight(session, gates):
+    handler, upstream = session
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    await call_tool(upstream, "resp_1", "call_a", "a")
+    await upstream.deliver("response.done", response={"id": "resp_1", "status": "completed"})
+    await gates.started["a"].wait()
+
+    await upstream.deliver("input_audio_buffer.speech_started")
+    await settle(handler)
+
+    assert gates.cancelled == ["a"]
+    # The call still gets an output so the conversation stays well formed,
+    # but the stale turn doesn't ask for a response of its own
+    assert [call_id for call_id, _ in upstream.outputs()] == ["call_a"]
+    assert upstream.outputs()[0][1]["e"] == "Cancelled because the conversation moved on"
+    assert upstream.responses_requested() == 0
+    assert handler._tool_turns == {}
+    assert handler._tool_tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_newer_response_makes_earlier_calls_obsolete(session, gates):
+    handler, upstream = session
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    await call_tool(upstream, "resp_1", "call_a", "a")
+    await upstream.deliver("response.done", response={"id": "resp_1", "status": "completed"})
+    await gates.started["a"].wait()
+
+    await upstream.deliver("response.created", response={"id": "resp_2"})
+    await call_tool(upstream, "resp_2", "call_b", "b")
+    await settle(handler)
+    assert gates.cancelled == ["a"]
+    assert upstream.responses_requested() == 0
+
+    gates.release["b"].set()
+    await upstream.deliver("response.done", response={"id": "resp_2", "status": "completed"})
+    await settle(handler)
+    assert [call_id for call_id, _ in upstream.outputs()] == ["call_a", "call_b"]
+    assert upstream.outputs()[1][1]["summary"] == "b"
+    assert upstream.responses_requested() == 1
+    assert handler._tool_turns == {}
+
+
+@pytest.mark.asyncio
+async def test_calls_of_the_current_response_survive_its_creation(session, gates):
+    handler, upstream = session
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    await call_tool(upstream, "resp_1", "call_a", "a")
+    # A duplicate response.created for the same response keeps its calls
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    gates.release["a"].set()
+    await upstream.deliver("response.done", response={"id": "resp_1", "status": "completed"})
+    await settle(handler)
+
+    assert gates.cancelled == []
+    assert upstream.outputs()[0][1]["summary"] == "a"
+    assert upstream.responses_requested() == 1
+
+
+@pytest.mark.asyncio
+async def test_error_result_is_recorded_as_an_error(session, gates):
+    handler, upstream = session
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    await call_tool(upstream, "resp_1", "call_a", "missing")
+    await call_tool(upstream, "resp_1", "call_b", "b")
+    gates.release["b"].set()
+    await upstream.deliver("response.done", response={"id": "resp_1", "status": "completed"})
+    await settle(handler)
+
+    outcomes = {record["call_id"]: record["outcome"] for record in handler.call_recorder.records if record["event"] == "tool_call"}
+    assert outcomes == {"call_a": "error", "call_b": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_made_up_tool_names_share_one_metric_series(session, gates):
+    handler, upstream = session
+    await upstream.deliver("response.created", response={"id": "resp_1"})
+    await upstream.deliver("response.function_call_arguments.delta", call_id="call_a", name="find_houses", delta="{}")
+    await upstream.deliver(
+        "response.function_call_arguments.done",
+        response_id="resp_1", call_id="call_a", name="find_houses", arguments="{}"
+    )
+    await settle(handler)
+
+    assert "Unknown function" in upstream.outputs()[0][1]["e"]
+    for metric in ("voice_tool_call_seconds_count", "voice_function_call_arguments_seconds_count"):
+        assert REGISTRY.get_sample_value(metric, {"tool": "find_houses"}) is None
+        assert REGISTRY.get_sample_value(metric, {"tool": "unknown"}) >= 1
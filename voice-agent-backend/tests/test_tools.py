@@ -0,0 +1,250 @@
+"""Tests for tool argument validation and ToolRegistry concurrency limits."""
+
+import asyncio
+import json
+
+import pytest
+
+from tools import Tool, ToolContext, ToolError, ToolRegistry, compile_validator
+
+SEARCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "location": {"type": "string"},
+        "max_price": {"type": "integer"},
+        "bathrooms": {"type": "number", "minimum": 1},
+        "channel": {"type": "string", "enum": ["BUY", "RENT"]},
+        "listing_ids": {"type": "array", "items": {"type": "string"}, "minItems": 2, "maxItems": 3}
+    },
+    "required": ["location"]
+}
+
+
+@pytest.fixture
+def validate():
+    return compile_validator(SEARCH_SCHEMA)
+
+
+# Validation
+
+def test_null_and_empty_values_are_absent(validate):
+    assert validate({"location": "Bondi", "max_price": None, "channel": ""}) == {"location": "Bondi"}
+
+
+def test_null_required_field_is_missing(validate):
+    with pytest.raises(ValueError, match="location is required"):
+        validate({"location": None})
+
+
+def test_unknown_fields_are_dropped(validate):
+    assert validate({"location": "Bondi", "pool": True}) == {"location": "Bondi"}
+
+
+def test_numeric_strings_are_coerced(validate):
+    args = validate({"location": 2026, "max_price": "1,200,000", "bathrooms": "1.5"})
+    assert args == {"location": "2026", "max_price": 1200000, "bathrooms": 1.5}
+
+
+def test_whole_float_becomes_integer(validate):
+    assert validate({"location": "Bondi", "max_price": 900000.0})["max_price"] == 900000
+
+
+@pytest.mark.parametrize("value", ["lots", 1.5, True])
+def test_non_integer_is_rejected(validate, value):
+    with pytest.raises(ValueError, match="max_price must be an integer"):
+        validate({"location": "Bondi", "max_price": value})
+
+
+def test_minimum_is_enforced(validate):
+    with pytest.raises(ValueError, match="bathrooms must be at least 1"):
+        validate({"location": "Bondi", "bathrooms": 0})
+
+
+def test_enum_matches_case_insensitively(validate):
+    assert validate({"location": "Bondi", "channel": "rent"})["channel"] == "RENT"
+
+
+def test_enum_rejects_other_values(validate):
+    with pytest.raises(ValueError, match="channel must be one of BUY, RENT"):
+        validate({"location": "Bondi", "channel": "SOLD"})
+
+
+def test_array_items_are_coerced(validate):
+    assert validate({"location": "Bondi", "listing_ids": [101, "102"]})["listing_ids"] == ["101", "102"]
+
+
+def test_array_accepts_comma_separated_string(validate):
+    assert validate({"location": "Bondi", "listing_ids": "101, 102,103"})["listing_ids"] == ["101", "102", "103"]
+
+
+def test_array_min_items(validate):
+    with pytest.raises(ValueError, match="listing_ids must have at least 2 items"):
+        validate({"location": "Bondi", "listing_ids": ["101", None]})
+
+
+def test_array_max_items(validate):
+    with pytest.raises(ValueError, match="listing_ids must have at most 3 items"):
+        validate({"location": "Bondi", "listing_ids": "1,2,3,4"})
+
+
+def test_array_item_errors_name_the_field():
+    validate = compile_validator({"type": "object", "properties": {"ids": {"type": "array", "items": {"type": "integer"}}}})
+    with pytest.raises(ValueError, match="ids items must be an integer"):
+        validate({"ids": [1, "two"]})
+
+
+def test_array_rejects_other_types(validate):
+    with pytest.raises(ValueError, match="listing_ids must be a list"):
+        validate({"location": "Bondi", "listing_ids": {"id": "101"}})
+
+
+def test_arguments_must_be_an_object(validate):
+    with pytest.raises(ValueError, match="arguments must be an object"):
+        validate(["Bondi"])
+
+
+# Registry calls
+
+def make_registry(handler, timeout_seconds=1.0, max_per_session=1, max_global=0):
+    tool = Tool(
+        name="lookup",
+        description="Test tool",
+        parameters={"type": "object", "properties": {"key": {"type": "string"}}},
+        handler=handler,
+        timeout_seconds=timeout_seconds,
+        max_per_session=max_per_session,
+        max_global=max_global
+    )
+    return ToolRegistry([tool])
+
+
+async def call(registry, slots, key="a", **kwargs):
+    return await registry.call("lookup", json.dumps({"key": key}), ToolContext(), slots, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_call_returns_handler_result():
+    async def handler(context, args, use_cache):
+        return {"summary": args["key"]}
+
+    registry = make_registry(handler)
+    assert await call(registry, registry.session_slots()) == {"summary": "a"}
+
+
+@pytest.mark.asyncio
+async def test_unknown_and_invalid_calls():
+    async def handler(context, args, use_cache):
+        return {}
+
+    registry = make_registry(handler)
+    with pytest.raises(ToolError) as unknown:
+        await registry.call("missing", "{}", ToolContext(), {})
+    assert unknown.value.outcome == "unknown"
+    with pytest.raises(ToolError) as invalid:
+        await registry.call("lookup", "{not json", ToolContext(), {})
+    assert invalid.value.outcome == "invalid"
+
+
+@pytest.mark.asyncio
+async def test_waiting_for_a_slot_past_the_timeout_is_busy():
+    release = asyncio.Event()
+
+    async def handler(context, args, use_cache):
+        await release.wait()
+        return {"summary": args["key"]}
+
+    registry = make_registry(handler, timeout_seconds=5.0, max_per_session=1)
+    slots = registry.session_slots()
+    holder = asyncio.create_task(call(registry, slots, "first"))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ToolError) as busy:
+        await call(registry, slots, "second", max_timeout_seconds=0.05)
+    assert busy.value.outcome == "busy"
+
+    release.set()
+    assert await holder == {"summary": "first"}
+
+
+@pytest.mark.asyncio
+async def test_worker_wide_slot_applies_across_sessions():
+    release = asyncio.Event()
+
+    async def handler(context, args, use_cache):
+        await release.wait()
+        return {}
+
+    registry = make_registry(handler, timeout_seconds=5.0, max_per_session=0, max_global=1)
+    holder = asyncio.create_task(call(registry, registry.session_slots()))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ToolError) as busy:
+        await call(registry, registry.session_slots(), max_timeout_seconds=0.05)
+    assert busy.value.outcome == "busy"
+
+    release.set()
+    await holder
+
+
+@pytest.mark.asyncio
+async def test_running_past_the_timeout_is_timeout():
+    async def handler(context, args, use_cache):
+        await asyncio.sleep(1)
+        return {}
+
+    registry = make_registry(handler, timeout_seconds=0.05)
+    slots = registry.session_slots()
+    with pytest.raises(ToolError) as timeout:
+        await call(registry, slots)
+    assert timeout.value.outcome == "timeout"
+    assert registry.stats()["lookup"]["in_flight"] == 0
+    assert not slots["lookup"].locked()
+
+
+@pytest.mark.asyncio
+async def test_slots_are_released_after_cancellation():
+    started = asyncio.Event()
+
+    async def handler(context, args, use_cache):
+        started.set()
+        await asyncio.sleep(10)
+        return {}
+
+    registry = make_registry(handler, timeout_seconds=5.0, max_per_session=1, max_global=1)
+    slots = registry.session_slots()
+    task = asyncio.create_task(call(registry, slots))
+    await started.wait()
+    assert registry.stats()["lookup"]["in_flight"] == 1
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert registry.stats()["lookup"]["in_flight"] == 0
+    assert not slots["lookup"].locked()
+    assert not registry._global_slots["lookup"].locked()
+
+
+@pytest.mark.asyncio
+async def test_slots_are_released_when_cancelled_while_waiting():
+    release = asyncio.Event()
+
+    async def handler(context, args, use_cache):
+        await release.wait()
+        return {}
+
+    registry = make_registry(handler, timeout_seconds=5.0, max_per_session=1)
+    slots = registry.session_slots()
+    holder = asyncio.create_task(call(registry, slots))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(call(registry, slots))
+    await asyncio.sleep(0.01)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    release.set()
+    await holder
+
+    assert not slots["lookup"].locked()
+    assert await call(registry, slots) == {}
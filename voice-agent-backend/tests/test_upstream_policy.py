@@ -0,0 +1,195 @@
+"""Tests for the upstream request policy: token bucket and circuit breaker."""
+
+import asyncio
+
+import pytest
+
+import upstream_policy
+from realty_api import UNAVAILABLE_MESSAGE, RealtyAPIClient
+from upstream_policy import CircuitBreaker, TokenBucket, backoff_delay
+
+
+class FakeClock:
+    """Stands in for the time module so tests control time.monotonic()."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(upstream_policy, "time", clock)
+    return clock
+
+
+# Token bucket
+
+def test_try_acquire_takes_the_burst_then_refills(clock):
+    bucket = TokenBucket("test", rate_per_second=10, burst=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    clock.advance(0.1)
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_zero_rate_disables_limiting(clock):
+    bucket = TokenBucket("test", rate_per_second=0, burst=1)
+    assert all(bucket.try_acquire() for _ in range(100))
+
+
+@pytest.mark.asyncio
+async def test_acquire_reserves_tokens_in_arrival_order(clock):
+    bucket = TokenBucket("test", rate_per_second=100, burst=1)
+    assert await bucket.acquire(max_wait=0)
+    # Each waiter reserves the next token, so the balance goes negative
+    first = asyncio.create_task(bucket.acquire(max_wait=1))
+    second = asyncio.create_task(bucket.acquire(max_wait=1))
+    await asyncio.sleep(0)
+    assert bucket._tokens == pytest.approx(-2)
+    assert await first and await second
+
+
+@pytest.mark.asyncio
+async def test_acquire_gives_up_without_taking_a_token(clock):
+    bucket = TokenBucket("test", rate_per_second=1, burst=1)
+    assert await bucket.acquire(max_wait=0)
+    assert not await bucket.acquire(max_wait=0.5)
+    assert bucket._tokens == pytest.approx(0)
+
+    clock.advance(1)
+    assert bucket.try_acquire()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_refunds_its_reservation(clock):
+    bucket = TokenBucket("test", rate_per_second=1, burst=1)
+    assert await bucket.acquire(max_wait=0)
+    waiter = asyncio.create_task(bucket.acquire(max_wait=5))
+    await asyncio.sleep(0)
+    assert bucket._tokens == pytest.approx(-1)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert bucket._tokens == pytest.approx(0)
+    clock.advance(1)
+    assert bucket.try_acquire()
+
+
+def test_backoff_delay_stays_within_cap_and_honours_retry_after():
+    assert all(0 <= backoff_delay(attempt, 0.2, 2.0) <= 2.0 for attempt in range(1, 10))
+    assert backoff_delay(1, 0.2, 2.0, retry_after=1.5) >= 1.5
+    assert backoff_delay(1, 0.2, 2.0, retry_after=30) == 2.0
+
+
+# Circuit breaker
+
+def open_circuit(circuit: CircuitBreaker) -> None:
+    for _ in range(circuit.failure_threshold):
+        assert circuit.allow()
+        circuit.record_failure()
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    circuit = CircuitBreaker("test", failure_threshold=3, reset_seconds=30)
+    circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert not circuit.allow()
+    assert circuit.retry_in == pytest.approx(30)
+
+
+def test_half_open_lets_one_probe_through(clock):
+    circuit = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+    open_circuit(circuit)
+    clock.advance(30)
+
+    assert circuit.allow()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    assert circuit.retry_in is None
+    assert not circuit.allow()
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    circuit = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+    open_circuit(circuit)
+    clock.advance(30)
+    assert circuit.allow()
+
+    circuit.record_success()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow() and circuit.allow()
+
+
+def test_failed_probe_opens_the_circuit_again(clock):
+    circuit = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+    open_circuit(circuit)
+    clock.advance(30)
+    assert circuit.allow()
+
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert not circuit.allow()
+    clock.advance(30)
+    assert circuit.allow()
+
+
+def test_released_probe_lets_the_next_one_through(clock):
+    circuit = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+    open_circuit(circuit)
+    clock.advance(30)
+    assert circuit.allow()
+
+    circuit.release()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    assert circuit.allow()
+
+
+def test_zero_threshold_disables_the_circuit(clock):
+    circuit = CircuitBreaker("test", failure_threshold=0)
+    for _ in range(10):
+        circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_request_releases_the_circuit(clock):
+    client = RealtyAPIClient("test", circuit_failure_threshold=1, circuit_reset_seconds=30, retry_attempts=0)
+    started = asyncio.Event()
+    calls = []
+
+    async def attempt(endpoint, params):
+        calls.append(endpoint)
+        started.set()
+        await asyncio.sleep(10)
+
+    client._attempt = attempt
+    client.circuit.record_failure()
+    assert await client._make_request("/properties/detail") == {"error": UNAVAILABLE_MESSAGE, "unavailable": True}
+    assert calls == []
+
+    clock.advance(30)
+    probe = asyncio.create_task(client._make_request("/properties/detail"))
+    await started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert client.circuit.state == CircuitBreaker.HALF_OPEN
+    assert client.circuit.allow()
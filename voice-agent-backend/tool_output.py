@@ -0,0 +1,203 @@
+"""
+Encoding of tool results for the model.
+The model reads a tool's whole output before it starts speaking, so results
+are sent in a compact, token-budgeted form instead of verbose JSON.
+"""
+
+import json
+from typing import Callable, Dict, List, Optional
+
+# Supported schemas: "full" is the formatted result as plain JSON,
+# "compact-1" the first version of the compact encoding below
+TOOL_OUTPUT_SCHEMAS = ("full", "compact-1")
+
+# Appended to the session instructions when a compact schema is in use, so
+# the key legend is read once per session rather than in every result
+COMPACT_LEGEND = """
+Tool results use compact keys (schema v1): s=summary, p=properties, a=address, $=price, bd=bedrooms, ba=bathrooms, pk=car spaces, t=property type, ld=land size, h=headline, f=features, d=description, id=listing id (for get_property_details and compare_properties), x=listing ids that couldn't be fetched, e=error. Missing keys mean unknown; "..." marks text cut for length.
+"""
+
+# Rough size of a token in characters of JSON, for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Formatted-result placeholders that carry no information for the model
+_PLACEHOLDERS = frozenset({
+    "", "N/A", "unknown", "Property", "Address not available", "No description available"
+})
+
+# Compact key for each formatted-result key, in the order the agent speaks them
+_SEARCH_KEYS = (
+    ("address", "a"), ("price", "$"), ("bedrooms", "bd"), ("bathrooms", "ba"),
+    ("property_type", "t"), ("id", "id"), ("headline", "h")
+)
+_DETAIL_KEYS = (
+    ("summary", "s"), ("address", "a"), ("price", "$"), ("bedrooms", "bd"), ("bathrooms", "ba"),
+    ("parking", "pk"), ("property_type", "t"), ("land_size", "ld"),
+    ("features", "f"), ("description", "d")
+)
+_COMPARE_KEYS = (
+    ("address", "a"), ("price", "$"), ("bedrooms", "bd"), ("bathrooms", "ba"), ("parking", "pk"),
+    ("property_type", "t"), ("land_size", "ld"), ("id", "id"), ("features", "f")
+)
+
+_ELLIPSIS = "..."
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a serialized result."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _informative(value) -> bool:
+    if value is None or value == []:
+        return False
+    return not (isinstance(value, str) and value.strip() in _PLACEHOLDERS)
+
+
+def _compact(source: Dict, keys) -> Dict:
+    """Informative fields under their compact keys (lists copied, as trimming edits them)."""
+    return {
+        short: list(source[key]) if isinstance(source[key], list) else source[key]
+        for key, short in keys if _informative(source.get(key))
+    }
+
+
+def _cut(text: str, limit: int) -> str:
+    """Shorten text to at most limit characters at a word boundary."""
+    if len(text) <= limit:
+        return text
+    cut = text[:max(0, limit - len(_ELLIPSIS))]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(" ,.;") + _ELLIPSIS if cut else ""
+
+
+# Trimming steps for over-budget results. Each removes one piece of the
+# least important remaining content (given how many characters are over)
+# and returns False once it has nothing left to remove.
+
+def _drop_listing_field(key: str) -> Callable[[Dict, int], bool]:
+    def step(payload: Dict, excess: int) -> bool:
+        for listing in reversed(payload.get("p", [])):
+            if key in listing:
+                del listing[key]
+                return True
+        return False
+    return step
+
+
+def _drop_last_listing(payload: Dict, excess: int) -> bool:
+    listings = payload.get("p", [])
+    if len(listings) <= 1:
+        return False
+    listings.pop()
+    return True
+
+
+def _cut_description(payload: Dict, excess: int) -> bool:
+    text = payload.get("d")
+    if not text:
+        return False
+    shorter = _cut(text, len(text) - excess)
+    if shorter:
+        payload["d"] = shorter
+    else:
+        del payload["d"]
+    return True
+
+
+def _drop_feature(payload: Dict, excess: int) -> bool:
+    features = payload.get("f")
+    if not features:
+        return False
+    features.pop()
+    if not features:
+        del payload["f"]
+    return True
+
+
+def _drop_field(key: str) -> Callable[[Dict, int], bool]:
+    def step(payload: Dict, excess: int) -> bool:
+        return payload.pop(key, None) is not None
+    return step
+
+
+_SEARCH_TRIM_STEPS = [_drop_listing_field("h"), _drop_listing_field("ba"), _drop_last_listing]
+_DETAILS_TRIM_STEPS = [_cut_description, _drop_feature, _drop_field("ld"), _drop_field("pk")]
+# Every compared listing is kept; their less important fields go first
+_COMPARE_TRIM_STEPS = [
+    _drop_listing_field("f"), _drop_listing_field("ld"), _drop_listing_field("pk"), _drop_listing_field("ba")
+]
+
+
+class ToolOutputEncoder:
+    """
+    Turns a tool's formatted result into the function_call_output string.
+
+    With the compact schema, placeholder fields are dropped, keys are
+    abbreviated (see COMPACT_LEGEND) and the facts the agent speaks first
+    come first. If the result is still over the tool's token budget, the
+    least important content is given up step by step: free text is cut,
+    then secondary fields and trailing listings are dropped. Results of
+    tools without a budget are only compacted.
+    """
+
+    def __init__(self, schema: str = "compact-1", budgets: Optional[Dict[str, int]] = None):
+        if schema not in TOOL_OUTPUT_SCHEMAS:
+            raise ValueError(f"Unknown tool output schema: {schema}")
+        self.schema = schema
+        self.budgets = dict(budgets or {})
+
+    @classmethod
+    def for_settings(cls, settings) -> "ToolOutputEncoder":
+        """Build an encoder with the configured schema and per-tool budgets."""
+        return cls(settings.tool_output_schema, {
+            "search_properties": settings.tool_output_search_budget_tokens,
+            "get_property_details": settings.tool_output_details_budget_tokens,
+            "compare_properties": settings.tool_output_compare_budget_tokens
+        })
+
+    def encode(self, tool_name: str, result: Dict) -> str:
+        """Serialize one tool result for the model."""
+        if self.schema == "full":
+            return json.dumps(result)
+
+        if "error" in result:
+            return _dumps({"v": 1, "e": result["error"]})
+        if tool_name == "search_properties":
+            payload = {"v": 1, "s": result.get("summary", "")}
+            listings = [_compact(prop, _SEARCH_KEYS) for prop in result.get("properties", [])]
+            if listings:
+                payload["p"] = listings
+            steps = _SEARCH_TRIM_STEPS
+        elif tool_name == "get_property_details":
+            payload = {"v": 1, **_compact(result, _DETAIL_KEYS)}
+            steps = _DETAILS_TRIM_STEPS
+        elif tool_name == "compare_properties":
+            payload = {"v": 1, "s": result.get("summary", "")}
+            listings = [_compact(prop, _COMPARE_KEYS) for prop in result.get("properties", [])]
+            if listings:
+                payload["p"] = listings
+            if result.get("unavailable"):
+                payload["x"] = list(result["unavailable"])
+            steps = _COMPARE_TRIM_STEPS
+        else:
+            payload = {"v": 1, **{key: value for key, value in result.items() if _informative(value)}}
+            steps = []
+
+        budget = self.budgets.get(tool_name)
+        return self._fit(payload, steps, budget * CHARS_PER_TOKEN) if budget else _dumps(payload)
+
+    def _fit(self, payload: Dict, steps: List[Callable[[Dict, int], bool]], limit: int) -> str:
+        """Apply trimming steps until the payload fits in limit characters."""
+        encoded = _dumps(payload)
+        for step in steps:
+            while len(encoded) > limit and step(payload, len(encoded) - limit):
+                encoded = _dumps(payload)
+            if len(encoded) <= limit:
+                break
+        return encoded
@@ -0,0 +1,474 @@
+"""
+Tools the model can call.
+Each tool declares its schema, handler, timeout, concurrency limits and
+whether its results may be cached; the session.update tool list and the
+argument validators are built from these declarations.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import TOOL_CALL_SLOT_WAIT, TOOL_CALLS, TOOL_CALLS_IN_FLIGHT
+
+
+class ToolError(Exception):
+    """
+    A tool call that could not produce a result.
+    The message is returned to the model; outcome labels the failure in
+    metrics and call records (invalid, busy, timeout, unavailable, unknown).
+    """
+
+    def __init__(self, message: str, outcome: str):
+        super().__init__(message)
+        self.outcome = outcome
+
+
+# Argument validation. A validator is compiled once per tool from its JSON
+# schema (the subset the tools use: object properties, required, type,
+# enum, minimum/maximum, array items and minItems/maxItems) into per-field
+# checks. Arguments are normalized on the way: null means absent, unknown
+# fields are dropped, whole numbers sent as strings or floats become
+# integers, enums match case-insensitively and a comma-separated string
+# is accepted for an array.
+
+ArgumentValidator = Callable[[Dict], Dict]
+_FieldCheck = Callable[[Any], Any]
+
+
+def _coerce_integer(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError("must be an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip().replace(",", "")
+        if text.lstrip("-").isdigit():
+            return int(text)
+    raise ValueError("must be an integer")
+
+
+def _coerce_number(value: Any) -> float:
+    if isinstance(value, bool):
+        raise ValueError("must be a number")
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.strip().replace(",", ""))
+        except ValueError:
+            pass
+    raise ValueError("must be a number")
+
+
+def _coerce_string(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # e.g. a postcode or listing id sent as a number
+        return str(value)
+    raise ValueError("must be a string")
+
+
+def _coerce_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    raise ValueError("must be true or false")
+
+
+def _coerce_array(value: Any) -> list:
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        # e.g. "123, 456" instead of ["123", "456"]
+        return [item.strip() for item in value.split(",")]
+    raise ValueError("must be a list")
+
+
+_COERCERS: Dict[str, _FieldCheck] = {
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "string": _coerce_string,
+    "boolean": _coerce_boolean,
+    "array": _coerce_array
+}
+
+
+def _compile_field(schema: Dict) -> _FieldCheck:
+    """Build the check for one property from its schema."""
+    checks: List[_FieldCheck] = []
+    field_type = schema.get("type")
+    if field_type is not None:
+        if field_type not in _COERCERS:
+            raise ValueError(f"Unsupported argument type: {field_type}")
+        checks.append(_COERCERS[field_type])
+
+    if field_type == "array":
+        item_check = _compile_field(schema.get("items", {}))
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+
+        def check_items(value):
+            items = [item for item in value if item is not None and item != ""]
+            if min_items is not None and len(items) < min_items:
+                raise ValueError(f"must have at least {min_items} items")
+            if max_items is not None and len(items) > max_items:
+                raise ValueError(f"must have at most {max_items} items")
+            try:
+                return [item_check(item) for item in items]
+            except ValueError as e:
+                raise ValueError(f"items {e}") from None
+        checks.append(check_items)
+
+    if "enum" in schema:
+        allowed = {
+            (option.casefold() if isinstance(option, str) else option): option
+            for option in schema["enum"]
+        }
+        options = ", ".join(str(option) for option in schema["enum"])
+
+        def check_enum(value):
+            option = allowed.get(value.casefold() if isinstance(value, str) else value)
+            if option is None:
+                raise ValueError(f"must be one of {options}")
+            return option
+        checks.append(check_enum)
+
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+    if minimum is not None or maximum is not None:
+        def check_range(value):
+            if minimum is not None and value < minimum:
+                raise ValueError(f"must be at least {minimum}")
+            if maximum is not None and value > maximum:
+                raise ValueError(f"must be at most {maximum}")
+            return value
+        checks.append(check_range)
+
+    def check(value):
+        for step in checks:
+            value = step(value)
+        return value
+    return check
+
+
+def compile_validator(parameters: Dict) -> ArgumentValidator:
+    """
+    Compile a tool's parameters schema into a validator that returns the
+    normalized arguments or raises ValueError naming the offending field.
+    """
+    if parameters.get("type", "object") != "object":
+        raise ValueError("Tool parameters must be an object schema")
+    fields = {name: _compile_field(schema) for name, schema in parameters.get("properties", {}).items()}
+    required = tuple(parameters.get("required", ()))
+
+    def validate(args: Dict) -> Dict:
+        if not isinstance(args, dict):
+            raise ValueError("arguments must be an object")
+        clean = {}
+        for name, check in fields.items():
+            value = args.get(name)
+            if value is None or value == "":
+                continue
+            try:
+                clean[name] = check(value)
+            except ValueError as e:
+                raise ValueError(f"{name} {e}") from None
+        for name in required:
+            if name not in clean:
+                raise ValueError(f"{name} is required")
+        return clean
+    return validate
+
+
+class ToolContext:
+    """What a tool handler may use from the session that called it."""
+
+    __slots__ = ("realty_client", "prefetcher")
+
+    def __init__(self, realty_client=None, prefetcher=None):
+        self.realty_client = realty_client
+        self.prefetcher = prefetcher
+
+
+ToolHandler = Callable[[ToolContext, Dict, bool], Awaitable[Dict]]
+
+
+class Tool:
+    """
+    One tool the model can call.
+
+    handler is called with the session's ToolContext, the validated
+    arguments and whether it may answer from cache (the tool's cacheable
+    flag). timeout_seconds covers waiting for a concurrency slot as well as
+    running; max_per_session and max_global cap concurrent calls (0 = no
+    limit) so a slow upstream can't tie up the worker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        parameters: Dict,
+        handler: ToolHandler,
+        timeout_seconds: float = 8.0,
+        max_per_session: int = 0,
+        max_global: int = 0,
+        cacheable: bool = False
+    ):
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.handler = handler
+        self.timeout_seconds = timeout_seconds
+        self.max_per_session = max_per_session
+        self.max_global = max_global
+        self.cacheable = cacheable
+        self.validate = compile_validator(parameters)
+
+    @property
+    def definition(self) -> Dict:
+        """The tool as declared to the model in session.update."""
+        return {
+            "type": "function",
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters
+        }
+
+
+class ToolRegistry:
+    """
+    The tools of a worker and their worker-wide concurrency slots.
+    Sessions take their own per-session slots from session_slots().
+    """
+
+    def __init__(self, tools: List[Tool]):
+        self.tools: Dict[str, Tool] = {tool.name: tool for tool in tools}
+        # Created on first use, inside the running event loop
+        self._global_slots: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {name: 0 for name in self.tools}
+
+    def definitions(self) -> List[Dict]:
+        """The tools list for session.update."""
+        return [tool.definition for tool in self.tools.values()]
+
+    def session_slots(self) -> Dict[str, asyncio.Semaphore]:
+        """Per-session concurrency slots, one per tool that limits them."""
+        return {
+            name: asyncio.Semaphore(tool.max_per_session)
+            for name, tool in self.tools.items() if tool.max_per_session
+        }
+
+    def _global_slot(self, tool: Tool) -> Optional[asyncio.Semaphore]:
+        if not tool.max_global:
+            return None
+        slot = self._global_slots.get(tool.name)
+        if slot is None:
+            slot = self._global_slots[tool.name] = asyncio.Semaphore(tool.max_global)
+        return slot
+
+    async def call(
+        self,
+        name: str,
+        args_str: str,
+        context: ToolContext,
+        session_slots: Dict[str, asyncio.Semaphore],
+        max_timeout_seconds: Optional[float] = None
+    ) -> Dict:
+        """
+        Validate and run one call, within the tool's timeout (capped at
+        max_timeout_seconds). Raises ToolError when the call is unknown,
+        invalid, can't get a slot in time or runs past its timeout.
+        """
+        tool = self.tools.get(name)
+        if tool is None:
+            TOOL_CALLS.labels("unknown", "unknown").inc()
+            raise ToolError(f"Unknown function: {name}", "unknown")
+        try:
+            args = tool.validate(json.loads(args_str or "{}"))
+        except ValueError as e:
+            TOOL_CALLS.labels(name, "invalid").inc()
+            raise ToolError(f"Invalid arguments for {name}: {e}", "invalid") from None
+
+        running = False
+
+        async def run() -> Dict:
+            nonlocal running
+            waited = time.perf_counter()
+            session_slot = session_slots.get(name)
+            global_slot = self._global_slot(tool)
+            if session_slot:
+                await session_slot.acquire()
+            try:
+                if global_slot:
+                    await global_slot.acquire()
+                try:
+                    TOOL_CALL_SLOT_WAIT.labels(name).observe(time.perf_counter() - waited)
+                    running = True
+                    self._in_flight[name] += 1
+                    TOOL_CALLS_IN_FLIGHT.labels(name).inc()
+                    try:
+                        return await tool.handler(context, args, tool.cacheable)
+                    finally:
+                        self._in_flight[name] -= 1
+                        TOOL_CALLS_IN_FLIGHT.labels(name).dec()
+                finally:
+                    if global_slot:
+                        global_slot.release()
+            finally:
+                if session_slot:
+                    session_slot.release()
+
+        timeout = tool.timeout_seconds
+        if max_timeout_seconds is not None:
+            timeout = min(timeout, max_timeout_seconds)
+        try:
+            result = await asyncio.wait_for(run(), timeout=timeout)
+        except asyncio.TimeoutError:
+            if running:
+                TOOL_CALLS.labels(name, "timeout").inc()
+                raise ToolError(f"{name} took too long to respond", "timeout") from None
+            TOOL_CALLS.labels(name, "busy").inc()
+            raise ToolError(f"{name} is busy right now, please try again shortly", "busy") from None
+        except ToolError as e:
+            TOOL_CALLS.labels(name, e.outcome).inc()
+            raise
+        TOOL_CALLS.labels(name, "error" if "error" in result else "ok").inc()
+        return result
+
+    def stats(self) -> Dict[str, Dict]:
+        """Declared limits and calls currently running per tool."""
+        return {
+            name: {
+                "timeout_seconds": tool.timeout_seconds,
+                "max_per_session": tool.max_per_session,
+                "max_global": tool.max_global,
+                "cacheable": tool.cacheable,
+                "in_flight": self._in_flight[name]
+            }
+            for name, tool in self.tools.items()
+        }
+
+
+# Realty tools
+
+def _realty_client(context: ToolContext):
+    if context.realty_client is None:
+        raise ToolError("RapidAPI not configured. Please add RAPIDAPI_KEY to .env", "unavailable")
+    return context.realty_client
+
+
+async def _search_properties(context: ToolContext, args: Dict, use_cache: bool) -> Dict:
+    result = await _realty_client(context).search_properties(use_cache=use_cache, **args)
+    if context.prefetcher:
+        context.prefetcher.schedule(result)
+    return result
+
+
+async def _get_property_details(context: ToolContext, args: Dict, use_cache: bool) -> Dict:
+    realty_client = _realty_client(context)
+    if context.prefetcher:
+        context.prefetcher.claim(args["listing_id"])
+    return await realty_client.get_property_details(args["listing_id"], use_cache=use_cache)
+
+
+async def _compare_properties(context: ToolContext, args: Dict, use_cache: bool) -> Dict:
+    realty_client = _realty_client(context)
+    if context.prefetcher:
+        for listing_id in args["listing_ids"]:
+            context.prefetcher.claim(listing_id)
+    return await realty_client.compare_properties(args["listing_ids"], use_cache=use_cache)
+
+
+REALTY_TOOLS = [
+    Tool(
+        name="search_properties",
+        description="Search for properties (houses, apartments, units) for sale or rent in Australia. Use this when the user asks about finding properties, homes, or real estate.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "The city, suburb, or postcode to search in (e.g., 'Sydney', 'Melbourne', '2000')"
+                },
+                "max_price": {
+                    "type": "integer",
+                    "description": "Maximum price in AUD"
+                },
+                "min_price": {
+                    "type": "integer",
+                    "description": "Minimum price in AUD"
+                },
+                "bedrooms": {
+                    "type": "integer",
+                    "description": "Minimum number of bedrooms"
+                },
+                "property_type": {
+                    "type": "string",
+                    "enum": ["house", "apartment", "unit", "townhouse", "land"],
+                    "description": "Type of property"
+                },
+                "channel": {
+                    "type": "string",
+                    "enum": ["BUY", "RENT"],
+                    "description": "Whether to buy or rent. Default is BUY."
+                }
+            },
+            "required": ["location"]
+        },
+        handler=_search_properties,
+        timeout_seconds=8.0,
+        max_per_session=2,
+        max_global=16,
+        cacheable=True
+    ),
+    Tool(
+        name="get_property_details",
+        description="Get detailed information about a specific property using its listing ID. Use this when the user wants more details about a property.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "listing_id": {
+                    "type": "string",
+                    "description": "The unique listing ID of the property"
+                }
+            },
+            "required": ["listing_id"]
+        },
+        handler=_get_property_details,
+        timeout_seconds=6.0,
+        max_per_session=3,
+        max_global=16,
+        cacheable=True
+    ),
+    Tool(
+        name="compare_properties",
+        description="Compare several properties side by side using their listing IDs. Use this when the user wants to compare listings (e.g. 'compare the first three') instead of getting details one at a time.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "listing_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "minItems": 2,
+                    "maxItems": 5,
+                    "description": "The listing IDs of the properties to compare"
+                }
+            },
+            "required": ["listing_ids"]
+        },
+        handler=_compare_properties,
+        timeout_seconds=8.0,
+        max_per_session=1,
+        max_global=8,
+        cacheable=True
+    )
+]
+
+
+# The worker's registry, shared by all sessions
+TOOL_REGISTRY = ToolRegistry(REALTY_TOOLS)
@@ -0,0 +1,160 @@
+"""
+Request policy for upstream APIs.
+A worker-wide token bucket keeps requests within the API plan's rate, and
+a circuit breaker stops calling an upstream that keeps failing so callers
+can fall back straight away.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+from metrics import UPSTREAM_CIRCUIT_STATE, UPSTREAM_CIRCUIT_TRANSITIONS, UPSTREAM_RATE_LIMIT_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared by every caller in the worker.
+
+    Tokens refill at rate_per_second up to burst. acquire() takes a token,
+    waiting for one if the bucket is empty; callers are served in the
+    order they arrived because each one reserves its token up front (the
+    balance goes negative) and sleeps until that token is due. A rate of 0
+    disables limiting.
+    """
+
+    def __init__(self, name: str, rate_per_second: float, burst: int):
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now."""
+        if self.rate_per_second <= 0:
+            return True
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def acquire(self, max_wait: float) -> bool:
+        """
+        Take a token, waiting up to max_wait seconds for it.
+        Returns False without taking one if it wouldn't come in time.
+        """
+        if self.rate_per_second <= 0:
+            return True
+        self._refill()
+        self._tokens -= 1
+        wait = -self._tokens / self.rate_per_second if self._tokens < 0 else 0.0
+        if wait > max_wait:
+            self._tokens += 1
+            return False
+        UPSTREAM_RATE_LIMIT_WAIT.labels(self.name).observe(wait)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give back the reservation of a caller that went away
+                self._tokens += 1
+                raise
+        return True
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After failure_threshold failures in a row the circuit opens and
+    allow() refuses requests for reset_seconds. Then it half-opens: a
+    single probe request is let through, and its outcome closes the
+    circuit or opens it again. A failure_threshold of 0 disables it.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        UPSTREAM_CIRCUIT_STATE.labels(name).set(0)
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now."""
+        if self.state == self.CLOSED or self.failure_threshold <= 0:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._transition(self.HALF_OPEN)
+        # Half open: one probe at a time
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def release(self) -> None:
+        """Give up a request allow() let through, without an outcome."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.failure_threshold <= 0:
+            return
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self._opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    @property
+    def retry_in(self) -> Optional[float]:
+        """Seconds until an open circuit lets a probe through, or None if not open."""
+        if self.state != self.OPEN:
+            return None
+        return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def _transition(self, state: str) -> None:
+        if state == self.OPEN:
+            logger.warning("%s circuit open after %s failures; retrying in %.0fs",
+                           self.name, self.failures, self.reset_seconds)
+        elif state == self.CLOSED:
+            logger.info("%s circuit closed", self.name)
+        self.state = state
+        UPSTREAM_CIRCUIT_STATE.labels(self.name).set(self._STATE_VALUES[state])
+        UPSTREAM_CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Full-jitter exponential backoff before retry number attempt (from 1),
+    waiting at least retry_after (e.g. from a Retry-After header) within cap.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(cap, delay)
@@ -4,13 +4,36 @@ Bridges audio between web clients and OpenAI Realtime API.
 """
 
 import asyncio
+import base64
+import binascii
 import json
 import logging
+import time
+from typing import Dict, List, Optional, Type
 from fastapi import WebSocket, WebSocketDisconnect
 
+from admission import SessionAdmission
+from audio_pacer import OutboundAudioPacer
+from audio_pipeline import AudioPipeline
+from call_records import CallRecorder
 from config import Settings
-from openai_realtime import OpenAIRealtimeClient
-from realty_api import RealtyAPIClient
+from conversation_log import CONVERSATION_LOG_EVENTS, ConversationLog
+from event_capture import EventCapture
+from logging_setup import LogContext, bind_session
+from metrics import (
+    ACTIVE_SESSIONS,
+    CLIENT_SEND_DURATION,
+    FUNCTION_ARGUMENTS_STREAM,
+    TOOL_CALL_DURATION,
+    UPSTREAM_CONNECTIONS,
+    TurnTimeline,
+)
+from openai_realtime import OpenAIRealtimeClient, RealtimeEvent
+from realtime_pool import RealtimeConnectionPool
+from realty_api import DetailPrefetcher, RealtyAPIClient
+from resampler import SUPPORTED_SAMPLE_RATES, StreamingResampler
+from tool_output import ToolOutputEncoder
+from tools import TOOL_REGISTRY, ToolContext, ToolError
 
 logger = logging.getLogger(__name__)
 
@@ -21,178 +44,713 @@ class VoiceSessionHandler:
     Manages bidirectional audio streaming and function calls.
     """
     
-    def __init__(self, client_ws: WebSocket, settings: Settings):
+    # Channel written to this handler's call records
+    CALL_CHANNEL = "web"
+    
+    # OpenAI events passed on to the client
+    FORWARD_EVENTS = frozenset({
+        "session.created", "session.updated",
+        "response.audio.delta", "response.audio.done",
+        "response.audio_transcript.delta", "response.audio_transcript.done",
+        "response.text.delta", "response.text.done",
+        "response.done",
+        "input_audio_buffer.speech_started",
+        "input_audio_buffer.speech_stopped",
+        "conversation.item.created",
+        "error"
+    })
+    
+    def __init__(
+        self,
+        client_ws: WebSocket,
+        settings: Settings,
+        realtime_pool: Optional[RealtimeConnectionPool] = None,
+        realty_client: Optional[RealtyAPIClient] = None,
+        log_context: Optional[LogContext] = None,
+        call_recorder: Optional[CallRecorder] = None
+    ):
         self.client_ws = client_ws
         self.settings = settings
+        self.realtime_pool = realtime_pool
         self.openai_client = OpenAIRealtimeClient(settings)
-        self.realty_client = RealtyAPIClient(settings.rapidapi_key) if settings.rapidapi_key else None
+        self.audio_pipeline = AudioPipeline.for_settings(self._send_audio_frame, settings)
+        self.audio_pacer = (
+            OutboundAudioPacer.for_settings(self._send_paced_audio, settings)
+            if settings.outbound_pacing else None
+        )
+        self.realty_client = realty_client
+        self.prefetcher = (
+            DetailPrefetcher(
+                realty_client,
+                max_concurrent=settings.prefetch_max_per_session,
+                max_listings=settings.prefetch_listings
+            )
+            if realty_client and settings.prefetch_details else None
+        )
         self._running = False
         self._pending_function_call = {}
+        self._binary_audio = False
+        self.timeline = TurnTimeline()
+        
+        # Replayed onto a new upstream connection if the current one drops
+        self.conversation_log = ConversationLog(settings.conversation_log_max_items)
+        self._response_active = False
+        
+        # Client audio at another sample rate is converted to and from the
+        # rate OpenAI uses (settings.sample_rate)
+        self.client_sample_rate = settings.sample_rate
+        self._inbound_resampler: Optional[StreamingResampler] = None
+        self._outbound_resampler: Optional[StreamingResampler] = None
+        
+        # In-flight tool calls, and per-response bookkeeping so outputs are
+        # submitted in call order and the follow-up response is requested once
+        self._tool_tasks: Dict[str, asyncio.Task] = {}
+        self._tool_turns: Dict[str, dict] = {}
+        self._tool_output_lock = asyncio.Lock()
+        self.tool_output = ToolOutputEncoder.for_settings(settings)
+        self.tools = TOOL_REGISTRY
+        self._tool_context = ToolContext(realty_client, self.prefetcher)
+        self._tool_slots = self.tools.session_slots()
+        
+        # Session and turn ids stamped on this session's log records
+        self.log_context = log_context or bind_session()
+        
+        # Transcripts, tool calls and response timings for QA and analytics
+        self.call_recorder = call_recorder
+        self._first_audio_ms: Optional[float] = None
+        self._tool_calls = 0
+        self.capture: Optional[EventCapture] = None
+        
+        # Set when the server ends the session (e.g. while draining)
+        self._session_tasks: List[asyncio.Task] = []
+        self.close_reason: Optional[str] = None
     
     async def handle_session(self) -> None:
         """Main session handler. Connects to OpenAI and manages message flow."""
         self._running = True
+        upstream_connected = False
+        started = time.monotonic()
+        ACTIVE_SESSIONS.inc()
         
         try:
-            # Connect to OpenAI Realtime API
-            await self.openai_client.connect()
-            
-            # Run both directions concurrently
-            await asyncio.gather(
-                self._forward_client_to_openai(),
-                self._forward_openai_to_client(),
+            # Check out a warm connection, or connect to OpenAI Realtime API;
+            # either way the capture starts with the session configuration
+            self.capture = EventCapture.for_session(self.settings, self.log_context.session_id, self.CALL_CHANNEL)
+            if self.realtime_pool:
+                self.openai_client = await self.realtime_pool.acquire()
+                self.openai_client.attach_capture(self.capture)
+            else:
+                self.openai_client.attach_capture(self.capture)
+                await self.openai_client.connect()
+            self.openai_client.conversation_log = self.conversation_log
+            upstream_connected = True
+            UPSTREAM_CONNECTIONS.labels("active").inc()
+            self._record(
+                "session.start",
+                channel=self.CALL_CHANNEL,
+                model=self.settings.openai_model,
+                voice=self.settings.openai_voice
             )
+            self.audio_pipeline.start()
+            if self.audio_pacer:
+                self.audio_pacer.start()
+            
+            # Run both directions concurrently; the session ends when either
+            # side stops, so a departed client doesn't hold the slot open
+            self._session_tasks = [
+                asyncio.create_task(self._forward_client_to_openai()),
+                asyncio.create_task(self._forward_openai_to_client()),
+            ]
+            await asyncio.wait(self._session_tasks, return_when=asyncio.FIRST_COMPLETED)
         except Exception as e:
-            logger.error(f"Session error: {e}")
+            logger.error("Session error: %s", e)
             raise
         finally:
             self._running = False
+            for task in self._session_tasks:
+                task.cancel()
+            await asyncio.gather(*self._session_tasks, return_exceptions=True)
+            await self._cancel_tool_calls()
+            if self.prefetcher:
+                await self.prefetcher.close()
+            await self.audio_pipeline.close()
+            logger.info("Upstream audio stats: %s", self.audio_pipeline.stats())
+            if self.audio_pacer:
+                await self.audio_pacer.close()
+                logger.info("Outbound audio stats: %s", self.audio_pacer.stats())
             await self.openai_client.disconnect()
+            if self.capture:
+                self.capture.close()
+            if upstream_connected:
+                UPSTREAM_CONNECTIONS.labels("active").dec()
+                self._record(
+                    "session.end",
+                    duration_ms=round((time.monotonic() - started) * 1000),
+                    reason=self.close_reason or "ended",
+                    tool_calls=self._tool_calls,
+                    reconnects=self.openai_client.reconnects
+                )
+            ACTIVE_SESSIONS.dec()
+    
+    def _record(self, event: str, **fields) -> None:
+        """Queue a call record for this session, tagged with the current turn."""
+        if self.call_recorder:
+            self.call_recorder.record(self.log_context.session_id, event, turn=self.log_context.turn, **fields)
+    
+    async def close(self, reason: str) -> None:
+        """End the session from the server side, telling the client why."""
+        self.close_reason = reason
+        self._running = False
+        try:
+            await self._notify_ending(reason)
+        except Exception as e:
+            logger.warning("Could not notify client of session end: %s", e)
+        for task in self._session_tasks:
+            task.cancel()
+    
+    async def _notify_ending(self, reason: str) -> None:
+        """Tell the client the server is ending the session."""
+        await self._send_to_client(json.dumps({"type": "session.ending", "reason": reason}))
+    
+    @classmethod
+    async def notify_queued(cls, websocket: WebSocket) -> None:
+        """Tell a caller waiting for admission that they are queued."""
+        await websocket.send_text(json.dumps({"type": "session.queued"}))
+    
+    @classmethod
+    async def notify_rejected(cls, websocket: WebSocket, reason: str) -> None:
+        """Tell a caller who was not admitted why, before the socket closes."""
+        await websocket.send_text(json.dumps({
+            "type": "error",
+            "error": {
+                "type": "server_busy",
+                "code": reason,
+                "message": "The voice agent is busy. Please try again shortly."
+            }
+        }))
+    
+    async def _send_audio_frame(self, pcm: bytes) -> None:
+        """Send a coalesced audio frame on the session's OpenAI connection."""
+        await self.openai_client.send_audio_pcm(pcm)
     
     async def _forward_client_to_openai(self) -> None:
-        """Receive messages from client and forward to OpenAI."""
+        """
+        Receive messages from client and forward to OpenAI.
+        
+        Clients that negotiate binary audio send raw PCM16 in binary frames;
+        control messages (and audio from older clients) arrive as JSON text.
+        """
         try:
             while self._running:
                 try:
-                    data = await self.client_ws.receive_text()
-                    message = json.loads(data)
+                    frame = await self.client_ws.receive()
+                    if frame["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(frame.get("code", 1000))
+                    
+                    pcm = frame.get("bytes")
+                    if pcm is not None:
+                        if not self._binary_audio:
+                            logger.warning("Binary frame received before binary audio was negotiated")
+                        elif pcm:
+                            await self._push_client_audio(pcm)
+                        continue
+                    
+                    message = json.loads(frame.get("text") or "")
                     msg_type = message.get("type")
                     
                     if msg_type == "audio":
                         audio_data = message.get("audio", "")
                         if audio_data:
-                            await self.openai_client.send_audio(audio_data)
+                            await self._push_client_audio(binascii.a2b_base64(audio_data))
                     elif msg_type == "audio_commit":
+                        await self.audio_pipeline.flush()
                         await self.openai_client.commit_audio()
                     elif msg_type == "response_request":
+                        await self.audio_pipeline.flush()
                         await self.openai_client.create_response()
+                    elif msg_type == "client_config":
+                        await self._apply_client_config(message)
                     else:
-                        logger.warning(f"Unknown client message type: {msg_type}")
+                        logger.warning("Unknown client message type: %s", msg_type)
                         
                 except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON from client: {e}")
+                    logger.error("Invalid JSON from client: %s", e)
+                except binascii.Error as e:
+                    logger.error("Invalid base64 audio from client: %s", e)
                     
         except WebSocketDisconnect:
             logger.info("Client disconnected")
             self._running = False
         except Exception as e:
-            logger.error(f"Error forwarding client messages: {e}")
+            logger.error("Error forwarding client messages: %s", e)
             self._running = False
     
-    async def _forward_openai_to_client(self) -> None:
-        """Receive messages from OpenAI and forward relevant ones to client."""
+    async def _push_client_audio(self, pcm: bytes) -> None:
+        """Queue client audio for OpenAI, converting it to the upstream rate."""
+        if self._inbound_resampler:
+            pcm = self._inbound_resampler.process(pcm)
+        if pcm:
+            await self.audio_pipeline.push(pcm)
+    
+    async def _apply_client_config(self, message: dict) -> None:
+        """
+        Negotiate the client protocol options and acknowledge them.
+        Options left out of the message keep their current values.
+        """
+        if "audio_mode" in message:
+            audio_mode = message["audio_mode"]
+            if audio_mode not in ("json", "binary"):
+                logger.warning("Unsupported audio mode requested: %s", audio_mode)
+                audio_mode = "json"
+            self._binary_audio = audio_mode == "binary"
+            logger.info("Client audio mode: %s", audio_mode)
+        audio_mode = "binary" if self._binary_audio else "json"
+        
+        if "sample_rate" in message or "resample_output" in message:
+            self._configure_resampling(
+                message.get("sample_rate", self.client_sample_rate),
+                message.get("resample_output", self._outbound_resampler is not None)
+            )
+        
+        # Per-session voice override on top of the shared session template
+        voice = message.get("voice")
+        if voice and voice != self.openai_client.session_overrides.get("voice", self.settings.openai_voice):
+            await self.openai_client.update_session(voice=voice)
+        
+        await self._send_to_client(json.dumps({
+            "type": "client_config.updated",
+            "audio_mode": audio_mode,
+            "sample_rate": self.client_sample_rate,
+            "resample_output": self._outbound_resampler is not None,
+            "voice": voice or self.openai_client.session_overrides.get("voice", self.settings.openai_voice)
+        }))
+    
+    def _configure_resampling(self, sample_rate, resample_output: bool) -> None:
+        """Set up conversion between the client's sample rate and OpenAI's."""
+        if sample_rate not in SUPPORTED_SAMPLE_RATES:
+            logger.warning("Unsupported client sample rate: %s", sample_rate)
+            return
+        
+        upstream_rate = self.settings.sample_rate
+        if sample_rate != self.client_sample_rate:
+            self.client_sample_rate = sample_rate
+            self._inbound_resampler = (
+                StreamingResampler(sample_rate, upstream_rate) if sample_rate != upstream_rate else None
+            )
         
-        # Events to forward to client
-        forward_events = {
-            "session.created", "session.updated",
-            "response.audio.delta", "response.audio.done",
-            "response.audio_transcript.delta", "response.audio_transcript.done",
-            "response.text.delta", "response.text.done",
-            "response.done",
-            "input_audio_buffer.speech_started",
-            "input_audio_buffer.speech_stopped",
-            "conversation.item.created",
-            "error"
+        if resample_output and sample_rate != upstream_rate:
+            if self._outbound_resampler is None or self._outbound_resampler.out_rate != sample_rate:
+                self._outbound_resampler = StreamingResampler(upstream_rate, sample_rate)
+        else:
+            self._outbound_resampler = None
+        logger.info("Client sample rate: %s Hz (output resampled: %s)", sample_rate, self._outbound_resampler is not None)
+    
+    async def _send_to_client(self, text: str) -> None:
+        """Send a text message to the client, recording how long it took."""
+        started = time.perf_counter()
+        await self.client_ws.send_text(text)
+        CLIENT_SEND_DURATION.observe(time.perf_counter() - started)
+    
+    async def _forward_to_client(self, event: RealtimeEvent) -> None:
+        """Send one OpenAI event to the client, at the client's sample rate."""
+        if self.audio_pacer and event.type == "response.audio.delta":
+            self.audio_pacer.push(binascii.a2b_base64(event.get("delta", "")), self._audio_meta(event))
+        elif self.audio_pacer and event.type.startswith("response."):
+            # Keep the rest of the response (transcripts, audio.done,
+            # response.done) in order behind the paced audio
+            if event.type == "response.audio.done":
+                self.audio_pacer.end_item()
+            self.audio_pacer.after_audio(lambda: self._send_to_client(event.raw))
+        elif event.type == "response.audio.delta" and self._outbound_resampler:
+            await self._send_to_client(self._resample_audio_delta(event))
+        else:
+            await self._send_to_client(event.raw)
+    
+    @staticmethod
+    def _audio_meta(event: RealtimeEvent) -> dict:
+        """Fields of an audio delta that its re-chunked frames carry over."""
+        return {
+            "response_id": event.get("response_id"),
+            "item_id": event.get("item_id"),
+            "output_index": event.get("output_index", 0),
+            "content_index": event.get("content_index", 0)
         }
+    
+    async def _send_paced_audio(self, meta: dict, pcm: bytes) -> None:
+        """Send one paced frame of agent audio as a response.audio.delta."""
+        if self._outbound_resampler:
+            pcm = self._outbound_resampler.process(pcm)
+        await self._send_to_client(json.dumps({
+            "type": "response.audio.delta",
+            **meta,
+            "delta": binascii.b2a_base64(pcm, newline=False).decode("ascii")
+        }))
+        self._audio_delivered()
+    
+    def _audio_delivered(self) -> None:
+        """Record time to first audio once the turn's first audio reaches the client."""
+        first_audio = self.timeline.audio_sent()
+        if first_audio is not None:
+            self._first_audio_ms = round(first_audio * 1000)
+    
+    async def _interrupt_playback(self) -> None:
+        """
+        Stop the agent's audio when the caller barges in, and tell OpenAI
+        how much of it was actually heard.
+        """
+        if not self.audio_pacer:
+            return
+        cut = self.audio_pacer.interrupt()
+        if cut is None:
+            return
+        item_id, content_index, audio_end_ms = cut
+        await self.openai_client.send_message({
+            "type": "conversation.item.truncate",
+            "item_id": item_id,
+            "content_index": content_index,
+            "audio_end_ms": audio_end_ms
+        })
+        await self._notify_playback_cleared(item_id, audio_end_ms)
+    
+    async def _notify_playback_cleared(self, item_id: str, audio_end_ms: int) -> None:
+        """Tell the client to stop playing the audio it has buffered."""
+        await self._send_to_client(json.dumps({
+            "type": "output_audio.cleared",
+            "item_id": item_id,
+            "audio_end_ms": audio_end_ms
+        }))
+    
+    async def _forward_openai_to_client(self) -> None:
+        """Receive messages from OpenAI and forward relevant ones to client."""
+        forward_events = self.FORWARD_EVENTS
+        log_events = self.settings.log_openai_events and logger.isEnabledFor(logging.DEBUG)
         
-        async def on_openai_message(message: dict) -> None:
-            msg_type = message.get("type", "")
+        async def on_openai_message(event: RealtimeEvent) -> None:
+            # Only events the backend acts on are parsed; the rest are
+            # forwarded to the client as the original frame
+            msg_type = event.type
+            if log_events:
+                logger.debug("OpenAI event: %s", msg_type, extra={"event_type": msg_type})
+            
+            if msg_type in CONVERSATION_LOG_EVENTS:
+                self.conversation_log.record(msg_type, event.data)
             
             # Handle function calls from OpenAI
             if msg_type == "response.function_call_arguments.delta":
                 # Accumulate function call arguments
-                call_id = message.get("call_id", "")
+                call_id = event.get("call_id", "")
                 if call_id not in self._pending_function_call:
                     self._pending_function_call[call_id] = {
-                        "name": message.get("name", ""),
-                        "arguments": ""
+                        "name": event.get("name", ""),
+                        "arguments": "",
+                        "started_at": time.perf_counter()
                     }
-                self._pending_function_call[call_id]["arguments"] += message.get("delta", "")
+                self._pending_function_call[call_id]["arguments"] += event.get("delta", "")
             
             elif msg_type == "response.function_call_arguments.done":
-                # Function call complete - execute it
-                call_id = message.get("call_id", "")
-                func_name = message.get("name", "")
-                args_str = message.get("arguments", "{}")
-                
-                logger.info(f"Function call: {func_name}({args_str})")
-                
+                # Function call complete - run it without blocking this loop
+                self._start_tool_call(event.data)
+            
+            elif msg_type == "response.created":
+                # A newer response makes tool calls from earlier ones obsolete
+                response_id = event.get("response", {}).get("id", "")
+                self._response_active = True
+                self._obsolete_tool_calls(keep_response_id=response_id)
+                if self._outbound_resampler and not self.audio_pacer:
+                    # (paced audio of the previous response may still be going out)
+                    self._outbound_resampler.reset()
+            
+            elif msg_type == "response.done":
+                self._response_active = False
+                response = event.get("response", {})
+                response_id = response.get("id", "")
+                if self.call_recorder:
+                    self._record_response(response)
+                turn = self._tool_turns.get(response_id)
+                if turn is not None:
+                    turn["done"] = True
+                    async with self._tool_output_lock:
+                        await self._continue_after_tools(response_id)
+            
+            elif msg_type == "input_audio_buffer.speech_stopped":
+                self.timeline.speech_stopped()
+            
+            elif msg_type == "input_audio_buffer.committed":
+                self.log_context.next_turn()
+            
+            elif self.call_recorder and msg_type == "conversation.item.input_audio_transcription.completed":
+                self._record("transcript", role="user", item_id=event.get("item_id"), text=event.get("transcript", ""))
+            
+            elif self.call_recorder and msg_type == "response.audio_transcript.done":
+                self._record(
+                    "transcript",
+                    role="assistant",
+                    item_id=event.get("item_id"),
+                    response_id=event.get("response_id"),
+                    text=event.get("transcript", "")
+                )
+            
+            if msg_type == "input_audio_buffer.speech_started":
+                # The caller barged in; whatever the tools were answering is stale
+                self._obsolete_tool_calls()
                 try:
-                    args = json.loads(args_str)
-                    result = await self._execute_function(func_name, args)
-                    await self._send_function_result(call_id, result)
+                    await self._interrupt_playback()
                 except Exception as e:
-                    logger.error(f"Function call error: {e}")
-                    await self._send_function_result(call_id, {"error": str(e)})
-                
-                # Clean up
-                if call_id in self._pending_function_call:
-                    del self._pending_function_call[call_id]
+                    logger.error("Error interrupting playback: %s", e)
             
-            elif msg_type in forward_events:
+            if msg_type in forward_events:
                 try:
-                    await self.client_ws.send_text(json.dumps(message))
+                    await self._forward_to_client(event)
+                    if msg_type == "response.audio.delta" and self.audio_pacer is None:
+                        # Paced audio is timed when the pacer sends it
+                        self._audio_delivered()
                 except Exception as e:
-                    logger.error(f"Error sending to client: {e}")
+                    logger.error("Error sending to client: %s", e)
                     self._running = False
             
             if msg_type == "error":
-                logger.error(f"OpenAI error: {message}")
+                logger.error("OpenAI error: %s", event.raw)
         
         try:
-            await self.openai_client.receive_messages(on_openai_message)
+            await self.openai_client.receive_messages(on_openai_message, self._on_upstream_reconnect)
         except Exception as e:
-            logger.error(f"Error receiving from OpenAI: {e}")
+            logger.error("Error receiving from OpenAI: %s", e)
             self._running = False
     
-    async def _execute_function(self, name: str, args: dict) -> dict:
-        """Execute a function call and return results."""
-        if not self.realty_client:
-            return {"error": "RapidAPI not configured. Please add RAPIDAPI_KEY to .env"}
-        
-        if name == "search_properties":
-            return await self.realty_client.search_properties(
-                location=args.get("location", ""),
-                max_price=args.get("max_price"),
-                min_price=args.get("min_price"),
-                bedrooms=args.get("bedrooms"),
-                property_type=args.get("property_type"),
-                channel=args.get("channel", "BUY")
+    async def _on_upstream_reconnect(self) -> None:
+        """
+        Pick the call up again on a new OpenAI connection.
+        The response that was being generated died with the old connection,
+        so it is requested again (after any tool outputs it was waiting for).
+        """
+        self._pending_function_call.clear()
+        if self.audio_pacer:
+            self.audio_pacer.end_item()
+        if not self._response_active:
+            return
+        
+        self._response_active = False
+        async with self._tool_output_lock:
+            if self._tool_turns:
+                for response_id, turn in list(self._tool_turns.items()):
+                    turn["done"] = True
+                    await self._continue_after_tools(response_id)
+            else:
+                await self.openai_client.create_response()
+    
+    def _record_response(self, response: dict) -> None:
+        """Record how a response ended, its token usage and time to first audio."""
+        usage = response.get("usage") or {}
+        self._record(
+            "response",
+            response_id=response.get("id"),
+            status=response.get("status"),
+            first_audio_ms=self._first_audio_ms,
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens")
+        )
+        self._first_audio_ms = None
+    
+    def _resample_audio_delta(self, event: RealtimeEvent) -> str:
+        """Rewrite an audio delta at the client's sample rate."""
+        pcm = self._outbound_resampler.process(base64.b64decode(event.get("delta", "")))
+        return json.dumps({**event.data, "delta": base64.b64encode(pcm).decode("ascii")})
+    
+    def _start_tool_call(self, message: dict) -> None:
+        """Start a completed function call as a background task."""
+        call_id = message.get("call_id", "")
+        response_id = message.get("response_id", "")
+        func_name = message.get("name", "")
+        args_str = message.get("arguments", "{}")
+        
+        logger.info("Function call: %s", func_name)
+        logger.debug("Function call arguments: %s(%s)", func_name, args_str)
+        pending = self._pending_function_call.pop(call_id, None)
+        if pending is not None:
+            # Names the model made up share one series, as in ToolRegistry.call
+            label = func_name if func_name in self.tools.tools else "unknown"
+            FUNCTION_ARGUMENTS_STREAM.labels(label).observe(time.perf_counter() - pending["started_at"])
+        
+        turn = self._tool_turns.setdefault(response_id, {
+            "order": [],
+            "results": {},
+            "submitted": 0,
+            "done": False,
+            "obsolete": False
+        })
+        turn["order"].append(call_id)
+        self._tool_tasks[call_id] = asyncio.create_task(
+            self._run_tool_call(response_id, call_id, func_name, args_str)
+        )
+    
+    async def _run_tool_call(self, response_id: str, call_id: str, name: str, args_str: str) -> None:
+        """Run a tool call through the registry and submit its output."""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            result = await self.tools.call(
+                name, args_str, self._tool_context, self._tool_slots,
+                max_timeout_seconds=self.settings.tool_call_timeout_seconds
             )
-        elif name == "get_property_details":
-            return await self.realty_client.get_property_details(
-                listing_id=args.get("listing_id", "")
+            if "error" in result:
+                # Same outcome ToolRegistry.call counts (e.g. an API 404)
+                outcome = "error"
+        except ToolError as e:
+            logger.warning("Function call %s failed (%s): %s", name, e.outcome, e)
+            outcome = e.outcome
+            result = {"error": str(e)}
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            if not self._running:
+                raise
+            logger.info("Function call cancelled: %s", name)
+            result = {"error": "Cancelled because the conversation moved on"}
+        except Exception as e:
+            logger.error("Function call error: %s", e)
+            outcome = "error"
+            result = {"error": str(e)}
+        finally:
+            self._tool_tasks.pop(call_id, None)
+            elapsed = time.perf_counter() - started
+            TOOL_CALL_DURATION.labels(name if name in self.tools.tools else "unknown").observe(elapsed)
+            self._tool_calls += 1
+            self._record(
+                "tool_call",
+                name=name,
+                call_id=call_id,
+                arguments=args_str,
+                outcome=outcome,
+                duration_ms=round(elapsed * 1000, 1)
             )
-        else:
-            return {"error": f"Unknown function: {name}"}
+        
+        turn = self._tool_turns.get(response_id)
+        if turn is None:
+            return
+        turn["results"][call_id] = self.tool_output.encode(name, result)
+        
+        async with self._tool_output_lock:
+            # Submit outputs in the order the model issued the calls
+            while turn["submitted"] < len(turn["order"]):
+                next_call_id = turn["order"][turn["submitted"]]
+                if next_call_id not in turn["results"]:
+                    break
+                await self._send_function_result(next_call_id, turn["results"].pop(next_call_id))
+                turn["submitted"] += 1
+            await self._continue_after_tools(response_id)
     
-    async def _send_function_result(self, call_id: str, result: dict) -> None:
-        """Send function result back to OpenAI."""
+    async def _continue_after_tools(self, response_id: str) -> None:
+        """
+        Request the follow-up response once every call of a response has its
+        output submitted and the response itself has finished.
+        Must be called with the tool output lock held.
+        """
+        turn = self._tool_turns.get(response_id)
+        if turn is None or turn["submitted"] < len(turn["order"]):
+            return
+        
+        if turn["obsolete"]:
+            del self._tool_turns[response_id]
+        elif turn["done"]:
+            del self._tool_turns[response_id]
+            # Request OpenAI to generate response based on function results
+            await self.openai_client.create_response()
+    
+    def _obsolete_tool_calls(self, keep_response_id: Optional[str] = None) -> None:
+        """Cancel in-flight tool calls belonging to responses other than keep_response_id."""
+        for response_id, turn in self._tool_turns.items():
+            if response_id == keep_response_id or turn["obsolete"]:
+                continue
+            turn["obsolete"] = True
+            for call_id in turn["order"]:
+                task = self._tool_tasks.get(call_id)
+                if task is not None:
+                    task.cancel()
+    
+    async def _cancel_tool_calls(self) -> None:
+        """Cancel all in-flight tool calls at the end of the session."""
+        tasks = list(self._tool_tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tool_tasks.clear()
+        self._tool_turns.clear()
+    
+    async def _send_function_result(self, call_id: str, output: str) -> None:
+        """Send an encoded function result back to OpenAI as a conversation item."""
         # Create conversation item with function output
         message = {
             "type": "conversation.item.create",
             "item": {
                 "type": "function_call_output",
                 "call_id": call_id,
-                "output": json.dumps(result)
+                "output": output
             }
         }
         await self.openai_client.send_message(message)
-        
-        # Request OpenAI to generate response based on function result
-        await self.openai_client.create_response()
 
 
-async def handle_voice_websocket(websocket: WebSocket, settings: Settings) -> None:
-    """Entry point for handling a voice WebSocket connection."""
+async def handle_voice_websocket(
+    websocket: WebSocket,
+    settings: Settings,
+    realtime_pool: Optional[RealtimeConnectionPool] = None,
+    realty_client: Optional[RealtyAPIClient] = None,
+    admission: Optional[SessionAdmission] = None,
+    handler_class: Type[VoiceSessionHandler] = VoiceSessionHandler,
+    call_recorder: Optional[CallRecorder] = None
+) -> None:
+    """
+    Entry point for handling a voice WebSocket connection.
+    handler_class selects the client protocol (e.g. a telephony media stream).
+    """
+    log_context = bind_session()
     await websocket.accept()
     logger.info("Client connected")
     
-    handler = VoiceSessionHandler(websocket, settings)
+    if admission and not await _admit(websocket, admission, handler_class):
+        return
+    
+    handler = handler_class(websocket, settings, realtime_pool, realty_client, log_context, call_recorder)
+    if admission:
+        admission.register(handler)
     
     try:
         await handler.handle_session()
     except Exception as e:
-        logger.error(f"WebSocket handler error: {e}")
+        logger.error("WebSocket handler error: %s", e)
     finally:
+        if admission:
+            admission.unregister(handler)
+            await admission.release()
+        if handler.close_reason:
+            try:
+                await websocket.close(code=1001)
+            except Exception:
+                pass
         logger.info("Session ended")
+
+
+async def _admit(
+    websocket: WebSocket,
+    admission: SessionAdmission,
+    handler_class: Type[VoiceSessionHandler]
+) -> bool:
+    """
+    Admit a session or turn it away cleanly.
+    Queued callers are told they are waiting; rejected callers get an error
+    event and a 1013 (try again later) close so they can retry elsewhere.
+    """
+    if admission.at_capacity and admission.can_queue:
+        await handler_class.notify_queued(websocket)
+    
+    if await admission.acquire():
+        return True
+    
+    reason = "draining" if admission.draining else "server_busy"
+    logger.warning("Session rejected: %s (%s/%s active)", reason, admission.active, admission.max_sessions)
+    try:
+        await handler_class.notify_rejected(websocket, reason)
+        await websocket.close(code=1013)
+    except Exception:
+        pass
+    return False